@@ -0,0 +1,205 @@
+#!/usr/bin/env python3
+"""
+Co-located Facilitator Benchmark
+Sends paid requests through a resource app protected by x402_protected,
+once with the facilitator behind HTTP (uvicorn in a child process, pooled
+client) and once in-process (LocalFacilitatorClient). Both modes share the
+same FacilitatorService around a stub mechanism whose verify and settle
+cost --chain-ms, so the difference is the server <-> facilitator hop.
+
+Usage: python bench/bench_colocated.py [--requests 500] [--concurrency 20] [--chain-ms 5]
+"""
+
+import argparse
+import asyncio
+import multiprocessing
+import socket
+import sys
+import time
+from pathlib import Path
+
+import httpx
+import uvicorn
+from bankofai.x402.encoding import encode_payment_payload
+from bankofai.x402.facilitator import X402Facilitator
+from bankofai.x402.fastapi import x402_protected
+from bankofai.x402.server import X402Server
+from bankofai.x402.types import (
+    FeeQuoteResponse,
+    PaymentPayload,
+    PaymentRequirements,
+    SettleResponse,
+    VerifyResponse,
+)
+from fastapi import FastAPI, Request, Response
+
+ROOT = Path(__file__).parent.parent
+sys.path.insert(0, str(ROOT))
+sys.path.insert(0, str(ROOT / "facilitator"))
+sys.path.insert(0, str(ROOT / "server"))
+
+from facilitator_client import PooledFacilitatorClient
+from local_facilitator import LocalFacilitatorClient
+from service import FacilitatorService
+from verify_cache import VerifyCache
+
+NETWORK = "tron:nile"
+PAY_TO = "TGjgvdTWWrybVLaVeFqSyVqJQWjxqRYbaK"
+USDT = "TXYZopYRdj2D9XRtbG411XZZ3kM5VkAeBf"
+PRICE = "0.0001 USDT"
+
+
+class StubMechanism:
+    """exact_permit facilitator mechanism with fixed chain costs"""
+
+    def __init__(self, chain_seconds: float) -> None:
+        self.chain_seconds = chain_seconds
+
+    def scheme(self) -> str:
+        return "exact_permit"
+
+    async def fee_quote(self, requirements, context) -> FeeQuoteResponse:
+        return FeeQuoteResponse(
+            fee={"feeTo": PAY_TO, "feeAmount": "100"},
+            pricing="flat",
+            scheme=requirements.scheme,
+            network=requirements.network,
+            asset=requirements.asset,
+        )
+
+    async def verify(self, payload, requirements) -> VerifyResponse:
+        await asyncio.sleep(self.chain_seconds)
+        return VerifyResponse(isValid=True)
+
+    async def settle(self, payload, requirements) -> SettleResponse:
+        await asyncio.sleep(self.chain_seconds)
+        # No transaction hash: x402_protected would look it up on the real chain
+        return SettleResponse(success=True, network=requirements.network)
+
+
+def make_service(chain_seconds: float) -> FacilitatorService:
+    facilitator = X402Facilitator().register([NETWORK], StubMechanism(chain_seconds))
+    return FacilitatorService(facilitator, verify_cache=VerifyCache())
+
+
+def http_facilitator(sock: socket.socket, chain_seconds: float) -> None:
+    """Child process: the facilitator's /fee/quote, /verify and /settle over the same service"""
+    service = make_service(chain_seconds)
+    app = FastAPI()
+
+    @app.post("/fee/quote")
+    async def fee_quote(request: Request):
+        body = await request.json()
+        accepts = [PaymentRequirements.model_validate(a) for a in body["accepts"]]
+        content = await service.fee_quote_body(accepts, body.get("paymentPermitContext"))
+        return Response(content=content, media_type="application/json")
+
+    @app.post("/verify")
+    async def verify(request: Request):
+        body = await request.json()
+        return await service.verify(
+            PaymentPayload.model_validate(body["paymentPayload"]),
+            PaymentRequirements.model_validate(body["paymentRequirements"]),
+        )
+
+    @app.post("/settle")
+    async def settle(request: Request):
+        body = await request.json()
+        return await service.settle(
+            PaymentPayload.model_validate(body["paymentPayload"]),
+            PaymentRequirements.model_validate(body["paymentRequirements"]),
+        )
+
+    uvicorn.run(app, fd=sock.fileno(), log_level="warning")
+
+
+def resource_app(facilitator) -> FastAPI:
+    server = X402Server()
+    server.set_facilitator(facilitator)
+    app = FastAPI()
+
+    @app.get("/protected")
+    @x402_protected(server=server, prices=[PRICE], schemes=["exact_permit"], network=NETWORK, pay_to=PAY_TO)
+    async def protected(request: Request):
+        return {"ok": True}
+
+    return app
+
+
+def payment_header(index: int) -> str:
+    requirements = PaymentRequirements(
+        scheme="exact_permit", network=NETWORK, amount="100", asset=USDT, payTo=PAY_TO
+    )
+    payload = PaymentPayload.model_validate({
+        "x402Version": 2,
+        "accepted": requirements.model_dump(by_alias=True),
+        "payload": {"signature": f"0x{index:0130x}"},
+    })
+    return encode_payment_payload(payload)
+
+
+async def run(label: str, facilitator, args) -> None:
+    app = resource_app(facilitator)
+    headers = [payment_header(i) for i in range(args.requests)]
+    gate = asyncio.Semaphore(args.concurrency)
+    latencies: list[float] = []
+
+    async with httpx.AsyncClient(
+        transport=httpx.ASGITransport(app=app), base_url="http://resource"
+    ) as client:
+
+        async def one(header: str) -> None:
+            async with gate:
+                start = time.perf_counter()
+                response = await client.get("/protected", headers={"PAYMENT-SIGNATURE": header})
+                latencies.append(time.perf_counter() - start)
+                assert response.status_code == 200, response.text
+
+        start = time.perf_counter()
+        await asyncio.gather(*(one(h) for h in headers))
+        total = time.perf_counter() - start
+    await facilitator.close()
+
+    latencies.sort()
+    print(
+        f"{label:<8} {len(latencies) / total:>8.0f} paid requests/s"
+        f"  p50 {latencies[len(latencies) // 2] * 1000:>7.2f} ms"
+        f"  p99 {latencies[int(len(latencies) * 0.99)] * 1000:>7.2f} ms"
+    )
+
+
+async def main() -> None:
+    parser = argparse.ArgumentParser(description="Co-located facilitator benchmark")
+    parser.add_argument("--requests", type=int, default=500)
+    parser.add_argument("--concurrency", type=int, default=20)
+    parser.add_argument("--chain-ms", type=float, default=5.0, help="stub verify/settle chain time")
+    args = parser.parse_args()
+
+    sock = socket.socket()
+    sock.bind(("127.0.0.1", 0))
+    url = f"http://127.0.0.1:{sock.getsockname()[1]}"
+    child = multiprocessing.get_context("fork").Process(
+        target=http_facilitator, args=(sock, args.chain_ms / 1000), daemon=True
+    )
+    child.start()
+    for _ in range(100):
+        try:
+            async with httpx.AsyncClient(base_url=url) as probe:
+                await probe.get("/")
+            break
+        except httpx.TransportError:
+            await asyncio.sleep(0.05)
+
+    print("=" * 80)
+    print("Co-located Facilitator Benchmark (stub chain)")
+    print("=" * 80)
+    print(f"Requests: {args.requests}  Concurrency: {args.concurrency}  Chain: {args.chain_ms} ms")
+    print("-" * 80)
+    await run("http", PooledFacilitatorClient(url, http2=False), args)
+    await run("local", LocalFacilitatorClient(make_service(args.chain_ms / 1000)), args)
+    print("=" * 80)
+    child.terminate()
+
+
+if __name__ == "__main__":
+    asyncio.run(main())
@@ -0,0 +1,59 @@
+#!/usr/bin/env python3
+"""
+Encoding Benchmark
+Reports payload size and encode latency for every supported media type and
+preset, so per-endpoint presets can be picked from measured trade-offs.
+
+Usage: python bench/bench_encoding.py [--iterations 20]
+"""
+
+import argparse
+import sys
+import time
+from pathlib import Path
+
+SERVER_DIR = Path(__file__).parent.parent / "server"
+sys.path.insert(0, str(SERVER_DIR))
+
+from render import (
+    DEFAULT_PRESET,
+    ENCODING_PRESETS,
+    SUPPORTED_MEDIA_TYPES,
+    ImageRenderer,
+    encode_image,
+)
+
+PROTECTED_IMAGE_PATH = SERVER_DIR / "protected.png"
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("--iterations", type=int, default=20, help="encodes per case")
+    args = parser.parse_args()
+
+    renderer = ImageRenderer(PROTECTED_IMAGE_PATH)
+    image = renderer.render("req: 12345", (255, 255, 0, 255))
+    baseline = encode_image(image, "image/png", DEFAULT_PRESET)
+
+    print("=" * 80)
+    print("Encoding Benchmark")
+    print("=" * 80)
+    print(f"Image: {PROTECTED_IMAGE_PATH} {renderer.size}")
+    print(f"Baseline: image/png ({DEFAULT_PRESET}) = {len(baseline)} bytes")
+    print()
+    print(f"  {'media type':<12} {'preset':<10} {'bytes':>9} {'vs png':>8} {'ms/encode':>10} {'encodes/sec':>12}")
+    for media_type in SUPPORTED_MEDIA_TYPES:
+        for preset in ENCODING_PRESETS:
+            start = time.perf_counter()
+            for _ in range(args.iterations):
+                data = encode_image(image, media_type, preset)
+            elapsed = (time.perf_counter() - start) / args.iterations
+            print(
+                f"  {media_type:<12} {preset:<10} {len(data):>9} "
+                f"{len(data) / len(baseline):>7.0%} {elapsed * 1000:>10.2f} {1 / elapsed:>12.1f}"
+            )
+    print("=" * 80)
+
+
+if __name__ == "__main__":
+    main()
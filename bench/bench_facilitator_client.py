@@ -0,0 +1,141 @@
+#!/usr/bin/env python3
+"""
+Facilitator Client Benchmark
+Sends verify calls from the resource server's facilitator client to a local
+stub facilitator (uvicorn in a child process, fixed --latency-ms per call),
+once with the SDK's FacilitatorClient and once with PooledFacilitatorClient.
+Each payment is verified --duplicates times concurrently, as when a client
+retries.
+
+Usage: python bench/bench_facilitator_client.py [--payments 500] [--concurrency 50] [--duplicates 2]
+"""
+
+import argparse
+import asyncio
+import multiprocessing
+import socket
+import sys
+import time
+from pathlib import Path
+
+import httpx
+import uvicorn
+from bankofai.x402.facilitator import FacilitatorClient
+from bankofai.x402.types import PaymentPayload, PaymentRequirements
+from fastapi import FastAPI, Request
+
+SERVER_DIR = Path(__file__).parent.parent / "server"
+sys.path.insert(0, str(SERVER_DIR))
+
+from facilitator_client import PooledFacilitatorClient
+
+NETWORK = "tron:nile"
+PAY_TO = "TGjgvdTWWrybVLaVeFqSyVqJQWjxqRYbaK"
+USDT = "TXYZopYRdj2D9XRtbG411XZZ3kM5VkAeBf"
+
+
+def stub_facilitator(sock: socket.socket, latency: float) -> None:
+    """Child process: /verify answers after a fixed delay; /stats counts calls and connections"""
+    app = FastAPI()
+    stats = {"calls": 0, "connections": set()}
+
+    @app.post("/verify")
+    async def verify(request: Request):
+        stats["calls"] += 1
+        stats["connections"].add((request.client.host, request.client.port))
+        await request.body()
+        await asyncio.sleep(latency)
+        return {"isValid": True}
+
+    @app.post("/stats")
+    async def read_stats():
+        result = {"calls": stats["calls"], "connections": len(stats["connections"])}
+        stats["calls"], stats["connections"] = 0, set()
+        return result
+
+    uvicorn.run(app, fd=sock.fileno(), log_level="warning", backlog=4096)
+
+
+def make_payment(index: int) -> tuple[PaymentPayload, PaymentRequirements]:
+    requirements = PaymentRequirements(
+        scheme="exact_permit", network=NETWORK, amount="1000000", asset=USDT, payTo=PAY_TO
+    )
+    payload = PaymentPayload.model_validate({
+        "x402Version": 2,
+        "accepted": requirements.model_dump(by_alias=True),
+        "payload": {"signature": f"0x{index:0130x}"},
+    })
+    return payload, requirements
+
+
+async def stub_stats(url: str) -> dict:
+    async with httpx.AsyncClient(base_url=url) as http:
+        return (await http.post("/stats")).json()
+
+
+async def run(label: str, client: FacilitatorClient, url: str, args) -> None:
+    await stub_stats(url)
+    payments = [make_payment(i) for i in range(args.payments)]
+    gate = asyncio.Semaphore(args.concurrency)
+    latencies: list[float] = []
+
+    async def one(payment) -> None:
+        async with gate:
+            start = time.perf_counter()
+            result = await client.verify(*payment)
+            latencies.append(time.perf_counter() - start)
+            assert result.is_valid
+
+    start = time.perf_counter()
+    await asyncio.gather(*(one(p) for p in payments for _ in range(args.duplicates)))
+    total = time.perf_counter() - start
+    await client.close()
+    stats = await stub_stats(url)
+
+    latencies.sort()
+    print(
+        f"{label:<8} {len(latencies) / total:>8.0f} verifies/s"
+        f"  p50 {latencies[len(latencies) // 2] * 1000:>7.1f} ms"
+        f"  p99 {latencies[int(len(latencies) * 0.99)] * 1000:>7.1f} ms"
+        f"  upstream calls {stats['calls']:>5}  connections {stats['connections']:>4}"
+    )
+    if isinstance(client, PooledFacilitatorClient):
+        print(f"         {client.metrics()}")
+
+
+async def main() -> None:
+    parser = argparse.ArgumentParser(description="Facilitator client benchmark")
+    parser.add_argument("--payments", type=int, default=500)
+    parser.add_argument("--duplicates", type=int, default=2, help="concurrent verifies per payment")
+    parser.add_argument("--concurrency", type=int, default=50)
+    parser.add_argument("--latency-ms", type=float, default=20.0, help="stub facilitator verify time")
+    args = parser.parse_args()
+
+    sock = socket.socket()
+    sock.bind(("127.0.0.1", 0))
+    url = f"http://127.0.0.1:{sock.getsockname()[1]}"
+    stub = multiprocessing.get_context("fork").Process(
+        target=stub_facilitator, args=(sock, args.latency_ms / 1000), daemon=True
+    )
+    stub.start()
+    for _ in range(100):
+        try:
+            await stub_stats(url)
+            break
+        except httpx.TransportError:
+            await asyncio.sleep(0.05)
+
+    print("=" * 80)
+    print("Facilitator Client Benchmark (stub facilitator)")
+    print("=" * 80)
+    print(f"Payments: {args.payments} x {args.duplicates}  Concurrency: {args.concurrency}  "
+          f"Latency: {args.latency_ms} ms")
+    print("-" * 80)
+    await run("sdk", FacilitatorClient(url), url, args)
+    await run("pooled", PooledFacilitatorClient(url, max_connections=args.concurrency), url, args)
+    print("=" * 80)
+    stub.terminate()
+
+
+if __name__ == "__main__":
+    asyncio.run(main())
@@ -0,0 +1,124 @@
+#!/usr/bin/env python3
+"""
+Logging Benchmark
+Caller-side cost of the facilitator's /verify log lines per request:
+synchronous logging with f-string model dumps at INFO (the previous
+setup) against common.logs (queued writer, lazy payload serialization,
+optional JSON and sampling). Output goes to /dev/null; only the time
+spent in the request path is measured.
+
+Usage: python bench/bench_logging.py [--requests 20000]
+"""
+
+import argparse
+import logging
+import os
+import sys
+import time
+from pathlib import Path
+
+from bankofai.x402.types import PaymentPayload, PaymentRequirements, VerifyResponse
+
+sys.path.insert(0, str(Path(__file__).parent.parent))
+
+from common.logs import lazy_json, setup_logging, stop_logging
+
+NETWORK = "tron:nile"
+PAY_TO = "TGjgvdTWWrybVLaVeFqSyVqJQWjxqRYbaK"
+USDT = "TXYZopYRdj2D9XRtbG411XZZ3kM5VkAeBf"
+
+logger = logging.getLogger("facilitator")
+
+
+def make_payload(index: int) -> PaymentPayload:
+    requirements = PaymentRequirements(
+        scheme="exact_permit", network=NETWORK, amount="1000000", asset=USDT, payTo=PAY_TO
+    )
+    return PaymentPayload.model_validate({
+        "x402Version": 2,
+        "accepted": requirements.model_dump(by_alias=True),
+        "payload": {
+            "signature": f"0x{index:0130x}",
+            "paymentPermit": {
+                "meta": {
+                    "kind": "PAYMENT_ONLY",
+                    "paymentId": f"0x{index:032x}",
+                    "nonce": str(index),
+                    "validAfter": 0,
+                    "validBefore": int(time.time()) + 3600,
+                },
+                "buyer": "TBuyer" + str(index),
+                "caller": PAY_TO,
+                "payment": {"payToken": USDT, "payAmount": "1000000", "payTo": PAY_TO},
+                "fee": {"feeTo": PAY_TO, "feeAmount": "0"},
+            },
+        },
+    })
+
+
+def eager(payload: PaymentPayload, result: VerifyResponse) -> None:
+    logger.info(f"[VERIFY REQUEST] Payload: {payload.model_dump(by_alias=True)}")
+    logger.info(f"[VERIFY RESULT] {result.model_dump(by_alias=True)}")
+
+
+def lazy(payload: PaymentPayload, result: VerifyResponse) -> None:
+    logger.debug("[VERIFY REQUEST] Payload: %s", lazy_json(payload))
+    logger.info("[VERIFY RESULT] %s", lazy_json(result))
+
+
+def run(label: str, log_request, payloads: list[PaymentPayload]) -> None:
+    result = VerifyResponse(isValid=True)
+    start = time.perf_counter()
+    for payload in payloads:
+        log_request(payload, result)
+    per_request = (time.perf_counter() - start) / len(payloads)
+    # Drain the queue outside the measured section
+    stop_logging()
+    print(f"{label:<32} {per_request * 1e6:>8.2f} us/request in the request path")
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description="Logging benchmark")
+    parser.add_argument("--requests", type=int, default=20000)
+    args = parser.parse_args()
+
+    payloads = [make_payload(i) for i in range(args.requests)]
+    stdout = sys.stdout
+
+    print("=" * 80)
+    print("Logging Benchmark (/verify log lines)")
+    print("=" * 80)
+    print(f"Requests: {args.requests}")
+    print("-" * 80)
+
+    cases = [
+        ("sync, eager dumps at INFO", eager, None),
+        ("queued text, lazy", lazy, {"fmt": "text"}),
+        ("queued json, lazy", lazy, {"fmt": "json"}),
+        ("queued json, lazy, DEBUG", lazy, {"fmt": "json", "levels": "facilitator=DEBUG"}),
+        ("queued json, DEBUG, 1% sampled", lazy, {"fmt": "json", "levels": "facilitator=DEBUG",
+                                                   "sample": "facilitator=0.01"}),
+    ]
+    with open(os.devnull, "w") as devnull:
+        for label, log_request, options in cases:
+            logger.setLevel(logging.NOTSET)
+            if options is None:
+                logging.basicConfig(
+                    level=logging.INFO,
+                    format="%(asctime)s - %(name)s - %(levelname)s - %(message)s",
+                    stream=devnull,
+                    force=True,
+                )
+            else:
+                # setup_logging writes to sys.stdout
+                sys.stdout = devnull
+                try:
+                    setup_logging(**{"level": "INFO", "levels": "", "sample": "", **options})
+                finally:
+                    sys.stdout = stdout
+            run(label, log_request, payloads)
+    print("=" * 80)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,131 @@
+#!/usr/bin/env python3
+"""
+Render Benchmark
+Compares the original per-request render (reopen PNG, reload font, redraw)
+against the cached ImageRenderer and reports renders/sec.
+
+Usage: python bench/bench_render.py [--seconds 3]
+"""
+
+import argparse
+import asyncio
+import io
+import sys
+import time
+from pathlib import Path
+
+from PIL import Image, ImageDraw, ImageFont
+
+SERVER_DIR = Path(__file__).parent.parent / "server"
+sys.path.insert(0, str(SERVER_DIR))
+
+from executor import RenderExecutor
+from render import ImageRenderer
+
+PROTECTED_IMAGE_PATH = SERVER_DIR / "protected.png"
+
+
+def legacy_generate_protected_image(
+    text: str, text_color: tuple[int, int, int, int] = (255, 255, 0, 255)
+) -> io.BytesIO:
+    """Original implementation, kept here as the baseline"""
+    with Image.open(PROTECTED_IMAGE_PATH) as base:
+        image = base.convert("RGBA")
+        draw = ImageDraw.Draw(image)
+
+        try:
+            font = ImageFont.truetype("DejaVuSans.ttf", 50)
+        except Exception:
+            font = ImageFont.load_default()
+
+        x = 16
+        y = 16
+        padding = 6
+
+        bbox = draw.textbbox((x, y), text, font=font)
+        bg = (
+            bbox[0] - padding,
+            bbox[1] - padding,
+            bbox[2] + padding,
+            bbox[3] + padding,
+        )
+        draw.rectangle(bg, fill=(0, 0, 0, 160))
+        draw.text(
+            (x, y),
+            text,
+            fill=text_color,
+            font=font,
+            stroke_width=2,
+            stroke_fill=(0, 0, 0, 255),
+        )
+
+        buf = io.BytesIO()
+        image.save(buf, format="PNG")
+        buf.seek(0)
+        return buf
+
+
+def run(name: str, render, seconds: float) -> float:
+    """Call render repeatedly for the given duration and return renders/sec"""
+    count = 0
+    start = time.perf_counter()
+    deadline = start + seconds
+    while time.perf_counter() < deadline:
+        count += 1
+        render(f"req: {count}", (255, 255, 0, 255))
+    elapsed = time.perf_counter() - start
+    rate = count / elapsed
+    print(f"  {name:<28} {rate:>10.1f} renders/sec  ({elapsed / count * 1000:.3f} ms/render)")
+    return rate
+
+
+async def run_pool(executor: RenderExecutor, seconds: float, concurrency: int) -> float:
+    """Keep `concurrency` renders in flight on the pool and return renders/sec"""
+    count = 0
+    deadline = time.perf_counter() + seconds
+
+    async def worker():
+        nonlocal count
+        while time.perf_counter() < deadline:
+            count += 1
+            await executor.render(f"req: {count}", (255, 255, 0, 255))
+
+    start = time.perf_counter()
+    await asyncio.gather(*(worker() for _ in range(concurrency)))
+    elapsed = time.perf_counter() - start
+    rate = count / elapsed
+    name = f"{executor.mode} pool x{executor.workers}"
+    print(f"  {name:<28} {rate:>10.1f} renders/sec  (concurrency={concurrency})")
+    return rate
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("--seconds", type=float, default=3.0, help="duration per case")
+    parser.add_argument("--workers", type=int, default=None, help="pool workers (default: CPU count)")
+    args = parser.parse_args()
+
+    renderer = ImageRenderer(PROTECTED_IMAGE_PATH)
+
+    print("=" * 80)
+    print("Render Benchmark")
+    print("=" * 80)
+    print(f"Image: {PROTECTED_IMAGE_PATH} {renderer.size}")
+    print()
+    before = run("legacy (png)", legacy_generate_protected_image, args.seconds)
+    run("cached (composite only)", renderer.render, args.seconds)
+    after = run("cached (png)", renderer.render_encoded, args.seconds)
+    print()
+    print(f"Speedup (png): {after / before:.2f}x")
+    print()
+    for mode in ("thread", "process"):
+        executor = RenderExecutor(PROTECTED_IMAGE_PATH, mode=mode, workers=args.workers)
+        try:
+            asyncio.run(run_pool(executor, args.seconds, executor.workers * 2))
+        finally:
+            executor.shutdown()
+    print("=" * 80)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,99 @@
+#!/usr/bin/env python3
+"""
+Response Path Benchmark
+Sends an encoded image through the ASGI response stack both ways:
+StreamingResponse over BytesIO (previous path) and ImageResponse
+(single memoryview-backed body). Reports per-response time and the peak
+memory allocated per in-flight response.
+
+Usage: python bench/bench_response.py [--iterations 2000]
+"""
+
+import argparse
+import asyncio
+import io
+import sys
+import time
+import tracemalloc
+from pathlib import Path
+
+from fastapi.responses import StreamingResponse
+
+SERVER_DIR = Path(__file__).parent.parent / "server"
+sys.path.insert(0, str(SERVER_DIR))
+
+from render import ImageRenderer
+from responses import ImageResponse
+
+PROTECTED_IMAGE_PATH = SERVER_DIR / "protected.png"
+
+SCOPE = {"type": "http", "method": "GET", "path": "/", "headers": [], "asgi": {"spec_version": "2.4"}}
+
+
+async def receive():
+    return {"type": "http.disconnect"}
+
+
+async def send(message):
+    pass
+
+
+async def measure(name: str, make_response, iterations: int) -> None:
+    """Time the ASGI send path and record peak allocations for one response"""
+    start = time.perf_counter()
+    for _ in range(iterations):
+        await make_response()(SCOPE, receive, send)
+    elapsed = (time.perf_counter() - start) / iterations
+
+    tracemalloc.start()
+    await make_response()(SCOPE, receive, send)
+    _, peak = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    print(f"  {name:<32} {elapsed * 1e6:>9.1f} us/response  peak {peak / 1024:>8.1f} KiB")
+
+
+async def run(iterations: int) -> None:
+    renderer = ImageRenderer(PROTECTED_IMAGE_PATH)
+    image = renderer.render("req: 12345", (255, 255, 0, 255))
+
+    def legacy():
+        buf = io.BytesIO()
+        image.save(buf, format="PNG")
+        buf.seek(0)
+        return StreamingResponse(buf, media_type="image/png")
+
+    def single():
+        buf = io.BytesIO()
+        image.save(buf, format="PNG")
+        return ImageResponse(buf.getbuffer(), "image/png")
+
+    body = renderer.render_encoded("req: 12345")
+    print(f"Body: {len(body)} bytes")
+    print()
+    print("Including encode:")
+    await measure("StreamingResponse(BytesIO)", legacy, max(iterations // 100, 5))
+    await measure("ImageResponse(memoryview)", single, max(iterations // 100, 5))
+    print()
+    print("Response path only (pre-encoded body):")
+    await measure(
+        "StreamingResponse(BytesIO)",
+        lambda: StreamingResponse(io.BytesIO(body), media_type="image/png"),
+        iterations,
+    )
+    await measure("ImageResponse(memoryview)", lambda: ImageResponse(body, "image/png"), iterations)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("--iterations", type=int, default=2000, help="responses per case")
+    args = parser.parse_args()
+
+    print("=" * 80)
+    print("Response Path Benchmark")
+    print("=" * 80)
+    asyncio.run(run(args.iterations))
+    print("=" * 80)
+
+
+if __name__ == "__main__":
+    main()
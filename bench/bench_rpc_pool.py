@@ -0,0 +1,169 @@
+#!/usr/bin/env python3
+"""
+RPC Pool Benchmark
+Starts local stub JSON-RPC nodes in a child process (each with its own
+latency, latency spikes, error rate and block lag) and sends the same reads
+once to the default node alone and once through an RpcPool over all of
+them: latency percentiles, failed reads, hedges and failovers.
+
+Usage: python bench/bench_rpc_pool.py [--reads 2000] [--concurrency 16]
+"""
+
+import argparse
+import asyncio
+import json
+import multiprocessing
+import random
+import sys
+import time
+from pathlib import Path
+
+ROOT = Path(__file__).parent.parent
+sys.path.insert(0, str(ROOT))
+sys.path.insert(0, str(ROOT / "facilitator"))
+
+from rpc_pool import RpcPool
+
+NETWORK = "eip155:97"
+BASE_PORT = 18545
+BLOCK_SECONDS = 3.0
+
+# name: (latency s, spike probability, spike latency s, error probability, blocks behind)
+NODES = {
+    "default": (0.020, 0.05, 0.400, 0.02, 0),
+    "fast": (0.008, 0.01, 0.200, 0.00, 0),
+    "tailed": (0.015, 0.10, 0.500, 0.00, 0),
+    "flaky": (0.010, 0.00, 0.000, 0.30, 0),
+    "lagging": (0.005, 0.00, 0.000, 0.00, 20),
+}
+
+
+async def _serve_node(port: int, profile: tuple, seed: int) -> None:
+    latency, spike_p, spike, error_p, lag = profile
+    rng = random.Random(seed)
+    start = time.time()
+
+    async def handle(reader: asyncio.StreamReader, writer: asyncio.StreamWriter) -> None:
+        try:
+            while True:  # keep-alive: one request after another
+                head = await reader.readuntil(b"\r\n\r\n")
+                length = 0
+                for line in head.split(b"\r\n"):
+                    if line.lower().startswith(b"content-length:"):
+                        length = int(line.split(b":")[1])
+                request = json.loads(await reader.readexactly(length))
+                await asyncio.sleep(spike if rng.random() < spike_p else latency)
+                if rng.random() < error_p:
+                    status, body = "503 Service Unavailable", b"{}"
+                else:
+                    if request["method"] == "eth_blockNumber":
+                        result = hex(1000 + int((time.time() - start) / BLOCK_SECONDS) - lag)
+                    else:
+                        result = "0x" + "00" * 32
+                    status = "200 OK"
+                    body = json.dumps({"jsonrpc": "2.0", "id": request["id"], "result": result}).encode()
+                writer.write(
+                    f"HTTP/1.1 {status}\r\nContent-Type: application/json\r\nContent-Length: {len(body)}\r\n\r\n".encode()
+                    + body
+                )
+                await writer.drain()
+        except (asyncio.IncompleteReadError, ConnectionError):
+            writer.close()
+
+    server = await asyncio.start_server(handle, "127.0.0.1", port)
+    async with server:
+        await server.serve_forever()
+
+
+def run_nodes() -> None:
+    async def serve_all() -> None:
+        await asyncio.gather(*(
+            _serve_node(BASE_PORT + index, profile, index) for index, profile in enumerate(NODES.values())
+        ))
+
+    asyncio.run(serve_all())
+
+
+def node_url(name: str) -> str:
+    return f"http://127.0.0.1:{BASE_PORT + list(NODES).index(name)}/"
+
+
+async def run(label: str, pool: RpcPool, reads: int, concurrency: int) -> None:
+    await pool.probe()
+    monitor = asyncio.create_task(pool.monitor(1.0))
+    latencies: list[float] = []
+    errors = 0
+    semaphore = asyncio.Semaphore(concurrency)
+
+    async def one(index: int) -> None:
+        nonlocal errors
+        body = json.dumps({"jsonrpc": "2.0", "id": index, "method": "eth_call", "params": [{}, "latest"]}).encode()
+        async with semaphore:
+            start = time.perf_counter()
+            try:
+                await pool.json_rpc("eth_call", body)
+            except Exception:
+                errors += 1
+                return
+            latencies.append(time.perf_counter() - start)
+
+    start = time.perf_counter()
+    await asyncio.gather(*(one(index) for index in range(reads)))
+    elapsed = time.perf_counter() - start
+    monitor.cancel()
+
+    latencies.sort()
+
+    def pct(p: float) -> float:
+        return latencies[min(len(latencies) - 1, int(len(latencies) * p))] * 1000 if latencies else 0.0
+
+    metrics = pool.metrics()
+    print(f"{label}")
+    print(
+        f"  p50 {pct(0.50):7.1f} ms   p90 {pct(0.90):7.1f} ms   p99 {pct(0.99):7.1f} ms   "
+        f"max {pct(1.0):7.1f} ms   failed {errors}/{reads}   {reads / elapsed:,.0f} reads/s"
+    )
+    print(f"  hedged {metrics['hedged']} (won {metrics['hedge_wins']})   failovers {metrics['failovers']}")
+    for endpoint in metrics["endpoints"]:
+        name = next(name for name in NODES if node_url(name).startswith(endpoint["endpoint"]))
+        print(
+            f"    {name:8} requests {endpoint['requests']:5}  errors {endpoint['errors']:4}  "
+            f"avg {endpoint['latency_ms']} ms  available {endpoint['available']}  lagging {endpoint['lagging']}"
+        )
+    await pool.close()
+
+
+async def main() -> None:
+    parser = argparse.ArgumentParser(description="RPC pool benchmark")
+    parser.add_argument("--reads", type=int, default=2000)
+    parser.add_argument("--concurrency", type=int, default=16)
+    args = parser.parse_args()
+
+    nodes = multiprocessing.get_context("spawn").Process(target=run_nodes, daemon=True)
+    nodes.start()
+    await asyncio.sleep(1.0)
+
+    print("=" * 80)
+    print("RPC Pool Benchmark (stub JSON-RPC nodes)")
+    print("=" * 80)
+    for name, (latency, spike_p, spike, error_p, lag) in NODES.items():
+        print(
+            f"  {name:8} {latency * 1000:.0f} ms, {spike_p:.0%} spikes of {spike * 1000:.0f} ms, "
+            f"{error_p:.0%} errors, {lag} blocks behind"
+        )
+    print(f"Reads: {args.reads}  Concurrency: {args.concurrency}")
+    print("-" * 80)
+    await run("Default node only", RpcPool(NETWORK, [node_url("default")], hedge=False), args.reads, args.concurrency)
+    print("-" * 80)
+    await run(
+        "Pool without hedging", RpcPool(NETWORK, [node_url(name) for name in NODES], hedge=False),
+        args.reads, args.concurrency,
+    )
+    print("-" * 80)
+    await run("Pool", RpcPool(NETWORK, [node_url(name) for name in NODES]), args.reads, args.concurrency)
+    print("=" * 80)
+    nodes.terminate()
+
+
+if __name__ == "__main__":
+    asyncio.run(main())
@@ -0,0 +1,231 @@
+#!/usr/bin/env python3
+"""
+Settlement Batching Benchmark
+Settles payments against an in-process EVM chain stub (nonce rules, block
+interval, receipts) through the facilitator's real signer and account lock,
+once settle-by-settle and once through the SettleBatcher.
+
+Usage: python bench/bench_settle_batch.py [--settles 64] [--block-ms 250] [--window-ms 250]
+"""
+
+import argparse
+import asyncio
+import hashlib
+import json
+import sys
+import tempfile
+import time
+from pathlib import Path
+
+from bankofai.x402.facilitator import X402Facilitator
+from bankofai.x402.types import PaymentPayload, PaymentRequirements, SettleResponse
+from bankofai.x402.utils.address import checksum_evm_address
+
+FACILITATOR_DIR = Path(__file__).parent.parent / "facilitator"
+sys.path.insert(0, str(FACILITATOR_DIR))
+
+from account_lock import AccountLock, AccountLockedMechanism
+from settle_batcher import PipelinedEvmSigner, SettleBatcher, SettleTarget
+
+NETWORK = "eip155:97"
+FACILITATOR_ADDRESS = checksum_evm_address("0x" + "11" * 20)
+TOKEN = checksum_evm_address("0x" + "22" * 20)
+PAY_TO = checksum_evm_address("0x" + "33" * 20)
+
+
+class StubChain:
+    """Single-account EVM chain: strict nonces, fixed block interval, instant receipts"""
+
+    def __init__(self, block_seconds: float) -> None:
+        self.block_seconds = block_seconds
+        self.block_number = 0
+        self.confirmed = 0                     # nonces below this are mined
+        self.pending: dict[int, bytes] = {}    # nonce -> tx hash
+        self.receipts: dict[bytes, dict] = {}
+        self.blocks_with_txs: list[int] = []
+        self.rejected = 0
+        self.eth = self
+
+    async def mine(self) -> None:
+        while True:
+            await asyncio.sleep(self.block_seconds)
+            self.block_number += 1
+            mined = 0
+            while self.confirmed in self.pending:
+                tx_hash = self.pending.pop(self.confirmed)
+                self.receipts[tx_hash] = {"blockNumber": self.block_number, "status": 1}
+                self.confirmed += 1
+                mined += 1
+            if mined:
+                self.blocks_with_txs.append(mined)
+
+    # -- the subset of AsyncWeb3.eth the signer uses --------------------------
+
+    @property
+    def chain_id(self):
+        async def value():
+            return 97
+        return value()
+
+    async def get_transaction_count(self, address: str, block: str = "latest") -> int:
+        await asyncio.sleep(0.002)
+        if block != "pending":
+            return self.confirmed
+        nonce = self.confirmed
+        while nonce in self.pending:
+            nonce += 1
+        return nonce
+
+    def contract(self, address: str, abi) -> "StubContract":
+        return StubContract(address)
+
+    async def send_raw_transaction(self, raw: bytes) -> bytes:
+        await asyncio.sleep(0.002)
+        nonce = json.loads(raw)["nonce"]
+        if nonce < self.confirmed or nonce in self.pending:
+            self.rejected += 1
+            raise ValueError(f"nonce too low: {nonce}")
+        tx_hash = hashlib.sha256(raw).digest()
+        self.pending[nonce] = tx_hash
+        return tx_hash
+
+    async def wait_for_transaction_receipt(self, tx_hash, timeout: int = 120) -> dict:
+        tx_hash = bytes.fromhex(tx_hash) if isinstance(tx_hash, str) else tx_hash
+        while tx_hash not in self.receipts:
+            await asyncio.sleep(self.block_seconds / 10)
+        return self.receipts[tx_hash]
+
+
+class StubContract:
+    def __init__(self, address: str) -> None:
+        self.functions = self
+        self.address = address
+
+    def __getattr__(self, method: str):
+        def call(*args):
+            return StubCall(self.address, method)
+        return call
+
+
+class StubCall:
+    def __init__(self, address: str, method: str) -> None:
+        self.address = address
+        self.method = method
+
+    async def build_transaction(self, params: dict) -> dict:
+        await asyncio.sleep(0.002)  # gas estimation round trip
+        return {**params, "to": self.address, "data": self.method, "gas": 90_000}
+
+
+class StubWallet:
+    async def sign_transaction(self, tx: dict) -> str:
+        return json.dumps(tx, sort_keys=True).encode().hex()
+
+
+class StubSettleMechanism:
+    """exact scheme: one contract call per settle, then wait for the receipt"""
+
+    def __init__(self, signer: PipelinedEvmSigner, verify_seconds: float) -> None:
+        self._signer = signer
+        self.verify_seconds = verify_seconds
+
+    def scheme(self) -> str:
+        return "exact"
+
+    async def settle(self, payload, requirements) -> SettleResponse:
+        await asyncio.sleep(self.verify_seconds)
+        tx_hash = await self._signer.write_contract(
+            requirements.asset, [], "transferWithAuthorization", [], requirements.network
+        )
+        receipt = await self._signer.wait_for_transaction_receipt(tx_hash, network=requirements.network)
+        return SettleResponse(
+            success=receipt["status"] == "confirmed", transaction=tx_hash, network=requirements.network
+        )
+
+
+def make_payment(index: int) -> tuple[PaymentPayload, PaymentRequirements]:
+    requirements = PaymentRequirements(
+        scheme="exact", network=NETWORK, amount="1000", asset=TOKEN, payTo=PAY_TO
+    )
+    payload = PaymentPayload.model_validate({
+        "x402Version": 2,
+        "accepted": requirements.model_dump(by_alias=True),
+        "payload": {"signature": f"0x{index:0130x}"},
+    })
+    return payload, requirements
+
+
+async def run(label: str, args, batched: bool) -> None:
+    chain = StubChain(args.block_ms / 1000)
+    miner = asyncio.create_task(chain.mine())
+
+    signer = PipelinedEvmSigner(StubWallet())
+    signer.set_address(FACILITATOR_ADDRESS)
+    signer._async_web3_clients[NETWORK] = chain
+    lock = AccountLock(NETWORK, FACILITATOR_ADDRESS, Path(tempfile.mkdtemp()))
+    facilitator = X402Facilitator().register(
+        [NETWORK], AccountLockedMechanism(StubSettleMechanism(signer, args.verify_ms / 1000), lock)
+    )
+
+    if batched:
+        batcher = SettleBatcher(
+            facilitator.settle,
+            {NETWORK: [SettleTarget(lock, signer)]},
+            window=args.window_ms / 1000,
+            max_size=args.batch_size,
+        )
+        settle = batcher.submit
+    else:
+        settle = facilitator.settle
+
+    latencies: list[float] = []
+
+    async def one(index: int) -> SettleResponse:
+        # Spread arrivals over --arrival-ms like independent clients
+        await asyncio.sleep(args.arrival_ms / 1000 * index / args.settles)
+        start = time.perf_counter()
+        result = await settle(*make_payment(index))
+        latencies.append(time.perf_counter() - start)
+        return result
+
+    start = time.perf_counter()
+    results = await asyncio.gather(*(one(i) for i in range(args.settles)))
+    total = time.perf_counter() - start
+    miner.cancel()
+
+    latencies.sort()
+    ok = sum(r.success for r in results)
+    print(
+        f"{label:<10} {args.settles / total:>8.1f} settles/s"
+        f"  p50 {latencies[len(latencies) // 2] * 1000:>8.1f} ms"
+        f"  p99 {latencies[int(len(latencies) * 0.99)] * 1000:>8.1f} ms"
+        f"  ok {ok}/{args.settles}  blocks {len(chain.blocks_with_txs)}"
+        f"  nonce errors {chain.rejected}"
+    )
+    if batched:
+        print(f"           {batcher.metrics()}")
+
+
+async def main() -> None:
+    parser = argparse.ArgumentParser(description="Settlement batching benchmark")
+    parser.add_argument("--settles", type=int, default=64)
+    parser.add_argument("--block-ms", type=float, default=250.0, help="stub chain block interval")
+    parser.add_argument("--verify-ms", type=float, default=20.0, help="verify cost inside settle")
+    parser.add_argument("--arrival-ms", type=float, default=500.0, help="spread of request arrivals")
+    parser.add_argument("--window-ms", type=float, default=250.0)
+    parser.add_argument("--batch-size", type=int, default=32)
+    args = parser.parse_args()
+
+    print("=" * 80)
+    print("Settlement Batching Benchmark (stub chain)")
+    print("=" * 80)
+    print(f"Settles: {args.settles}  Block: {args.block_ms} ms  Window: {args.window_ms} ms  "
+          f"Batch size: {args.batch_size}")
+    print("-" * 80)
+    await run("sequential", args, batched=False)
+    await run("batched", args, batched=True)
+    print("=" * 80)
+
+
+if __name__ == "__main__":
+    asyncio.run(main())
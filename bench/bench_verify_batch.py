@@ -0,0 +1,150 @@
+#!/usr/bin/env python3
+"""
+Batch Verify Benchmark
+Verifies real, signed exact_permit payments through the SDK's EVM
+facilitator mechanism: once with signature recovery on the event loop
+(the SDK default) and once through a SignaturePool of --workers
+processes, as /verify/batch does. A ticker task measures how long the
+event loop is blocked in each mode.
+
+Usage: python bench/bench_verify_batch.py [--payments 400] [--workers 4]
+"""
+
+import argparse
+import asyncio
+import logging
+import os
+import sys
+import time
+from pathlib import Path
+
+from bankofai.x402.abi import (
+    PAYMENT_PERMIT_PRIMARY_TYPE,
+    get_payment_permit_eip712_types,
+)
+from bankofai.x402.config import NetworkConfig
+from bankofai.x402.facilitator import X402Facilitator
+from bankofai.x402.mechanisms.evm.exact_permit import ExactPermitEvmFacilitatorMechanism
+from bankofai.x402.tokens import TokenRegistry
+from bankofai.x402.types import PaymentPayload, PaymentRequirements
+from bankofai.x402.utils import convert_permit_to_eip712_message
+from eth_account import Account
+
+ROOT = Path(__file__).parent.parent
+sys.path.insert(0, str(ROOT))
+sys.path.insert(0, str(ROOT / "facilitator"))
+
+from service import FacilitatorService
+from signature_pool import PooledVerifySigner, SignaturePool, recover_typed_data
+
+NETWORK = NetworkConfig.BSC_TESTNET
+FACILITATOR = Account.create()
+PAY_TO = Account.create().address
+USDT = TokenRegistry.get_network_tokens(NETWORK)["USDT"].address
+FEE = 100
+
+
+class OfflineSigner:
+    """Facilitator signer with the SDK's in-line signature check and no chain access"""
+
+    def get_address(self) -> str:
+        return FACILITATOR.address
+
+    async def verify_typed_data(self, address, domain, types, message, signature, primary_type) -> bool:
+        recovered = recover_typed_data(types, primary_type, domain, message, signature)
+        return recovered is not None and recovered.lower() == address.lower()
+
+
+def signed_payment(index: int) -> tuple[PaymentPayload, PaymentRequirements]:
+    buyer = Account.create()
+    requirements = PaymentRequirements(
+        scheme="exact_permit", network=NETWORK, amount="1000", asset=USDT, payTo=PAY_TO
+    )
+    permit = {
+        "meta": {
+            "kind": "PAYMENT_ONLY",
+            "paymentId": f"0x{index:032x}",
+            "nonce": str(index),
+            "validAfter": 0,
+            "validBefore": int(time.time()) + 3600,
+        },
+        "buyer": buyer.address,
+        "caller": FACILITATOR.address,
+        "payment": {"payToken": USDT, "payAmount": "1000", "payTo": PAY_TO},
+        "fee": {"feeTo": FACILITATOR.address, "feeAmount": str(FEE)},
+    }
+    payload = PaymentPayload.model_validate({
+        "x402Version": 2,
+        "accepted": requirements.model_dump(by_alias=True),
+        "payload": {"signature": "0x", "paymentPermit": permit},
+    })
+    typed_data = {
+        "types": get_payment_permit_eip712_types(),
+        "primaryType": PAYMENT_PERMIT_PRIMARY_TYPE,
+        "domain": {
+            "name": "PaymentPermit",
+            "chainId": NetworkConfig.get_chain_id(NETWORK),
+            "verifyingContract": NetworkConfig.get_payment_permit_address(NETWORK),
+        },
+        "message": convert_permit_to_eip712_message(payload.payload.payment_permit),
+    }
+    signature = Account.sign_typed_data(buyer.key, full_message=typed_data).signature.hex()
+    payload.payload.signature = signature if signature.startswith("0x") else "0x" + signature
+    return payload, requirements
+
+
+def make_service(signer) -> FacilitatorService:
+    mechanism = ExactPermitEvmFacilitatorMechanism(signer, base_fee={"USDT": FEE})
+    return FacilitatorService(X402Facilitator().register([NETWORK], mechanism))
+
+
+async def run(label: str, service: FacilitatorService, payments) -> None:
+    worst_stall = 0.0
+    stop = asyncio.Event()
+
+    async def ticker():
+        nonlocal worst_stall
+        while not stop.is_set():
+            before = time.perf_counter()
+            await asyncio.sleep(0.001)
+            worst_stall = max(worst_stall, time.perf_counter() - before - 0.001)
+
+    tick = asyncio.create_task(ticker())
+    start = time.perf_counter()
+    results = await service.verify_batch(payments)
+    total = time.perf_counter() - start
+    stop.set()
+    await tick
+    assert all(result.is_valid for result in results), results[:3]
+    print(
+        f"{label:<24} {len(payments) / total:>8.0f} verifies/s"
+        f"  longest event loop stall {worst_stall * 1000:>7.1f} ms"
+    )
+
+
+async def main() -> None:
+    parser = argparse.ArgumentParser(description="Batch verify benchmark")
+    parser.add_argument("--payments", type=int, default=400)
+    parser.add_argument("--workers", type=int, default=os.cpu_count() or 1)
+    args = parser.parse_args()
+    logging.disable(logging.INFO)  # the SDK logs every verify at INFO
+
+    print("=" * 80)
+    print("Batch Verify Benchmark (exact_permit, EVM)")
+    print("=" * 80)
+    payments = [signed_payment(i) for i in range(args.payments)]
+    print(f"Payments: {args.payments}  Pool workers: {args.workers}  CPUs: {os.cpu_count()}")
+    print("-" * 80)
+
+    await run("event loop", make_service(OfflineSigner()), payments)
+
+    pool = SignaturePool(args.workers)
+    # Start every process before timing (they are spawned on demand)
+    await asyncio.gather(*(pool.recover({}, "", {}, {}, "0x") for _ in range(args.workers * 4)))
+    await run(f"process pool ({args.workers})", make_service(PooledVerifySigner(OfflineSigner(), pool)), payments)
+    pool.close()
+    print("=" * 80)
+
+
+if __name__ == "__main__":
+    asyncio.run(main())
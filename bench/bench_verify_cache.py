@@ -0,0 +1,147 @@
+#!/usr/bin/env python3
+"""
+Verify Cache Benchmark
+Replays a pool of payment payloads through X402Facilitator.verify with and
+without the verify cache. The mechanism is a stub whose verify sleeps for
+--rpc-ms, standing in for signature recovery plus balance/allowance RPCs.
+
+Usage: python bench/bench_verify_cache.py [--requests 2000] [--unique 200] [--rpc-ms 80]
+"""
+
+import argparse
+import asyncio
+import random
+import sys
+import time
+from pathlib import Path
+
+from bankofai.x402.facilitator import X402Facilitator
+from bankofai.x402.types import (
+    PaymentPayload,
+    PaymentRequirements,
+    SettleResponse,
+    VerifyResponse,
+)
+
+FACILITATOR_DIR = Path(__file__).parent.parent / "facilitator"
+sys.path.insert(0, str(FACILITATOR_DIR))
+
+from verify_cache import VerifyCache
+
+NETWORK = "tron:nile"
+PAY_TO = "TGjgvdTWWrybVLaVeFqSyVqJQWjxqRYbaK"
+USDT = "TXYZopYRdj2D9XRtbG411XZZ3kM5VkAeBf"
+
+
+class StubMechanism:
+    """exact_permit mechanism whose verify costs a fixed RPC round trip"""
+
+    def __init__(self, rpc_seconds: float) -> None:
+        self.rpc_seconds = rpc_seconds
+        self.calls = 0
+
+    def scheme(self) -> str:
+        return "exact_permit"
+
+    async def verify(self, payload, requirements) -> VerifyResponse:
+        self.calls += 1
+        await asyncio.sleep(self.rpc_seconds)
+        return VerifyResponse(isValid=True)
+
+    async def settle(self, payload, requirements) -> SettleResponse:
+        return SettleResponse(success=True, network=requirements.network)
+
+
+def make_payment(index: int) -> tuple[PaymentPayload, PaymentRequirements]:
+    requirements = PaymentRequirements(
+        scheme="exact_permit", network=NETWORK, amount="1000000", asset=USDT, payTo=PAY_TO
+    )
+    payload = PaymentPayload.model_validate({
+        "x402Version": 2,
+        "accepted": requirements.model_dump(by_alias=True),
+        "payload": {
+            "signature": f"0x{index:0130x}",
+            "paymentPermit": {
+                "meta": {
+                    "kind": "PAYMENT_ONLY",
+                    "paymentId": f"0x{index:032x}",
+                    "nonce": str(index),
+                    "validAfter": 0,
+                    "validBefore": int(time.time()) + 3600,
+                },
+                "buyer": "TBuyer" + str(index),
+                "caller": PAY_TO,
+                "payment": {"payToken": USDT, "payAmount": "1000000", "payTo": PAY_TO},
+                "fee": {"feeTo": PAY_TO, "feeAmount": "0"},
+            },
+        },
+    })
+    return payload, requirements
+
+
+async def run(traffic, concurrency: int, verify) -> tuple[float, list[float]]:
+    """Send the traffic with at most ``concurrency`` verifies in flight"""
+    semaphore = asyncio.Semaphore(concurrency)
+    latencies: list[float] = []
+
+    async def one(payload, requirements):
+        async with semaphore:
+            start = time.perf_counter()
+            await verify(payload, requirements)
+            latencies.append(time.perf_counter() - start)
+
+    start = time.perf_counter()
+    await asyncio.gather(*(one(p, r.model_copy()) for p, r in traffic))
+    return time.perf_counter() - start, sorted(latencies)
+
+
+def report(label: str, total: float, latencies: list[float], rpc_calls: int) -> None:
+    def pct(p: float) -> float:
+        return latencies[min(int(len(latencies) * p), len(latencies) - 1)] * 1000
+
+    print(
+        f"{label:<10} {len(latencies) / total:>10.0f} req/s"
+        f"  p50 {pct(0.50):>7.2f} ms  p99 {pct(0.99):>7.2f} ms  rpc calls {rpc_calls}"
+    )
+
+
+async def main() -> None:
+    parser = argparse.ArgumentParser(description="Verify cache benchmark")
+    parser.add_argument("--requests", type=int, default=2000)
+    parser.add_argument("--unique", type=int, default=200, help="distinct payloads (rest are replays)")
+    parser.add_argument("--rpc-ms", type=float, default=80.0, help="simulated verify cost")
+    parser.add_argument("--concurrency", type=int, default=64)
+    args = parser.parse_args()
+
+    payments = [make_payment(i) for i in range(args.unique)]
+    rng = random.Random(0)
+    traffic = [payments[i % args.unique] for i in range(args.unique)]
+    traffic += [rng.choice(payments) for _ in range(args.requests - args.unique)]
+    rng.shuffle(traffic)
+
+    print("=" * 80)
+    print("Verify Cache Benchmark")
+    print("=" * 80)
+    print(f"Requests: {args.requests}  Unique payloads: {args.unique}  "
+          f"Replay ratio: {1 - args.unique / args.requests:.0%}")
+    print(f"Simulated verify cost: {args.rpc_ms} ms  Concurrency: {args.concurrency}")
+    print("-" * 80)
+
+    mechanism = StubMechanism(args.rpc_ms / 1000)
+    facilitator = X402Facilitator().register([NETWORK], mechanism)
+    total, latencies = await run(traffic, args.concurrency, facilitator.verify)
+    report("uncached", total, latencies, mechanism.calls)
+
+    mechanism.calls = 0
+    cache = VerifyCache()
+    total, latencies = await run(
+        traffic, args.concurrency, lambda p, r: cache.verify(facilitator, p, r)
+    )
+    report("cached", total, latencies, mechanism.calls)
+    print("-" * 80)
+    print(f"Cache: {cache.metrics()}")
+    print("=" * 80)
+
+
+if __name__ == "__main__":
+    asyncio.run(main())
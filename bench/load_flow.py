@@ -0,0 +1,377 @@
+#!/usr/bin/env python3
+"""
+Payment Flow Load Test
+Drives the whole 402 flow -- challenge, client signing, facilitator
+verify/settle, image render -- with configurable concurrency, paid/unpaid
+mix and network/token mix.
+
+The real resource server app (server/main.py) runs in a child process with
+the real facilitator mechanisms in-process (LocalFacilitatorClient). Only
+the chain is stubbed: balances and allowances always suffice, transactions
+are accepted and mined every --block-ms. Clients sign with throwaway keys.
+Server-side stage durations come from the Server-Timing header.
+
+Usage: python bench/load_flow.py [--requests 500] [--concurrency 16] [--paid-ratio 0.5]
+           [--mix /protected-nile:USDT=2,/protected-nile:USDD=1,/protected-bsc-testnet:USDT=1]
+"""
+
+import argparse
+import asyncio
+import hashlib
+import logging
+import multiprocessing
+import os
+import random
+import socket
+import sys
+import time
+from collections import Counter, defaultdict
+from pathlib import Path
+
+import httpx
+import uvicorn
+from bankofai.x402.clients import X402Client
+from bankofai.x402.encoding import decode_payment_payload, encode_payment_payload
+from bankofai.x402.facilitator import X402Facilitator
+from bankofai.x402.mechanisms.evm.exact import (
+    ExactEvmClientMechanism,
+    ExactEvmFacilitatorMechanism,
+)
+from bankofai.x402.mechanisms.evm.exact_permit import (
+    ExactPermitEvmClientMechanism,
+    ExactPermitEvmFacilitatorMechanism,
+)
+from bankofai.x402.mechanisms.tron.exact_permit import (
+    ExactPermitTronClientMechanism,
+    ExactPermitTronFacilitatorMechanism,
+)
+from bankofai.x402.signers.client import EvmClientSigner, TronClientSigner
+from bankofai.x402.signers.facilitator import (
+    EvmFacilitatorSigner,
+    TronFacilitatorSigner,
+)
+from bankofai.x402.tokens import TokenRegistry
+from bankofai.x402.types import PaymentRequired, PaymentRequirements
+
+ROOT = Path(__file__).parent.parent
+sys.path.insert(0, str(ROOT))
+sys.path.insert(0, str(ROOT / "facilitator"))
+sys.path.insert(0, str(ROOT / "server"))
+
+from local_facilitator import LocalFacilitatorClient, load_facilitator_main
+from service import FacilitatorService
+from verify_cache import VerifyCache
+
+# Throwaway keys: nothing here ever reaches a real chain
+CLIENT_TRON_KEY = hashlib.sha256(b"x402-load-client-tron").hexdigest()
+CLIENT_EVM_KEY = hashlib.sha256(b"x402-load-client-evm").hexdigest()
+FACILITATOR_TRON_KEY = hashlib.sha256(b"x402-load-facilitator-tron").hexdigest()
+FACILITATOR_EVM_KEY = hashlib.sha256(b"x402-load-facilitator-evm").hexdigest()
+PAY_TO_ADDRESS = "TGjgvdTWWrybVLaVeFqSyVqJQWjxqRYbaK"
+BSC_PAY_TO_ADDRESS = "0x3333333333333333333333333333333333333333"
+
+PAYMENT_REQUIRED_HEADER = "PAYMENT-REQUIRED"
+PAYMENT_SIGNATURE_HEADER = "PAYMENT-SIGNATURE"
+STAGES = ["challenge", "sign", "fee_quote", "verify", "settle", "render", "paid"]
+DEFAULT_MIX = "/protected-nile:USDT=2,/protected-nile:USDD=1,/protected-bsc-testnet:USDT=1"
+
+
+class StubChain:
+    """Accepts every transaction and mines them on a fixed block interval"""
+
+    def __init__(self, block_seconds: float) -> None:
+        self.block_seconds = block_seconds
+        self.transactions: dict[str, int] = {}  # tx hash -> block it is mined in
+
+    def _block(self) -> int:
+        return int(time.monotonic() / self.block_seconds) if self.block_seconds > 0 else 0
+
+    def submit(self) -> str:
+        tx_hash = os.urandom(32).hex()
+        self.transactions[tx_hash] = self._block() + 1
+        return tx_hash
+
+    async def receipt(self, tx_hash: str) -> dict:
+        block = self.transactions[tx_hash]
+        delay = block * self.block_seconds - time.monotonic()
+        if delay > 0:
+            await asyncio.sleep(delay)
+        return {"status": "confirmed", "blockNumber": block, "txHash": tx_hash}
+
+
+class StubChainSigner:
+    """Facilitator signer mixin: transactions go to the stub chain, not an RPC node"""
+
+    chain: StubChain
+
+    async def check_balance(self, *args, **kwargs) -> int:
+        return 10**30
+
+    async def write_contract(self, contract_address, abi, method, args, network) -> str:
+        return self.chain.submit()
+
+    async def wait_for_transaction_receipt(self, tx_hash, *args, **kwargs) -> dict:
+        return await self.chain.receipt(tx_hash)
+
+
+class StubTronFacilitatorSigner(StubChainSigner, TronFacilitatorSigner):
+    pass
+
+
+class StubEvmFacilitatorSigner(StubChainSigner, EvmFacilitatorSigner):
+    pass
+
+
+class FundedClientSigner:
+    """Client signer mixin: every balance and allowance check passes"""
+
+    async def check_balance(self, *args, **kwargs) -> int:
+        return 10**30
+
+    async def check_allowance(self, *args, **kwargs) -> int:
+        return 10**30
+
+    async def ensure_allowance(self, *args, **kwargs) -> bool:
+        return True
+
+
+class FundedTronClientSigner(FundedClientSigner, TronClientSigner):
+    pass
+
+
+class FundedEvmClientSigner(FundedClientSigner, EvmClientSigner):
+    pass
+
+
+def stub_facilitator_service(chain: StubChain) -> FacilitatorService:
+    """The facilitator's mechanisms and fees (facilitator/main.py) on the stub chain"""
+    config = load_facilitator_main()
+    tron_signer = StubTronFacilitatorSigner.from_private_key(FACILITATOR_TRON_KEY)
+    evm_signer = StubEvmFacilitatorSigner.from_private_key(FACILITATOR_EVM_KEY)
+    tron_signer.chain = evm_signer.chain = chain
+
+    facilitator = X402Facilitator()
+    facilitator.register(
+        [f"tron:{network}" for network in config.TRON_NETWORKS],
+        ExactPermitTronFacilitatorMechanism(tron_signer, base_fee=config.TRON_BASE_FEE),
+    )
+    for network, base_fee in [
+        (config.NetworkConfig.BSC_TESTNET, config.BSC_BASE_FEE),
+        (config.NetworkConfig.BSC_MAINNET, config.BSC_MAINNET_BASE_FEE),
+    ]:
+        facilitator.register(
+            [network],
+            ExactPermitEvmFacilitatorMechanism(
+                evm_signer, fee_to=evm_signer.get_address(), base_fee=base_fee
+            ),
+        )
+        facilitator.register([network], ExactEvmFacilitatorMechanism(evm_signer))
+    return FacilitatorService(facilitator, verify_cache=VerifyCache())
+
+
+def serve_stack(sock: socket.socket, block_seconds: float) -> None:
+    """Child process: the resource server app with the facilitator in-process"""
+    import main as server_main
+    from bankofai.x402.fastapi.middleware import X402Middleware
+
+    chain = StubChain(block_seconds)
+
+    if hasattr(X402Middleware, "_verify_transaction_on_chain"):
+        from bankofai.x402.utils.tx_verification import TransactionVerificationResult
+
+        async def verify_on_stub_chain(self, tx_hash, payload, requirements, network):
+            return TransactionVerificationResult(
+                success=tx_hash in chain.transactions, tx_hash=tx_hash, status_verified=True
+            )
+
+        # The server looks settled transactions up on the chain too
+        X402Middleware._verify_transaction_on_chain = verify_on_stub_chain
+
+    facilitator = LocalFacilitatorClient(stub_facilitator_service(chain), facilitator_id="stub-chain")
+    app = server_main.create_app(facilitator=facilitator)
+    logging.disable(logging.INFO)  # per-request SDK logging would dominate the measurement
+    uvicorn.run(app, fd=sock.fileno(), log_level="warning", access_log=False)
+
+
+def make_client() -> X402Client:
+    """Client with the same mechanisms as client/python/main.py, on throwaway keys"""
+    tron_signer = FundedTronClientSigner.from_private_key(CLIENT_TRON_KEY)
+    evm_signer = FundedEvmClientSigner.from_private_key(CLIENT_EVM_KEY)
+    client = X402Client()
+    client.register("tron:*", ExactPermitTronClientMechanism(tron_signer))
+    client.register("eip155:*", ExactPermitEvmClientMechanism(evm_signer))
+    client.register("eip155:*", ExactEvmClientMechanism(evm_signer))
+    return client
+
+
+def parse_mix(text: str) -> list[tuple[tuple[str, str], float]]:
+    """'/path:TOKEN=weight,...' -> [((path, token), weight), ...]"""
+    mix = []
+    for item in text.split(","):
+        target, _, weight = item.strip().partition("=")
+        path, _, token = target.partition(":")
+        if not path.startswith("/") or not token:
+            raise ValueError(f"Invalid mix entry: {item!r} (expected /path:TOKEN=weight)")
+        mix.append(((path, token.upper()), float(weight or 1)))
+    return mix
+
+
+def token_selector(token: str):
+    """Pick the offered payment option for ``token``"""
+    def select(accepts: list[PaymentRequirements]) -> PaymentRequirements:
+        for accept in accepts:
+            info = TokenRegistry.get_token(accept.network, token)
+            if info and info.address.lower() == accept.asset.lower():
+                return accept
+        raise ValueError(f"{token} not offered (accepts: {[a.asset for a in accepts]})")
+
+    return select
+
+
+def parse_server_timing(header: str | None) -> list[tuple[str, float]]:
+    """'settle;dur=12.5, render;dur=3.1' -> [('settle', 0.0125), ('render', 0.0031)]"""
+    stages = []
+    for metric in (header or "").split(","):
+        name, _, params = metric.strip().partition(";")
+        if params.startswith("dur="):
+            stages.append((name, float(params[4:]) / 1000))
+    return stages
+
+
+class StageStats:
+    """Latency samples and errors per stage"""
+
+    def __init__(self) -> None:
+        self.samples: dict[str, list[float]] = defaultdict(list)
+        self.errors: Counter[str] = Counter()
+
+    def add(self, stage: str, seconds: float) -> None:
+        self.samples[stage].append(seconds)
+
+    def report(self, elapsed: float) -> None:
+        print(f"{'Stage':<12}{'count':>8}{'per sec':>10}{'p50 ms':>10}{'p95 ms':>10}{'p99 ms':>10}")
+        for stage in STAGES + sorted(set(self.samples) - set(STAGES)):
+            samples = sorted(self.samples.get(stage, []))
+            if not samples:
+                continue
+
+            def pct(q: float, samples: list[float] = samples) -> float:
+                return samples[min(len(samples) - 1, int(len(samples) * q))] * 1000
+
+            print(
+                f"{stage:<12}{len(samples):>8}{len(samples) / elapsed:>10.1f}"
+                f"{pct(0.50):>10.2f}{pct(0.95):>10.2f}{pct(0.99):>10.2f}"
+            )
+        if self.errors:
+            print(f"Errors: {dict(self.errors)}")
+
+
+async def one_flow(
+    http: httpx.AsyncClient, client: X402Client, path: str, token: str, paid: bool, stats: StageStats
+) -> None:
+    start = time.perf_counter()
+    response = await http.get(path)
+    stats.add("challenge", time.perf_counter() - start)
+    if response.status_code != 402:
+        stats.errors[f"challenge {response.status_code}"] += 1
+        return
+    if not paid:
+        return
+
+    payment_required = decode_payment_payload(
+        response.headers[PAYMENT_REQUIRED_HEADER], PaymentRequired
+    )
+    extensions = (
+        payment_required.extensions.model_dump(by_alias=True) if payment_required.extensions else None
+    )
+    start = time.perf_counter()
+    payload = await client.handle_payment(
+        payment_required.accepts, str(response.url), extensions, token_selector(token)
+    )
+    stats.add("sign", time.perf_counter() - start)
+
+    start = time.perf_counter()
+    response = await http.get(
+        path, headers={PAYMENT_SIGNATURE_HEADER: encode_payment_payload(payload)}
+    )
+    stats.add("paid", time.perf_counter() - start)
+    if response.status_code != 200:
+        stats.errors[f"paid {response.status_code}"] += 1
+        return
+    for stage, seconds in parse_server_timing(response.headers.get("server-timing")):
+        stats.add(stage, seconds)
+
+
+async def main() -> None:
+    parser = argparse.ArgumentParser(description="Payment flow load test")
+    parser.add_argument("--requests", type=int, default=500, help="flows to run (each starts with a 402)")
+    parser.add_argument("--concurrency", type=int, default=16)
+    parser.add_argument("--paid-ratio", type=float, default=0.5, help="share of flows that pay")
+    parser.add_argument("--mix", default=DEFAULT_MIX, help="weighted /path:TOKEN=weight list")
+    parser.add_argument("--block-ms", type=float, default=100.0, help="stub chain block interval")
+    parser.add_argument("--seed", type=int, default=402)
+    args = parser.parse_args()
+
+    mix = parse_mix(args.mix)
+    rng = random.Random(args.seed)
+    plan = [
+        (*rng.choices([target for target, _ in mix], [weight for _, weight in mix])[0],
+         rng.random() < args.paid_ratio)
+        for _ in range(args.requests)
+    ]
+
+    # Server configuration for the child (read when server/main.py is imported)
+    os.environ.update(
+        PAY_TO_ADDRESS=PAY_TO_ADDRESS,
+        BSC_PAY_TO_ADDRESS=BSC_PAY_TO_ADDRESS,
+        SERVER_TIMING="1",
+        REQUEST_COUNTER_FILE="",
+    )
+    sock = socket.socket()
+    sock.bind(("127.0.0.1", 0))
+    url = f"http://127.0.0.1:{sock.getsockname()[1]}"
+    stack = multiprocessing.get_context("fork").Process(
+        target=serve_stack, args=(sock, args.block_ms / 1000), daemon=True
+    )
+    stack.start()
+
+    client = make_client()
+    stats = StageStats()
+    limits = httpx.Limits(max_connections=args.concurrency, max_keepalive_connections=args.concurrency)
+    async with httpx.AsyncClient(base_url=url, limits=limits, timeout=60) as http:
+        for _ in range(600):
+            try:
+                await http.get("/")
+                break
+            except httpx.TransportError:
+                await asyncio.sleep(0.05)
+
+        queue = iter(plan)
+
+        async def worker() -> None:
+            for path, token, paid in queue:
+                try:
+                    await one_flow(http, client, path, token, paid, stats)
+                except Exception as e:
+                    stats.errors[type(e).__name__] += 1
+
+        start = time.perf_counter()
+        await asyncio.gather(*(worker() for _ in range(args.concurrency)))
+        elapsed = time.perf_counter() - start
+    stack.terminate()
+
+    paid = sum(1 for *_, is_paid in plan if is_paid)
+    print("=" * 80)
+    print("Payment Flow Load Test (stub chain)")
+    print("=" * 80)
+    print(f"Flows: {args.requests} ({paid} paid)  Concurrency: {args.concurrency}  "
+          f"Block: {args.block_ms} ms")
+    print(f"Mix: {args.mix}")
+    print(f"Elapsed: {elapsed:.2f}s  ({args.requests / elapsed:.1f} flows/s)")
+    print("-" * 80)
+    stats.report(elapsed)
+    print("=" * 80)
+
+
+if __name__ == "__main__":
+    asyncio.run(main())
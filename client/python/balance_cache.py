@@ -0,0 +1,143 @@
+"""
+Client Balance Cache
+Local token balances for SufficientBalancePolicy: debited as payments are
+signed and reconciled with the chain in the background, so choosing among
+a 402's accepts needs no RPC call once a balance is known.
+"""
+
+import asyncio
+import logging
+import time
+from typing import Any
+
+from bankofai.x402.types import PaymentPayload, PaymentRequirements
+
+logger = logging.getLogger(__name__)
+
+DEFAULT_TTL = 30.0
+
+
+def payment_total(requirements: PaymentRequirements) -> int:
+    """Amount plus facilitator fee, as SufficientBalancePolicy counts it"""
+    total = int(requirements.amount)
+    fee = requirements.extra.fee if requirements.extra else None
+    if fee and getattr(fee, "fee_amount", None):
+        total += int(fee.fee_amount)
+    return total
+
+
+class BalanceCache:
+    """
+    Token balances per (network, token, address).
+
+    A known balance is served from memory; once it is older than ``ttl``
+    it is still served while a background fetch replaces it. Debits made
+    while that fetch is in flight are applied to its result, since the
+    chain may not show those payments yet. If the fetch fails the entry is
+    dropped, so the next lookup waits for the chain.
+    """
+
+    def __init__(self, ttl: float = DEFAULT_TTL) -> None:
+        self.ttl = ttl
+        self._balances: dict[tuple[str, str, str], tuple[int, float]] = {}
+        self._fetching: dict[tuple[str, str, str], asyncio.Task] = {}
+        self._debits_since_fetch: dict[tuple[str, str, str], int] = {}
+        self.hits = 0
+        self.misses = 0
+        self.refreshes = 0
+
+    async def get(self, key: tuple[str, str, str], fetch) -> int:
+        """Balance for ``key``; ``fetch`` is the no-argument coroutine function that reads it on chain"""
+        entry = self._balances.get(key)
+        if entry is None:
+            self.misses += 1
+            return await self._fetch(key, fetch)
+        self.hits += 1
+        balance, fetched_at = entry
+        if time.monotonic() - fetched_at >= self.ttl and key not in self._fetching:
+            self.refreshes += 1
+            self._start_fetch(key, fetch)
+        return balance
+
+    def debit(self, key: tuple[str, str, str], amount: int) -> None:
+        """Subtract a signed payment from the local balance"""
+        entry = self._balances.get(key)
+        if entry is not None:
+            self._balances[key] = (entry[0] - amount, entry[1])
+        if key in self._fetching:
+            self._debits_since_fetch[key] = self._debits_since_fetch.get(key, 0) + amount
+
+    def _start_fetch(self, key: tuple[str, str, str], fetch) -> asyncio.Task:
+        self._debits_since_fetch[key] = 0
+        task = asyncio.create_task(self._reconcile(key, fetch))
+        task.add_done_callback(lambda done: self._fetch_done(key, done))
+        self._fetching[key] = task
+        return task
+
+    def _fetch_done(self, key: tuple[str, str, str], task: asyncio.Task) -> None:
+        if task.cancelled():
+            return
+        # Retrieved here so a background refresh nobody awaits still gets logged
+        error = task.exception()
+        if error is not None:
+            logger.warning(f"[BALANCE] {key[0]} {key[1]}: balance fetch failed: {error}")
+            # A balance that cannot be refreshed is not served; the next lookup fetches again
+            self._balances.pop(key, None)
+
+    async def _fetch(self, key: tuple[str, str, str], fetch) -> int:
+        task = self._fetching.get(key) or self._start_fetch(key, fetch)
+        return await asyncio.shield(task)
+
+    async def _reconcile(self, key: tuple[str, str, str], fetch) -> int:
+        try:
+            balance = await fetch() - self._debits_since_fetch.get(key, 0)
+            previous = self._balances.get(key)
+            if previous is not None and previous[0] != balance:
+                logger.debug(f"[BALANCE] {key[0]} {key[1]}: local {previous[0]} -> chain {balance}")
+            self._balances[key] = (balance, time.monotonic())
+            return balance
+        finally:
+            self._fetching.pop(key, None)
+            self._debits_since_fetch.pop(key, None)
+
+    def metrics(self) -> dict[str, Any]:
+        return {
+            "entries": len(self._balances),
+            "hits": self.hits,
+            "misses": self.misses,
+            "refreshes": self.refreshes,
+        }
+
+
+class BalanceTrackingMechanism:
+    """
+    Client mechanism wrapper: ``check_balance`` reads the shared
+    BalanceCache (which SufficientBalancePolicy then uses as is) and every
+    payload it signs is debited from it.
+    """
+
+    def __init__(self, mechanism: Any, cache: BalanceCache) -> None:
+        self._mechanism = mechanism
+        self._cache = cache
+
+    def __getattr__(self, name: str) -> Any:
+        return getattr(self._mechanism, name)
+
+    def _key(self, token: str, network: str) -> tuple[str, str, str]:
+        return (network, token, self._mechanism.get_signer().get_address())
+
+    async def check_balance(self, token: str, network: str) -> int:
+        return await self._cache.get(
+            self._key(token, network),
+            lambda: self._mechanism.check_balance(token, network),
+        )
+
+    async def create_payment_payload(
+        self,
+        requirements: PaymentRequirements,
+        resource: str,
+        extensions: dict[str, Any] | None = None,
+    ) -> PaymentPayload:
+        payload = await self._mechanism.create_payment_payload(requirements, resource, extensions)
+        self._cache.debit(self._key(requirements.asset, requirements.network), payment_total(requirements))
+        return payload
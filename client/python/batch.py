@@ -0,0 +1,186 @@
+"""
+Concurrent Resource Fetching
+Fetches many paid resources over one httpx.AsyncClient and X402Client.
+Challenges are fetched and permits signed ahead while earlier payments are
+still settling, with a bound on payments in flight.
+"""
+
+import asyncio
+import logging
+import time
+from collections.abc import AsyncIterable, AsyncIterator, Iterable
+from dataclasses import dataclass
+from typing import Any
+
+import httpx
+from bankofai.x402.clients import X402Client
+from bankofai.x402.encoding import decode_payment_payload, encode_payment_payload
+from bankofai.x402.types import PaymentPayload, PaymentRequired, SettleResponse
+
+logger = logging.getLogger(__name__)
+
+PAYMENT_REQUIRED_HEADER = "PAYMENT-REQUIRED"
+PAYMENT_SIGNATURE_HEADER = "PAYMENT-SIGNATURE"
+PAYMENT_RESPONSE_HEADER = "PAYMENT-RESPONSE"
+DEFAULT_CONCURRENCY = 4
+
+
+@dataclass
+class FetchResult:
+    """Outcome of one resource fetch"""
+    url: str
+    response: httpx.Response | None = None
+    settlement: SettleResponse | None = None
+    error: str | None = None
+    elapsed: float = 0.0
+
+    @property
+    def ok(self) -> bool:
+        return self.response is not None and self.response.status_code < 400
+
+
+@dataclass
+class _Prepared:
+    url: str
+    payload: PaymentPayload
+    started: float
+
+
+class AllowanceSerializingSigner:
+    """
+    Client signer wrapper that runs ``ensure_allowance`` one at a time per
+    network and token.
+
+    Approval transactions take their nonce from the account's transaction
+    count, so parallel payments that all find the allowance short would send
+    competing approvals with the same nonce. Serialized, the first one
+    approves and the others find the allowance already in place.
+    """
+
+    def __init__(self, signer: Any) -> None:
+        self._signer = signer
+        self._locks: dict[tuple[str, str], asyncio.Lock] = {}
+
+    def __getattr__(self, name: str) -> Any:
+        return getattr(self._signer, name)
+
+    async def ensure_allowance(self, token: str, amount: int, network: str, *args, **kwargs) -> bool:
+        lock = self._locks.setdefault((network, token), asyncio.Lock())
+        async with lock:
+            return await self._signer.ensure_allowance(token, amount, network, *args, **kwargs)
+
+
+def _payment_required(response: httpx.Response) -> PaymentRequired:
+    header = response.headers.get(PAYMENT_REQUIRED_HEADER)
+    if header:
+        return decode_payment_payload(header, PaymentRequired)
+    return PaymentRequired(**response.json())
+
+
+async def _iterate(urls: Iterable[str] | AsyncIterable[str]) -> AsyncIterator[str]:
+    if isinstance(urls, AsyncIterable):
+        async for url in urls:
+            yield url
+    else:
+        for url in urls:
+            yield url
+
+
+async def fetch_many(
+    http_client: httpx.AsyncClient,
+    x402_client: X402Client,
+    urls: Iterable[str] | AsyncIterable[str],
+    concurrency: int = DEFAULT_CONCURRENCY,
+    prefetch: int | None = None,
+) -> AsyncIterator[FetchResult]:
+    """
+    Fetch every URL, paying where the server asks for it; yields results as they complete.
+
+    Two stages run side by side: up to ``prefetch`` resources (default
+    ``2 x concurrency``) have their 402 challenge fetched and permit signed
+    ahead, while up to ``concurrency`` paid requests wait on settlement.
+    ``urls`` may be a list or an async stream.
+    """
+    prefetch = prefetch or 2 * concurrency
+    prepared: asyncio.Queue[_Prepared | None] = asyncio.Queue(maxsize=prefetch)
+    results: asyncio.Queue[FetchResult | None] = asyncio.Queue()
+    preparing = asyncio.Semaphore(prefetch)
+
+    async def prepare(url: str) -> None:
+        started = time.perf_counter()
+        try:
+            response = await http_client.get(url)
+            if response.status_code != 402:
+                results.put_nowait(FetchResult(url, response, elapsed=time.perf_counter() - started))
+                return
+            payment_required = _payment_required(response)
+            extensions = (
+                payment_required.extensions.model_dump(by_alias=True)
+                if payment_required.extensions
+                else None
+            )
+            payload = await x402_client.handle_payment(payment_required.accepts, url, extensions)
+            await prepared.put(_Prepared(url, payload, started))
+        except Exception as e:
+            logger.error(f"[FETCH] {url}: {e}")
+            results.put_nowait(FetchResult(url, error=str(e), elapsed=time.perf_counter() - started))
+        finally:
+            preparing.release()
+
+    async def pay() -> None:
+        while (item := await prepared.get()) is not None:
+            result = FetchResult(item.url)
+            try:
+                result.response = await http_client.get(
+                    item.url,
+                    headers={PAYMENT_SIGNATURE_HEADER: encode_payment_payload(item.payload)},
+                )
+                header = result.response.headers.get(PAYMENT_RESPONSE_HEADER)
+                if header:
+                    result.settlement = decode_payment_payload(header, SettleResponse)
+                if result.response.status_code >= 400:
+                    result.error = f"HTTP {result.response.status_code}: {result.response.text[:200]}"
+            except Exception as e:
+                logger.error(f"[FETCH] {item.url}: {e}")
+                result.error = str(e)
+            result.elapsed = time.perf_counter() - item.started
+            results.put_nowait(result)
+
+    async def produce() -> None:
+        tasks = set()
+        try:
+            async for url in _iterate(urls):
+                await preparing.acquire()
+                task = asyncio.create_task(prepare(url))
+                tasks.add(task)
+                task.add_done_callback(tasks.discard)
+            if tasks:
+                await asyncio.gather(*tasks)
+        finally:
+            # Only non-empty when the URL source raised or we were cancelled
+            for task in tasks:
+                task.cancel()
+            await asyncio.gather(*tasks, return_exceptions=True)
+        for _ in range(concurrency):
+            await prepared.put(None)
+
+    async def run() -> None:
+        workers = [asyncio.create_task(pay()) for _ in range(concurrency)]
+        try:
+            await produce()
+            await asyncio.gather(*workers)
+        finally:
+            # A failed or cancelled producer must not leave workers waiting on the queue
+            for worker in workers:
+                worker.cancel()
+            await asyncio.gather(*workers, return_exceptions=True)
+            results.put_nowait(None)
+
+    runner = asyncio.create_task(run())
+    try:
+        while (result := await results.get()) is not None:
+            yield result
+        await runner
+    finally:
+        runner.cancel()
+        await asyncio.gather(runner, return_exceptions=True)
@@ -5,33 +5,42 @@ X402 Demo - Terminal Client (Multi-Network)
 Registers BOTH TRON and EVM mechanisms by default so the client can
 handle 402 responses from any supported chain.  The server decides
 which network(s) to accept; the SDK picks the best affordable option.
+
+Usage: python main.py [URL_OR_PATH ...]
+With no arguments, fetches ENDPOINT_PATH once. With arguments (paths are
+relative to SERVER_URL; "-" reads one per line from stdin), fetches them
+all concurrently, up to CLIENT_CONCURRENCY paid requests at a time.
 """
 
 import asyncio
 import os
 import sys
 import tempfile
+import time
 from pathlib import Path
 
 import httpx
-import logging
-from dotenv import load_dotenv
-from bankofai.x402.clients import X402Client, X402HttpClient, SufficientBalancePolicy
-from bankofai.x402.mechanisms.tron.exact_permit import ExactPermitTronClientMechanism
-from bankofai.x402.mechanisms.evm.exact_permit import ExactPermitEvmClientMechanism
+from bankofai.x402.clients import SufficientBalancePolicy, X402Client, X402HttpClient
 from bankofai.x402.mechanisms.evm.exact import ExactEvmClientMechanism
-from bankofai.x402.signers.client import TronClientSigner, EvmClientSigner
+from bankofai.x402.mechanisms.evm.exact_permit import ExactPermitEvmClientMechanism
+from bankofai.x402.mechanisms.tron.exact_permit import ExactPermitTronClientMechanism
+from bankofai.x402.signers.client import EvmClientSigner, TronClientSigner
 from bankofai.x402.tokens import TokenRegistry
+from dotenv import load_dotenv
+
+sys.path.insert(0, str(Path(__file__).parent.parent.parent))
+
+from balance_cache import BalanceCache, BalanceTrackingMechanism
+from batch import AllowanceSerializingSigner, fetch_many
 
-# Enable detailed logging
-logging.basicConfig(
-    level=logging.DEBUG,
-    format='%(asctime)s - %(name)s - %(levelname)s - %(message)s'
-)
+from common.logs import setup_logging
 
 # Load environment variables
 load_dotenv()
 
+# Queued, non-blocking logging; LOG_LEVEL=DEBUG for the SDK's full payment trace
+setup_logging()
+
 # Configuration
 TRON_PRIVATE_KEY = os.getenv("TRON_PRIVATE_KEY", "")
 BSC_PRIVATE_KEY = os.getenv("BSC_PRIVATE_KEY", "")
@@ -46,6 +55,11 @@ ENDPOINT_PATH = "/protected-nile"
 # ENDPOINT_PATH = "/protected-bsc-mainnet"
 RESOURCE_URL = RESOURCE_SERVER_URL + ENDPOINT_PATH
 HTTP_TIMEOUT_SECONDS = float(os.getenv("HTTP_TIMEOUT_SECONDS", "60"))
+CLIENT_CONCURRENCY = int(os.getenv("CLIENT_CONCURRENCY", "4"))
+if CLIENT_CONCURRENCY < 1:
+    raise ValueError(f"CLIENT_CONCURRENCY must be at least 1, got {CLIENT_CONCURRENCY}")
+# Seconds a cached token balance is trusted before it is re-read in the background; 0 disables the cache
+BALANCE_CACHE_TTL = float(os.getenv("BALANCE_CACHE_TTL", "30"))
 
 
 if not TRON_PRIVATE_KEY:
@@ -58,29 +72,112 @@ if not BSC_PRIVATE_KEY:
     print("\nPlease add your EVM private key to .env file\n")
     exit(1)
 
+def resource_url(target: str) -> str:
+    """Full URL for a command-line target (absolute URL or path on SERVER_URL)"""
+    if target.startswith(("http://", "https://")):
+        return target
+    return RESOURCE_SERVER_URL + "/" + target.lstrip("/")
+
+
+async def stdin_urls():
+    """Resource URLs from stdin, one per line, as they arrive"""
+    while line := await asyncio.to_thread(sys.stdin.readline):
+        if line.strip():
+            yield resource_url(line.strip())
+
+
+def save_image(response: httpx.Response) -> str:
+    """Write an image response to /tmp and return its path"""
+    content_type = response.headers.get('content-type', '')
+    ext = "png"
+    if "jpeg" in content_type or "jpg" in content_type:
+        ext = "jpg"
+    elif "webp" in content_type:
+        ext = "webp"
+
+    with tempfile.NamedTemporaryFile(prefix="x402_", suffix=f".{ext}", delete=False, dir="/tmp") as f:
+        f.write(response.content)
+        return f.name
+
+
+async def fetch_resources(
+    http_client: httpx.AsyncClient,
+    x402_client: X402Client,
+    targets: list[str],
+    balance_cache: BalanceCache | None = None,
+):
+    """Fetch every target concurrently and print one line per resource as it completes"""
+    if targets == ["-"]:
+        urls = stdin_urls()
+    else:
+        urls = [resource_url(t) for t in targets]
+
+    print(f"\nFetching concurrently (CLIENT_CONCURRENCY={CLIENT_CONCURRENCY})")
+    start = time.perf_counter()
+    succeeded = failed = 0
+    serial_seconds = 0.0
+    async for result in fetch_many(http_client, x402_client, urls, concurrency=CLIENT_CONCURRENCY):
+        serial_seconds += result.elapsed
+        if not result.ok:
+            failed += 1
+            print(f"❌ {result.url} ({result.elapsed:.2f}s): {result.error}")
+            continue
+        succeeded += 1
+        detail = f"{len(result.response.content)} bytes"
+        if 'image/' in result.response.headers.get('content-type', ''):
+            detail = f"saved to {save_image(result.response)}"
+        if result.settlement:
+            detail += f", tx {result.settlement.transaction}"
+        print(f"✅ {result.url} ({result.elapsed:.2f}s): {detail}")
+
+    total = time.perf_counter() - start
+    print("=" * 80)
+    print(f"Fetched: {succeeded} ok, {failed} failed in {total:.2f}s "
+          f"(sum of per-resource times: {serial_seconds:.2f}s)")
+    if balance_cache:
+        print(f"Balance cache: {balance_cache.metrics()}")
+    print("=" * 80)
+    if failed:
+        sys.exit(1)
+
+
 async def main():
+    targets = sys.argv[1:]
+
     print("=" * 80)
     print("X402 Payment Client (Multi-Network)")
     print("=" * 80)
 
     # --- Create signers for every chain family ---
-    tron_signer = TronClientSigner.from_private_key(TRON_PRIVATE_KEY)
-    evm_signer = EvmClientSigner.from_private_key(BSC_PRIVATE_KEY)
+    # Allowance approvals are serialized per token so concurrent payments
+    # never send two approve transactions with the same account nonce
+    tron_signer = AllowanceSerializingSigner(TronClientSigner.from_private_key(TRON_PRIVATE_KEY))
+    evm_signer = AllowanceSerializingSigner(EvmClientSigner.from_private_key(BSC_PRIVATE_KEY))
 
     # --- Register mechanisms for ALL networks ---
+    mechanisms = [
+        ("tron:*", ExactPermitTronClientMechanism(tron_signer)),
+        ("eip155:*", ExactPermitEvmClientMechanism(evm_signer)),
+        ("eip155:*", ExactEvmClientMechanism(evm_signer)),
+    ]
+    # Balance cache: the policy's balance checks are answered locally,
+    # debited per signed payment and re-read from chain every BALANCE_CACHE_TTL
+    balance_cache = BalanceCache(ttl=BALANCE_CACHE_TTL) if BALANCE_CACHE_TTL > 0 else None
     x402_client = X402Client()
-    x402_client.register("tron:*", ExactPermitTronClientMechanism(tron_signer))
-    x402_client.register("eip155:*", ExactPermitEvmClientMechanism(evm_signer))
-    x402_client.register("eip155:*", ExactEvmClientMechanism(evm_signer))
+    for pattern, mechanism in mechanisms:
+        if balance_cache:
+            mechanism = BalanceTrackingMechanism(mechanism, balance_cache)
+        x402_client.register(pattern, mechanism)
 
     # Balance policy: auto-resolves signers from registered mechanisms
     x402_client.register_policy(SufficientBalancePolicy)
 
     print(f"TRON Address: {tron_signer.get_address()}")
     print(f"EVM  Address: {evm_signer.get_address()}")
-    print(f"Resource URL: {RESOURCE_URL}")
+    if not targets:
+        print(f"Resource URL: {RESOURCE_URL}")
 
-    print(f"\nSupported Networks and Tokens:")
+    print("\nSupported Networks and Tokens:")
     for network_name in ["tron:mainnet", "tron:nile", "tron:shasta", "eip155:97"]:
         tokens = TokenRegistry.get_network_tokens(network_name)
         print(f"  {network_name}:")
@@ -93,12 +190,16 @@ async def main():
     
     try:
         async with httpx.AsyncClient(timeout=HTTP_TIMEOUT_SECONDS) as http_client:
+            if targets:
+                await fetch_resources(http_client, x402_client, targets, balance_cache)
+                return
+
             client = X402HttpClient(http_client, x402_client)
             
             print(f"\nRequesting: {RESOURCE_URL}")
             # 发起请求（自动处理 402 支付）
             response = await client.get(RESOURCE_URL)
-            print(f"\n✅ Success!")
+            print("\n✅ Success!")
             print(f"Status: {response.status_code}")
             print(f"Content-Type: {response.headers.get('content-type')}")
             print(f"Content-Length: {len(response.content)} bytes")
@@ -109,7 +210,7 @@ async def main():
                 from bankofai.x402.encoding import decode_payment_payload
                 from bankofai.x402.types import SettleResponse
                 settle_response = decode_payment_payload(payment_response, SettleResponse)
-                print(f"\n📋 Payment Response:")
+                print("\n📋 Payment Response:")
                 print(f"  Success: {settle_response.success}")
                 print(f"  Network: {settle_response.network}")
                 print(f"  Transaction: {settle_response.transaction}")
@@ -121,15 +222,7 @@ async def main():
             if 'application/json' in content_type:
                 print(f"\nResponse: {response.json()}")
             elif 'image/' in content_type:
-                ext = "png"
-                if "jpeg" in content_type or "jpg" in content_type:
-                    ext = "jpg"
-                elif "webp" in content_type:
-                    ext = "webp"
-
-                with tempfile.NamedTemporaryFile(prefix="x402_", suffix=f".{ext}", delete=False, dir="/tmp") as f:
-                    f.write(response.content)
-                    saved_path = f.name
+                saved_path = save_image(response)
                 print(f"\n🖼️  Received image file, saved to: {saved_path}")
             else:
                 print(f"\nResponse (first 200 chars): {response.text[:200]}")
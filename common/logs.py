@@ -0,0 +1,171 @@
+"""
+Logging Setup
+Non-blocking logging for the request path: records go onto an in-memory
+queue and are formatted and written by a background thread, optionally as
+JSON lines, with per-logger sampling of records below WARNING.
+
+Use ``lazy_json(obj)`` as a %-style argument for payload dumps, e.g.
+``logger.debug("[VERIFY REQUEST] %s", lazy_json(payload))``: the model is
+serialized only if the record is actually written, and then off the
+event loop.
+"""
+
+import atexit
+import json
+import logging
+import os
+import queue
+import random
+import sys
+from datetime import UTC, datetime
+from logging.handlers import QueueHandler, QueueListener
+from typing import Any
+
+TEXT_FORMAT = "%(asctime)s - %(levelname)-8s %(name)s %(filename)s:%(lineno)d %(message)s"
+DATE_FORMAT = "%Y-%m-%d %H:%M:%S"
+
+# LogRecord attributes that are not user-supplied ``extra`` fields
+_RECORD_ATTRS = set(vars(logging.LogRecord("", 0, "", 0, "", (), None))) | {"message", "asctime"}
+
+_listener: QueueListener | None = None
+
+
+class lazy_json:
+    """Log argument that serializes a pydantic model (or any JSON-able object) when formatted"""
+
+    __slots__ = ("obj",)
+
+    def __init__(self, obj: Any) -> None:
+        self.obj = obj
+
+    def __str__(self) -> str:
+        if hasattr(self.obj, "model_dump_json"):
+            return self.obj.model_dump_json(by_alias=True)
+        return json.dumps(self.obj, default=str)
+
+
+class JsonFormatter(logging.Formatter):
+    """One JSON object per record; ``extra`` fields are included as keys"""
+
+    def format(self, record: logging.LogRecord) -> str:
+        entry = {
+            "ts": datetime.fromtimestamp(record.created, UTC).isoformat(timespec="milliseconds"),
+            "level": record.levelname,
+            "logger": record.name,
+            "msg": record.getMessage(),
+        }
+        for key, value in record.__dict__.items():
+            if key not in _RECORD_ATTRS and not key.startswith("_"):
+                entry[key] = value
+        if record.exc_info:
+            entry["exc"] = self.formatException(record.exc_info)
+        return json.dumps(entry, default=str)
+
+
+class SamplingFilter(logging.Filter):
+    """
+    Keep a fraction of the records below WARNING per logger name prefix
+    (the longest matching prefix wins); warnings and errors always pass.
+    """
+
+    def __init__(self, rates: dict[str, float]) -> None:
+        super().__init__()
+        self.rates = rates
+        self._resolved: dict[str, float] = {}
+
+    def _rate(self, name: str) -> float:
+        rate = self._resolved.get(name)
+        if rate is None:
+            rate = 1.0
+            for prefix in sorted(self.rates, key=len, reverse=True):
+                if name == prefix or name.startswith(prefix + "."):
+                    rate = self.rates[prefix]
+                    break
+            self._resolved[name] = rate
+        return rate
+
+    def filter(self, record: logging.LogRecord) -> bool:
+        if record.levelno >= logging.WARNING:
+            return True
+        rate = self._rate(record.name)
+        return rate >= 1.0 or random.random() < rate
+
+
+class DeferredQueueHandler(QueueHandler):
+    """
+    QueueHandler that enqueues the record as is: the stock one formats the
+    message in the caller's thread, which is the cost this is meant to
+    move off the request path.
+    """
+
+    def prepare(self, record: logging.LogRecord) -> logging.LogRecord:
+        return record
+
+
+def parse_mapping(value: str) -> dict[str, str]:
+    """Parse "name=value,name=value" (the LOG_LEVELS / LOG_SAMPLE format)"""
+    mapping = {}
+    for item in value.split(","):
+        if not item.strip():
+            continue
+        name, sep, setting = item.partition("=")
+        if not sep:
+            raise ValueError(f"Expected name=value, got {item!r}")
+        mapping[name.strip()] = setting.strip()
+    return mapping
+
+
+def setup_logging(
+    level: str | None = None,
+    fmt: str | None = None,
+    levels: str | None = None,
+    sample: str | None = None,
+) -> None:
+    """
+    Route all logging through a queue to a background writer on stdout.
+
+    Arguments default to LOG_LEVEL (INFO), LOG_FORMAT (text | json),
+    LOG_LEVELS ("logger=LEVEL,...") and LOG_SAMPLE ("logger=rate,...").
+    """
+    global _listener
+    level = (level or os.getenv("LOG_LEVEL", "INFO")).upper()
+    fmt = fmt or os.getenv("LOG_FORMAT", "text")
+    if fmt not in ("text", "json"):
+        raise ValueError(f"Unknown LOG_FORMAT: {fmt} (expected text or json)")
+    levels = parse_mapping(os.getenv("LOG_LEVELS", "") if levels is None else levels)
+    rates = {
+        name: float(rate)
+        for name, rate in parse_mapping(os.getenv("LOG_SAMPLE", "") if sample is None else sample).items()
+    }
+
+    stream = logging.StreamHandler(sys.stdout)
+    stream.setFormatter(JsonFormatter() if fmt == "json" else logging.Formatter(TEXT_FORMAT, DATE_FORMAT))
+
+    records: queue.SimpleQueue = queue.SimpleQueue()
+    handler = DeferredQueueHandler(records)
+    if rates:
+        # Sampled before queueing, so dropped records cost no formatting at all
+        handler.addFilter(SamplingFilter(rates))
+
+    root = logging.getLogger()
+    root.setLevel(level)
+    for existing in root.handlers[:]:
+        root.removeHandler(existing)
+    root.addHandler(handler)
+    for name, logger_level in levels.items():
+        logging.getLogger(name).setLevel(logger_level.upper())
+
+    if _listener is None:
+        atexit.register(stop_logging)
+    else:
+        _listener.stop()
+    _listener = QueueListener(records, stream)
+    _listener.start()
+
+
+def stop_logging() -> None:
+    """Write out the queued records and stop the writer thread"""
+    global _listener
+    if _listener is not None:
+        _listener.stop()
+        _listener = None
@@ -0,0 +1,191 @@
+"""
+Profiling Hooks
+Opt-in diagnostics for the server and facilitator, mounted only when
+PROFILING_TOKEN is set (otherwise nothing is added to the app):
+
+- ``GET /debug/profile?seconds=10``: samples every thread's stack for the
+  given time and returns folded stacks ("frame;frame;frame count" lines),
+  the input format of flamegraph.pl, speedscope and inferno.
+- ``X-Trace: <token>`` request header: the response carries the request's
+  spans (facilitator calls, render, ...) in a Server-Timing header, each
+  with its start offset, even when SERVER_TIMING is off.
+
+``require_token`` guards the operator endpoints (/metrics*, the
+facilitator's /ledger) with their own token, METRICS_TOKEN; without it
+they answer 404.
+"""
+
+import asyncio
+import hmac
+import sys
+import threading
+import time
+from collections import Counter
+from contextvars import ContextVar
+
+from fastapi import FastAPI, HTTPException, Request
+from fastapi.responses import PlainTextResponse
+
+TOKEN_HEADER = "X-Profile-Token"
+TRACE_HEADER = "X-Trace"
+MAX_PROFILE_SECONDS = 60.0
+
+# (name, start, duration) per span of the traced request; None when not tracing
+_spans: ContextVar[list[tuple[str, float, float]] | None] = ContextVar("trace_spans", default=None)
+
+
+def record_span(name: str, start: float, duration: float) -> None:
+    """Add a span (perf_counter start, seconds) to the current trace, if the request is traced"""
+    spans = _spans.get()
+    if spans is not None:
+        spans.append((name, start, duration))
+
+
+class SamplingProfiler:
+    """
+    Background thread that snapshots all other threads' stacks every
+    ``interval`` seconds (sys._current_frames) and counts identical stacks.
+    """
+
+    def __init__(self, interval: float = 0.005) -> None:
+        self.interval = interval
+        self.samples = 0
+        self._stacks: Counter[str] = Counter()
+        self._stop = threading.Event()
+        self._thread = threading.Thread(target=self._run, name="sampling-profiler", daemon=True)
+
+    def start(self) -> None:
+        self._thread.start()
+
+    def stop(self) -> None:
+        self._stop.set()
+        self._thread.join()
+
+    def _run(self) -> None:
+        own = threading.get_ident()
+        code_names: dict = {}
+        while not self._stop.wait(self.interval):
+            names = {thread.ident: thread.name for thread in threading.enumerate()}
+            for ident, frame in sys._current_frames().items():
+                if ident == own:
+                    continue
+                stack = []
+                while frame is not None:
+                    code = frame.f_code
+                    label = code_names.get(code)
+                    if label is None:
+                        label = code_names[code] = (
+                            f"{code.co_name} ({code.co_filename}:{code.co_firstlineno})".replace(";", ":")
+                        )
+                    stack.append(label)
+                    frame = frame.f_back
+                stack.append(names.get(ident, f"thread-{ident}"))
+                self._stacks[";".join(reversed(stack))] += 1
+            self.samples += 1
+
+    def folded(self) -> str:
+        """Collapsed stacks, one "root;...;leaf count" line each"""
+        return "".join(f"{stack} {count}\n" for stack, count in self._stacks.most_common())
+
+
+def token_matches(request: Request, token: str) -> bool:
+    """Whether the request carries ``token`` in X-Profile-Token or as an Authorization bearer token"""
+    supplied = request.headers.get(TOKEN_HEADER)
+    if supplied is None:
+        scheme, _, credentials = request.headers.get("authorization", "").partition(" ")
+        if scheme.lower() == "bearer":
+            supplied = credentials.strip()
+    return bool(token) and supplied is not None and hmac.compare_digest(supplied.encode(), token.encode())
+
+
+def require_token(token: str):
+    """
+    FastAPI dependency for operator endpoints: 404 when ``token`` is empty
+    (endpoint disabled), 403 when the request does not carry it.
+    """
+
+    async def check(request: Request) -> None:
+        if not token:
+            raise HTTPException(status_code=404, detail="Not Found")
+        if not token_matches(request, token):
+            raise HTTPException(status_code=403, detail="Invalid operator token")
+
+    return check
+
+
+def install_profiling(app: FastAPI, token: str) -> None:
+    """Mount /debug/profile and X-Trace handling on ``app``, both gated by ``token``"""
+    profiling = asyncio.Lock()
+
+    @app.get("/debug/profile", response_class=PlainTextResponse)
+    async def profile(request: Request, seconds: float = 10.0, interval_ms: float = 5.0):
+        """Sample all threads for ``seconds`` and return folded stacks for a flamegraph"""
+        if not token_matches(request, token):
+            raise HTTPException(status_code=403, detail="Invalid profiling token")
+        if not 0 < seconds <= MAX_PROFILE_SECONDS or interval_ms < 1:
+            raise HTTPException(
+                status_code=400,
+                detail=f"seconds must be in (0, {MAX_PROFILE_SECONDS:g}], interval_ms at least 1",
+            )
+        if profiling.locked():
+            raise HTTPException(status_code=409, detail="A profile is already running")
+        async with profiling:
+            profiler = SamplingProfiler(interval_ms / 1000)
+            profiler.start()
+            try:
+                await asyncio.sleep(seconds)
+            finally:
+                await asyncio.to_thread(profiler.stop)
+        return PlainTextResponse(
+            profiler.folded(), headers={"X-Profile-Samples": str(profiler.samples)}
+        )
+
+    app.add_middleware(TraceMiddleware, token=token)
+
+
+class TraceMiddleware:
+    """
+    ASGI middleware: for requests with ``X-Trace: <token>``, collect the
+    spans recorded while handling them and add them to Server-Timing as
+    ``name;dur=<ms>;desc="+<start ms>"``, plus a ``total`` span.
+    """
+
+    def __init__(self, app, token: str) -> None:
+        self.app = app
+        self.token = token.encode()
+        self.header = TRACE_HEADER.lower().encode()
+
+    def _traced(self, scope) -> bool:
+        if scope["type"] != "http":
+            return False
+        for name, value in scope["headers"]:
+            if name == self.header:
+                return hmac.compare_digest(value, self.token)
+        return False
+
+    async def __call__(self, scope, receive, send):
+        if not self._traced(scope):
+            await self.app(scope, receive, send)
+            return
+
+        spans: list[tuple[str, float, float]] = []
+        reset = _spans.set(spans)
+        start = time.perf_counter()
+
+        async def send_with_spans(message):
+            if message["type"] == "http.response.start":
+                timings = [
+                    f'{name};dur={duration * 1000:.2f};desc="+{(span_start - start) * 1000:.2f}"'
+                    for name, span_start, duration in spans
+                ]
+                timings.append(f"total;dur={(time.perf_counter() - start) * 1000:.2f}")
+                message["headers"] = [
+                    *message.get("headers", []),
+                    (b"server-timing", ", ".join(timings).encode()),
+                ]
+            await send(message)
+
+        try:
+            await self.app(scope, receive, send_with_spans)
+        finally:
+            _spans.reset(reset)
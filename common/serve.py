@@ -0,0 +1,122 @@
+"""
+Multi-Worker Launcher
+Runs an ASGI app factory in one or more uvicorn worker processes.
+
+With more than one worker each process binds its own listening socket with
+SO_REUSEPORT, so the kernel spreads connections across workers without a
+shared accept lock. SIGTERM/SIGINT are forwarded to every worker, which stop
+accepting, drain in-flight requests for up to ``graceful_timeout`` seconds
+and then run their shutdown hooks.
+"""
+
+import multiprocessing
+import os
+import signal
+import socket
+import sys
+import time
+from multiprocessing.connection import wait
+
+import uvicorn
+
+# Workers that die sooner than this after starting are not restarted
+MIN_WORKER_UPTIME = 5.0
+
+
+def _bind_reuseport(host: str, port: int) -> socket.socket:
+    """Listening socket that other workers can bind to the same address"""
+    family = socket.AF_INET6 if ":" in host else socket.AF_INET
+    sock = socket.socket(family, socket.SOCK_STREAM)
+    sock.setsockopt(socket.SOL_SOCKET, socket.SO_REUSEADDR, 1)
+    sock.setsockopt(socket.SOL_SOCKET, socket.SO_REUSEPORT, 1)
+    sock.bind((host, port))
+    sock.listen(2048)
+    sock.set_inheritable(True)
+    return sock
+
+
+def _run_worker(factory: str, host: str, port: int, options: dict) -> None:
+    """Worker process entry point: build the app via the factory and serve"""
+    # Own process group: a terminal Ctrl-C reaches only the supervisor, which
+    # forwards a single SIGTERM (a second signal would make uvicorn force-exit)
+    os.setpgrp()
+    sock = _bind_reuseport(host, port)
+    config = uvicorn.Config(factory, factory=True, **options)
+    uvicorn.Server(config).run(sockets=[sock])
+
+
+def serve(
+    factory: str,
+    host: str,
+    port: int,
+    workers: int = 1,
+    graceful_timeout: int = 30,
+    **options,
+) -> None:
+    """
+    Serve ``factory`` ("module:create_app") on host:port.
+
+    Extra keyword arguments are passed to uvicorn.Config (log_level, access_log, ...).
+    """
+    options["timeout_graceful_shutdown"] = graceful_timeout
+
+    if workers <= 1:
+        uvicorn.run(factory, factory=True, host=host, port=port, **options)
+        return
+
+    if not hasattr(socket, "SO_REUSEPORT"):
+        # Fall back to uvicorn's supervisor with a single shared socket
+        uvicorn.run(factory, factory=True, host=host, port=port, workers=workers, **options)
+        return
+
+    # Spawned (not forked) so each worker builds its own signers, pools and clients
+    context = multiprocessing.get_context("spawn")
+    stopping = False
+    failed = False
+    processes: dict[int, tuple[multiprocessing.Process, float]] = {}
+
+    def start(index: int) -> None:
+        process = context.Process(
+            target=_run_worker,
+            args=(factory, host, port, options),
+            name=f"worker-{index}",
+        )
+        process.start()
+        processes[index] = (process, time.monotonic())
+        print(f"[serve] started {process.name} (pid {process.pid})", flush=True)
+
+    def stop(signum, frame) -> None:
+        nonlocal stopping
+        if stopping:
+            return
+        stopping = True
+        print(f"[serve] {signal.Signals(signum).name} received, draining workers", flush=True)
+        for process, _ in processes.values():
+            if process.is_alive():
+                os.kill(process.pid, signal.SIGTERM)
+
+    signal.signal(signal.SIGTERM, stop)
+    signal.signal(signal.SIGINT, stop)
+
+    for index in range(workers):
+        start(index)
+
+    while processes:
+        wait([process.sentinel for process, _ in processes.values()], timeout=1.0)
+        for index, (process, started) in list(processes.items()):
+            if process.is_alive():
+                continue
+            process.join()
+            del processes[index]
+            if stopping:
+                continue
+            print(f"[serve] {process.name} exited with code {process.exitcode}", flush=True)
+            if time.monotonic() - started < MIN_WORKER_UPTIME:
+                # Crashing on startup: restarting would just loop
+                failed = True
+                stop(signal.SIGTERM, None)
+                continue
+            start(index)
+
+    if failed:
+        sys.exit(1)
@@ -0,0 +1,82 @@
+"""
+Account Settle Lock
+Serializes settlements that spend from the same EVM account on one network, across tasks and worker processes.
+
+The EVM signer picks each transaction nonce from the account's latest
+transaction count, so two settles broadcast before the first is mined would
+reuse a nonce. Settles for one account are therefore run one at a time:
+an asyncio lock orders tasks inside a worker and an flock on a per-account
+file orders workers. Each chain has its own nonce sequence, so the lock is
+per (network, address). TRON transactions carry no nonce and are not wrapped.
+"""
+
+import asyncio
+import fcntl
+import os
+import tempfile
+from contextlib import asynccontextmanager
+from contextvars import ContextVar
+from pathlib import Path
+from typing import Any
+
+from bankofai.x402.types import PaymentPayload, PaymentRequirements, SettleResponse
+
+DEFAULT_LOCK_DIR = Path(tempfile.gettempdir()) / "x402-nonce-locks"
+
+# Locks held by the current task (inherited by tasks it starts)
+_held: ContextVar[frozenset] = ContextVar("held_account_locks", default=frozenset())
+
+
+class AccountLock:
+    """
+    Exclusive lock for one account on one network, shared by every process
+    using ``lock_dir``.
+
+    Re-entering ``hold()`` from a task that already holds the lock (or from a
+    task it started, e.g. a settle batch) is a no-op.
+    """
+
+    def __init__(self, network: str, address: str, lock_dir: Path = DEFAULT_LOCK_DIR) -> None:
+        lock_dir.mkdir(parents=True, exist_ok=True)
+        self.network = network
+        self.address = address
+        self.path = lock_dir / f"{network.replace(':', '-')}-{address.lower()}.lock"
+        self._lock = asyncio.Lock()
+
+    @asynccontextmanager
+    async def hold(self):
+        """Hold the account for the duration of the block"""
+        held = _held.get()
+        if self in held:
+            yield
+            return
+        async with self._lock:
+            fd = os.open(self.path, os.O_RDWR | os.O_CREAT, 0o644)
+            try:
+                # flock blocks, so wait for other workers off the event loop
+                await asyncio.to_thread(fcntl.flock, fd, fcntl.LOCK_EX)
+                token = _held.set(held | {self})
+                try:
+                    yield
+                finally:
+                    _held.reset(token)
+                    fcntl.flock(fd, fcntl.LOCK_UN)
+            finally:
+                os.close(fd)
+
+
+class AccountLockedMechanism:
+    """Facilitator mechanism whose settle() runs while holding its account lock"""
+
+    def __init__(self, mechanism: Any, lock: AccountLock) -> None:
+        self._mechanism = mechanism
+        self._account_lock = lock
+
+    def __getattr__(self, name: str) -> Any:
+        return getattr(self._mechanism, name)
+
+    async def settle(
+        self, payload: PaymentPayload, requirements: PaymentRequirements
+    ) -> SettleResponse:
+        async with self._account_lock.hold():
+            return await self._mechanism.settle(payload, requirements)
@@ -0,0 +1,215 @@
+"""
+Hot Wallet Pool
+Several facilitator keys per network. Each settle goes to the least-loaded
+key, so settlements are no longer serialized behind one account's nonce
+sequence (BSC) or bandwidth/energy budget (TRON).
+"""
+
+import asyncio
+import logging
+from contextlib import contextmanager
+from contextvars import ContextVar
+from dataclasses import dataclass
+from typing import Any
+
+from bankofai.x402.types import (
+    FeeQuoteResponse,
+    PaymentPayload,
+    PaymentRequirements,
+    SettleResponse,
+    VerifyResponse,
+)
+from bankofai.x402.utils.address import tron_address_to_evm
+
+from common.metrics import REGISTRY
+
+logger = logging.getLogger(__name__)
+
+DEFAULT_MONITOR_INTERVAL = 60.0
+
+WALLET_IN_FLIGHT = REGISTRY.gauge(
+    "x402_facilitator_wallet_in_flight", "Settles in progress per facilitator key", ("network", "address")
+)
+WALLET_BALANCE = REGISTRY.gauge(
+    "x402_facilitator_wallet_balance",
+    "Native balance per facilitator key (wei / sun), as of the last check",
+    ("network", "address"),
+)
+WALLET_SETTLES = REGISTRY.counter(
+    "x402_facilitator_wallet_settles", "Settles sent per facilitator key", ("network", "address")
+)
+
+
+# Key chosen before the settle runs (by the settle batcher, which holds that key's lock)
+_pinned: ContextVar[str | None] = ContextVar("pinned_hot_wallet", default=None)
+
+
+@contextmanager
+def pinned(address: str):
+    """Settle with ``address`` inside the block instead of letting the pool pick"""
+    token = _pinned.set(address)
+    try:
+        yield
+    finally:
+        _pinned.reset(token)
+
+
+def _evm_form(address: str) -> str:
+    return (address if address.startswith("0x") else tron_address_to_evm(address)).lower()
+
+
+def _caller(payload: PaymentPayload) -> str | None:
+    """The key a permit allows to settle it, or None if any key may"""
+    permit = payload.payload.payment_permit
+    if permit is None or int(_evm_form(permit.caller), 16) == 0:
+        return None
+    return _evm_form(permit.caller)
+
+
+@dataclass
+class HotWallet:
+    """One facilitator key on one network"""
+    address: str
+    signer: Any
+    in_flight: int = 0
+    queued: int = 0  # pinned to this key in a settle batch that has not started yet
+    settles: int = 0
+    balance: int | None = None  # native units (wei / sun); None until checked
+    resources: dict[str, int] | None = None  # TRON energy / bandwidth left
+    low: bool = False
+
+
+class HotWalletPool:
+    """
+    The facilitator keys of one network and their load.
+
+    A permit that names a pool key as its caller is settled by that key.
+    Permits without a caller and exact transfers (anyone may submit those)
+    go to the key with the fewest settles in flight or queued, skipping keys whose
+    native balance is below ``min_balance``. ``monitor()`` refreshes the
+    balances (and TRON resources) in the background.
+    """
+
+    def __init__(self, network: str, wallets: list[HotWallet], min_balance: int = 0) -> None:
+        self.network = network
+        self.wallets = wallets
+        self.min_balance = min_balance
+        self._by_address = {_evm_form(wallet.address): wallet for wallet in wallets}
+
+    def pick(self, caller: str | None) -> HotWallet | None:
+        """Key to settle with; None if the permit names a key outside the pool"""
+        if caller is not None:
+            return self._by_address.get(caller)
+        candidates = [wallet for wallet in self.wallets if not wallet.low] or self.wallets
+        return min(candidates, key=lambda wallet: (wallet.in_flight + wallet.queued, wallet.settles))
+
+    def route(self, payload: PaymentPayload) -> HotWallet | None:
+        """Key that will settle ``payload``; None if its permit names a key outside the pool"""
+        return self.pick(_caller(payload))
+
+    def get(self, address: str) -> HotWallet | None:
+        return self._by_address.get(_evm_form(address))
+
+    def mechanism(self, mechanisms: list[Any]) -> "PooledMechanism":
+        """One scheme's mechanism over the pool (``mechanisms``: one per key, in pool order)"""
+        return PooledMechanism(self, mechanisms)
+
+    async def check(self) -> None:
+        """Read every key's native balance (and TRON energy and bandwidth)"""
+        for wallet in self.wallets:
+            try:
+                if self.network.startswith("tron:"):
+                    client = wallet.signer._ensure_async_tron_client(self.network)
+                    wallet.balance = int(await client.get_account_balance(wallet.address) * 1_000_000)
+                    account = await client.get_account_resource(wallet.address)
+                    wallet.resources = {
+                        "energy": account.get("EnergyLimit", 0) - account.get("EnergyUsed", 0),
+                        "bandwidth": (
+                            account.get("freeNetLimit", 0) - account.get("freeNetUsed", 0)
+                            + account.get("NetLimit", 0) - account.get("NetUsed", 0)
+                        ),
+                    }
+                else:
+                    w3 = wallet.signer._ensure_async_web3_client(self.network)
+                    wallet.balance = await w3.eth.get_balance(wallet.address)
+            except Exception as exc:
+                logger.warning("Balance check for %s on %s failed: %s", wallet.address, self.network, exc)
+                continue
+            wallet.low = wallet.balance < self.min_balance
+            if wallet.low:
+                logger.warning(
+                    "Facilitator key %s on %s is low on gas (%d < %d): not used for unpinned settles",
+                    wallet.address, self.network, wallet.balance, self.min_balance,
+                )
+            WALLET_BALANCE.labels(self.network, wallet.address).set(wallet.balance)
+
+    async def monitor(self, interval: float = DEFAULT_MONITOR_INTERVAL) -> None:
+        while True:
+            await self.check()
+            await asyncio.sleep(interval)
+
+    def metrics(self) -> list[dict[str, Any]]:
+        return [
+            {
+                "address": wallet.address,
+                "in_flight": wallet.in_flight,
+                "queued": wallet.queued,
+                "settles": wallet.settles,
+                "balance": wallet.balance,
+                "resources": wallet.resources,
+                "low": wallet.low,
+            }
+            for wallet in self.wallets
+        ]
+
+
+class PooledMechanism:
+    """
+    Facilitator mechanism that settles with a key from a HotWalletPool.
+
+    All keys share one fee recipient, so verify and fee quotes are the
+    same for every key. Fee quotes leave ``caller`` empty: clients then sign
+    permits any pool key may submit. Inside ``pinned()`` settles go to the
+    pinned key.
+    """
+
+    def __init__(self, pool: HotWalletPool, mechanisms: list[Any]) -> None:
+        self._pool = pool
+        self._mechanisms = {wallet.address: mechanism for wallet, mechanism in zip(pool.wallets, mechanisms)}
+        self._first = mechanisms[0]
+
+    def __getattr__(self, name: str) -> Any:
+        return getattr(self._first, name)
+
+    async def fee_quote(
+        self, accept: PaymentRequirements, context: dict[str, Any] | None = None
+    ) -> FeeQuoteResponse | None:
+        quote = await self._first.fee_quote(accept, context)
+        if quote is not None:
+            quote.fee.caller = None
+        return quote
+
+    async def verify(self, payload: PaymentPayload, requirements: PaymentRequirements) -> VerifyResponse:
+        caller = _caller(payload)
+        if caller is not None and self._pool.pick(caller) is None:
+            return VerifyResponse(isValid=False, invalidReason="caller_not_in_pool")
+        return await self._first.verify(payload, requirements)
+
+    async def settle(
+        self, payload: PaymentPayload, requirements: PaymentRequirements
+    ) -> SettleResponse:
+        address = _pinned.get()
+        wallet = self._pool.get(address) if address else self._pool.route(payload)
+        if wallet is None:
+            return SettleResponse(
+                success=False, errorReason="caller_not_in_pool", network=requirements.network
+            )
+        in_flight = WALLET_IN_FLIGHT.labels(self._pool.network, wallet.address)
+        wallet.in_flight += 1
+        wallet.settles += 1
+        WALLET_SETTLES.labels(self._pool.network, wallet.address).inc()
+        try:
+            with in_flight.track_inprogress():
+                return await self._mechanisms[wallet.address].settle(payload, requirements)
+        finally:
+            wallet.in_flight -= 1
@@ -0,0 +1,432 @@
+"""
+Settlement Ledger
+Write-ahead record of every settle in a local SQLite database (WAL mode):
+the intent before anything is sent, the transaction hash as soon as it is
+signed (EVM) or broadcast (TRON), and the outcome. After a crash, entries left open are checked
+against the chain at startup, so every permit that may have reached the
+chain can be accounted for.
+
+Usage (ops): python facilitator/ledger.py [--tx HASH | --payer ADDRESS | --open] [--db PATH]
+"""
+
+import argparse
+import asyncio
+import fcntl
+import json
+import logging
+import os
+import queue
+import sqlite3
+import sys
+import tempfile
+import threading
+import time
+import uuid
+from collections.abc import Awaitable, Callable
+from contextvars import ContextVar
+from pathlib import Path
+from typing import Any
+
+from bankofai.x402.types import PaymentPayload, PaymentRequirements, SettleResponse
+from replay_index import normalize_address
+
+logger = logging.getLogger(__name__)
+
+DEFAULT_LEDGER_FILE = Path(tempfile.gettempdir()) / "x402-settlements.db"
+DEFAULT_RECONCILE_TIMEOUT = 30
+# Writes committed together at most (one fsync per group)
+MAX_GROUP = 256
+
+# status: intent (recorded, nothing sent yet), signed (transaction hash known,
+# about to be sent), broadcast (transaction sent), confirmed, failed, unknown
+# (the process stopped before recording a hash, or its signed transaction
+# never reached the chain). boot identifies the process that owns an open
+# entry: PIDs repeat across container restarts, boot tokens do not.
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS settlements (
+    id INTEGER PRIMARY KEY,
+    created_at REAL NOT NULL,
+    updated_at REAL NOT NULL,
+    status TEXT NOT NULL,
+    network TEXT NOT NULL,
+    scheme TEXT NOT NULL,
+    asset TEXT NOT NULL,
+    amount TEXT NOT NULL,
+    pay_to TEXT NOT NULL,
+    payer TEXT,
+    nonce TEXT,
+    tx_hash TEXT,
+    error TEXT,
+    pid INTEGER NOT NULL,
+    boot TEXT NOT NULL
+);
+CREATE INDEX IF NOT EXISTS settlements_tx_hash ON settlements (tx_hash) WHERE tx_hash IS NOT NULL;
+CREATE INDEX IF NOT EXISTS settlements_payer ON settlements (payer, id);
+CREATE INDEX IF NOT EXISTS settlements_open ON settlements (status)
+    WHERE status IN ('intent', 'signed', 'broadcast');
+"""
+OPEN = "('intent', 'signed', 'broadcast')"
+
+# Ledger and entry of the settle running in the current task
+_entry: ContextVar[tuple["SettlementLedger", int] | None] = ContextVar("ledger_entry", default=None)
+
+
+def _connect(path: Path) -> sqlite3.Connection:
+    conn = sqlite3.connect(path, isolation_level=None, check_same_thread=False)
+    conn.row_factory = sqlite3.Row
+    conn.execute("PRAGMA busy_timeout = 5000")  # other workers' commits
+    return conn
+
+
+def _payer(payload: PaymentPayload) -> tuple[str | None, str | None]:
+    data = payload.payload
+    if data.payment_permit is not None:
+        return normalize_address(data.payment_permit.buyer), data.payment_permit.meta.nonce
+    if data.authorization is not None:
+        return normalize_address(data.authorization.from_address), data.authorization.nonce
+    return None, None
+
+
+def lookup(
+    conn: sqlite3.Connection,
+    tx_hash: str | None = None,
+    payer: str | None = None,
+    open_only: bool = False,
+    limit: int = 100,
+) -> list[dict[str, Any]]:
+    """Settlements by transaction hash, by payer (newest first) or still open"""
+    if tx_hash is not None:
+        rows = conn.execute("SELECT * FROM settlements WHERE tx_hash = ? LIMIT ?", (tx_hash, limit))
+    elif payer is not None:
+        rows = conn.execute(
+            "SELECT * FROM settlements WHERE payer = ? ORDER BY id DESC LIMIT ?",
+            (normalize_address(payer), limit),
+        )
+    elif open_only:
+        rows = conn.execute(
+            f"SELECT * FROM settlements WHERE status IN {OPEN} ORDER BY id LIMIT ?",
+            (limit,),
+        )
+    else:
+        raise ValueError("Give a transaction hash, a payer or open_only")
+    return [dict(row) for row in rows]
+
+
+class SettlementLedger:
+    """
+    Settlement records shared by every worker on the host.
+
+    Writes go through one writer thread per process that commits whatever
+    is queued in a single transaction (group commit): under load many
+    settles share one fsync, and the event loop never waits on the disk.
+    A settle waits for its intent and its transaction hash to be committed
+    before going further; the final status is written without waiting (if
+    it is lost, reconciliation recovers it from the chain).
+
+    Each process tags its entries with a boot token and holds an flock on
+    ``<ledger>.live/<token>`` while it runs, so an entry's owner is known to
+    be gone once that lock is free, whatever PID it had.
+    """
+
+    def __init__(self, path: Path = DEFAULT_LEDGER_FILE) -> None:
+        path.parent.mkdir(parents=True, exist_ok=True)
+        self.path = path
+        conn = _connect(path)
+        conn.execute("PRAGMA journal_mode = WAL")
+        conn.executescript(SCHEMA)
+        conn.close()
+        self._boot = uuid.uuid4().hex
+        self._live_dir = path.with_name(f"{path.name}.live")
+        self._live_dir.mkdir(exist_ok=True)
+        self._live_fd = os.open(self._live_dir / self._boot, os.O_RDWR | os.O_CREAT, 0o644)
+        fcntl.flock(self._live_fd, fcntl.LOCK_EX)
+        self._reader = _connect(path)  # lookups run on the event loop: indexed and short
+        self._queue: queue.SimpleQueue = queue.SimpleQueue()
+        self._writer = threading.Thread(target=self._write_loop, name="settlement-ledger", daemon=True)
+        self._writer.start()
+        self._closed = False
+        self._pid = os.getpid()
+        # Network -> signer used to look up open transactions (set by whoever builds the mechanisms)
+        self.signers: dict[str, Any] = {}
+        self.writes = 0
+        self.commits = 0
+        self.reconciled = 0
+
+    # Writer thread
+
+    def _write_loop(self) -> None:
+        conn = _connect(self.path)
+        conn.execute("PRAGMA synchronous = FULL")  # a committed intent survives power loss
+        stopping = False
+        while not stopping:
+            group = [self._queue.get()]
+            while len(group) < MAX_GROUP:
+                try:
+                    group.append(self._queue.get_nowait())
+                except queue.Empty:
+                    break
+            if None in group:
+                stopping = True
+                group = [write for write in group if write is not None]
+            if not group:
+                continue
+            results: list[Any] = []
+            try:
+                conn.execute("BEGIN IMMEDIATE")
+                for sql, params, _ in group:
+                    cursor = conn.execute(sql, params)
+                    results.append(cursor.lastrowid if sql.startswith("INSERT") else cursor.rowcount)
+                conn.execute("COMMIT")
+            except Exception as exc:
+                if conn.in_transaction:
+                    conn.execute("ROLLBACK")
+                logger.error("Settlement ledger write failed: %s", exc)
+                results = [exc] * len(group)
+            self.writes += len(group)
+            self.commits += 1
+            for (_, _, waiter), result in zip(group, results):
+                if waiter is not None:
+                    loop, future = waiter
+                    loop.call_soon_threadsafe(_resolve, future, result)
+        conn.close()
+
+    def _write(self, sql: str, params: tuple) -> Awaitable[Any]:
+        """Queue a write; the returned future resolves once it is committed"""
+        if self._closed:
+            raise RuntimeError("Settlement ledger is closed")
+        loop = asyncio.get_running_loop()
+        future = loop.create_future()
+        self._queue.put((sql, params, (loop, future)))
+        return future
+
+    def _write_later(self, sql: str, params: tuple) -> None:
+        self._queue.put((sql, params, None))
+
+    # Settle lifecycle
+
+    async def intent(self, payload: PaymentPayload, requirements: PaymentRequirements) -> int:
+        """Record a settle about to start; returns its entry ID"""
+        payer, nonce = _payer(payload)
+        now = time.time()
+        return await self._write(
+            "INSERT INTO settlements (created_at, updated_at, status, network, scheme, asset,"
+            " amount, pay_to, payer, nonce, pid, boot) VALUES (?, ?, 'intent', ?, ?, ?, ?, ?, ?, ?, ?, ?)",
+            (
+                now, now, requirements.network, requirements.scheme, requirements.asset,
+                requirements.amount, requirements.pay_to, payer, nonce, self._pid, self._boot,
+            ),
+        )
+
+    async def signed(self, entry: int, tx_hash: str) -> None:
+        """The settle's transaction is signed and about to be sent"""
+        await self._write(
+            "UPDATE settlements SET status = 'signed', tx_hash = ?, updated_at = ? WHERE id = ?",
+            (tx_hash, time.time(), entry),
+        )
+
+    async def broadcast(self, entry: int, tx_hash: str) -> None:
+        """The settle's transaction was sent"""
+        await self._write(
+            "UPDATE settlements SET status = 'broadcast', tx_hash = ?, updated_at = ? WHERE id = ?",
+            (tx_hash, time.time(), entry),
+        )
+
+    def finish(self, entry: int, status: str, tx_hash: str | None, error: str | None) -> None:
+        self._write_later(
+            "UPDATE settlements SET status = ?, tx_hash = COALESCE(?, tx_hash), error = ?,"
+            " updated_at = ? WHERE id = ?",
+            (status, tx_hash, error, time.time(), entry),
+        )
+
+    def recorded(
+        self, settle: Callable[[PaymentPayload, PaymentRequirements], Awaitable[SettleResponse]]
+    ) -> Callable[[PaymentPayload, PaymentRequirements], Awaitable[SettleResponse]]:
+        """Wrap a settle function so every call is written to the ledger"""
+
+        async def settle_recorded(
+            payload: PaymentPayload, requirements: PaymentRequirements
+        ) -> SettleResponse:
+            entry = await self.intent(payload, requirements)
+            token = _entry.set((self, entry))
+            try:
+                response = await settle(payload, requirements)
+            except BaseException as exc:
+                # Sent or not is unknown here: leave it open for reconciliation
+                self._write_later(
+                    "UPDATE settlements SET error = ?, updated_at = ? WHERE id = ?",
+                    (repr(exc), time.time(), entry),
+                )
+                raise
+            finally:
+                _entry.reset(token)
+            self.finish(
+                entry,
+                "confirmed" if response.success else "failed",
+                response.transaction,
+                response.error_reason,
+            )
+            return response
+
+        return settle_recorded
+
+    # Recovery
+
+    def _running(self, boot: str) -> bool:
+        """Whether the process that wrote an open entry may still be working on it"""
+        if boot == self._boot:
+            return True
+        marker = self._live_dir / boot
+        try:
+            fd = os.open(marker, os.O_RDWR)
+        except FileNotFoundError:
+            return False
+        try:
+            fcntl.flock(fd, fcntl.LOCK_EX | fcntl.LOCK_NB)
+        except BlockingIOError:
+            return True
+        else:
+            marker.unlink(missing_ok=True)
+            return False
+        finally:
+            os.close(fd)
+
+    async def reconcile(self, timeout: int = DEFAULT_RECONCILE_TIMEOUT) -> None:
+        """
+        Settle the status of entries left open by processes that are gone:
+        a signed or broadcast transaction is looked up on the chain
+        (confirmed or failed; a signed one that is not found becomes
+        ``unknown``, it may never have been sent); an intent without a
+        transaction hash becomes ``unknown``, since the process may have
+        stopped before recording one. Each entry is claimed first, so
+        concurrent workers do not repeat work.
+        """
+        rows = self._reader.execute(
+            f"SELECT id, boot, status, network, tx_hash FROM settlements WHERE status IN {OPEN}"
+        ).fetchall()
+        for row in rows:
+            if self._running(row["boot"]):
+                continue
+            claimed = await self._write(
+                "UPDATE settlements SET pid = ?, boot = ?, updated_at = ? WHERE id = ? AND boot = ?",
+                (self._pid, self._boot, time.time(), row["id"], row["boot"]),
+            )
+            if not claimed:
+                continue
+            if row["tx_hash"] is None:
+                self.finish(row["id"], "unknown", None, "stopped before a transaction hash was recorded")
+                self.reconciled += 1
+                continue
+            signer = self.signers.get(row["network"])
+            if signer is None:
+                continue
+            try:
+                receipt = await signer.wait_for_transaction_receipt(
+                    row["tx_hash"], timeout=timeout, network=row["network"]
+                )
+            except Exception as exc:
+                if row["status"] == "signed":
+                    self.finish(row["id"], "unknown", None, f"signed transaction not found on chain: {exc}")
+                    self.reconciled += 1
+                    continue
+                # Not found yet: stays open, retried at the next startup
+                logger.warning("Reconcile %s (%s) failed: %s", row["tx_hash"], row["network"], exc)
+                continue
+            status = str(receipt.get("status", "")).lower()
+            if status in ("failed", "0"):
+                self.finish(row["id"], "failed", None, "transaction_failed_on_chain")
+            else:
+                self.finish(row["id"], "confirmed", None, None)
+            self.reconciled += 1
+        if self.reconciled:
+            logger.info("Settlement ledger: reconciled %d open entries", self.reconciled)
+
+    def lookup(self, **query: Any) -> list[dict[str, Any]]:
+        """See lookup(); indexed, so fast enough to run on the event loop"""
+        return lookup(self._reader, **query)
+
+    def close(self) -> None:
+        """Commit queued writes and stop the writer"""
+        if self._closed:
+            return
+        self._closed = True
+        self._queue.put(None)
+        self._writer.join()
+        self._reader.close()
+        fcntl.flock(self._live_fd, fcntl.LOCK_UN)
+        os.close(self._live_fd)
+        (self._live_dir / self._boot).unlink(missing_ok=True)
+
+    def metrics(self) -> dict[str, Any]:
+        """Write and group commit counters"""
+        return {
+            "file": str(self.path),
+            "writes": self.writes,
+            "commits": self.commits,
+            "avg_group_size": round(self.writes / self.commits, 2) if self.commits else 0.0,
+            "reconciled": self.reconciled,
+        }
+
+
+async def record_signed(tx_hash: str) -> None:
+    """
+    Record the hash of a transaction the current settle is about to send.
+
+    Called by signers that sign locally, before they broadcast: a crash
+    between sending and recording then still leaves a hash to look up.
+    """
+    current = _entry.get()
+    if current is not None:
+        ledger, entry = current
+        await ledger.signed(entry, tx_hash)
+
+
+def _resolve(future: asyncio.Future, result: Any) -> None:
+    if future.done():
+        return
+    if isinstance(result, Exception):
+        future.set_exception(result)
+    else:
+        future.set_result(result)
+
+
+class LedgerSigner:
+    """
+    Facilitator signer wrapper that records each transaction hash in the
+    ledger entry of the settle sending it, as soon as write_contract returns.
+    """
+
+    def __init__(self, signer: Any, ledger: SettlementLedger) -> None:
+        self._signer = signer
+        self._ledger = ledger
+
+    def __getattr__(self, name: str) -> Any:
+        return getattr(self._signer, name)
+
+    async def write_contract(self, *args: Any, **kwargs: Any) -> str | None:
+        tx_hash = await self._signer.write_contract(*args, **kwargs)
+        current = _entry.get()
+        if tx_hash and current is not None:
+            await self._ledger.broadcast(current[1], tx_hash)
+        return tx_hash
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description="Look up settlements in the ledger")
+    parser.add_argument("--db", type=Path, default=Path(os.getenv("SETTLE_LEDGER_FILE", DEFAULT_LEDGER_FILE)))
+    group = parser.add_mutually_exclusive_group(required=True)
+    group.add_argument("--tx", help="transaction hash")
+    group.add_argument("--payer", help="payer address (latest first)")
+    group.add_argument("--open", action="store_true", help="entries not yet final")
+    parser.add_argument("--limit", type=int, default=100)
+    args = parser.parse_args()
+
+    if not args.db.exists():
+        sys.exit(f"No ledger at {args.db}")
+    conn = sqlite3.connect(f"file:{args.db}?mode=ro", uri=True)
+    conn.row_factory = sqlite3.Row
+    for row in lookup(conn, tx_hash=args.tx, payer=args.payer, open_only=args.open, limit=args.limit):
+        print(json.dumps(row))
+
+
+if __name__ == "__main__":
+    main()
@@ -3,32 +3,58 @@ Facilitator Main Entry Point
 Starts a FastAPI server for facilitator operations with full payment flow support.
 """
 
-import asyncio
+import hashlib
+import logging
 import os
 import sys
 from pathlib import Path
-from typing import Any
 
-from dotenv import load_dotenv
-from fastapi import FastAPI, HTTPException
-from fastapi.middleware.cors import CORSMiddleware
-import uvicorn
-
-from bankofai.x402.logging_config import setup_logging
+from bankofai.x402.config import NetworkConfig
 from bankofai.x402.facilitator import X402Facilitator
-from bankofai.x402.mechanisms.tron.exact_permit import ExactPermitTronFacilitatorMechanism
-from bankofai.x402.mechanisms.evm.exact_permit import ExactPermitEvmFacilitatorMechanism
 from bankofai.x402.mechanisms.evm.exact import ExactEvmFacilitatorMechanism
-from bankofai.x402.signers.facilitator import TronFacilitatorSigner, EvmFacilitatorSigner
-from bankofai.x402.config import NetworkConfig
+from bankofai.x402.mechanisms.evm.exact_permit import ExactPermitEvmFacilitatorMechanism
+from bankofai.x402.mechanisms.tron.exact_permit import (
+    ExactPermitTronFacilitatorMechanism,
+)
+from bankofai.x402.signers.facilitator import TronFacilitatorSigner
 from bankofai.x402.tokens import TokenRegistry
 from bankofai.x402.types import (
     PaymentPayload,
     PaymentRequirements,
-    SupportedFee,
 )
+from dotenv import load_dotenv
+from fastapi import Depends, FastAPI, Header, HTTPException, Request, Response
+from fastapi.middleware.cors import CORSMiddleware
+from fastapi.responses import JSONResponse
 from pydantic import BaseModel
 
+sys.path.insert(0, str(Path(__file__).parent.parent))
+
+from account_lock import DEFAULT_LOCK_DIR, AccountLock, AccountLockedMechanism
+from hot_wallets import DEFAULT_MONITOR_INTERVAL, HotWallet, HotWalletPool
+from ledger import DEFAULT_LEDGER_FILE, LedgerSigner, SettlementLedger
+from quote_cache import DEFAULT_MAX_ENTRIES as DEFAULT_QUOTE_CACHE_SIZE
+from quote_cache import DEFAULT_TTL as DEFAULT_QUOTE_CACHE_TTL
+from quote_cache import FeeQuoteCache, json_body
+from replay_index import DEFAULT_INDEX_FILE, ReplayIndex
+from rpc_pool import DEFAULT_PROBE_INTERVAL, RpcPool, parse_endpoints
+from service import FacilitatorService
+from settle_batcher import (
+    DEFAULT_BATCH_SIZE,
+    PipelinedEvmSigner,
+    SettleBatcher,
+    SettleTarget,
+)
+from settlements import DEFAULT_STATUS_DIR, DEFAULT_STATUS_TTL, SettlementTracker
+from signature_pool import PooledVerifySigner, SignaturePool, default_workers
+from verify_cache import DEFAULT_MAX_ENTRIES, DEFAULT_TTL, VerifyCache
+
+from common.logs import lazy_json, setup_logging
+from common.metrics import CONTENT_TYPE as METRICS_CONTENT_TYPE
+from common.metrics import REGISTRY
+from common.profiling import install_profiling, require_token
+from common.serve import serve
+
 
 class VerifyRequest(BaseModel):
     """Verify request model"""
@@ -36,10 +62,16 @@ class VerifyRequest(BaseModel):
     paymentRequirements: PaymentRequirements
 
 
+class VerifyBatchRequest(BaseModel):
+    """Batch verify request model"""
+    items: list[VerifyRequest]
+
+
 class SettleRequest(BaseModel):
     """Settle request model"""
     paymentPayload: PaymentPayload
     paymentRequirements: PaymentRequirements
+    webhookUrl: str | None = None  # settle in the background and POST the result here
 
 
 class FeeQuoteRequest(BaseModel):
@@ -47,20 +79,62 @@ class FeeQuoteRequest(BaseModel):
     accepts: list[PaymentRequirements]
     paymentPermitContext: dict | None = None
 
-# Setup logging
-setup_logging()
-
 # Load environment variables
 load_dotenv(Path(__file__).parent / ".env")
 load_dotenv(Path(__file__).parent.parent / ".env")
 
+# Queued, non-blocking logging (LOG_LEVEL, LOG_FORMAT, LOG_LEVELS, LOG_SAMPLE)
+setup_logging()
+logger = logging.getLogger(__name__)
+
 # Configuration
 TRON_PRIVATE_KEY = os.getenv("TRON_PRIVATE_KEY", "")
 BSC_PRIVATE_KEY = os.getenv("BSC_PRIVATE_KEY", "")
+# Extra facilitator keys (comma-separated): settles are spread over the primary key and these
+TRON_HOT_WALLET_KEYS = [key.strip() for key in os.getenv("TRON_HOT_WALLET_KEYS", "").split(",") if key.strip()]
+BSC_HOT_WALLET_KEYS = [key.strip() for key in os.getenv("BSC_HOT_WALLET_KEYS", "").split(",") if key.strip()]
+HOT_WALLET_MONITOR_INTERVAL = float(os.getenv("HOT_WALLET_MONITOR_INTERVAL", str(DEFAULT_MONITOR_INTERVAL)))
+# RPC endpoints per network ("network=url,url;network=url"); networks not listed use the SDK's default node
+RPC_ENDPOINTS = parse_endpoints(os.getenv("RPC_ENDPOINTS", ""))
+RPC_PROBE_INTERVAL = float(os.getenv("RPC_PROBE_INTERVAL", str(DEFAULT_PROBE_INTERVAL)))
+RPC_HEDGE = os.getenv("RPC_HEDGE", "1") != "0"  # send slow reads to a second endpoint
 
 # Facilitator configuration
 FACILITATOR_HOST = "0.0.0.0"
 FACILITATOR_PORT = 8001
+FACILITATOR_WORKERS = int(os.getenv("FACILITATOR_WORKERS", "1"))  # >1: one process per worker (SO_REUSEPORT)
+GRACEFUL_TIMEOUT = int(os.getenv("GRACEFUL_TIMEOUT", "30"))  # seconds to drain on shutdown
+# Directory for per-account settle lock files (shared by all workers)
+NONCE_LOCK_DIR = Path(os.getenv("NONCE_LOCK_DIR", DEFAULT_LOCK_DIR))
+# Cache of successful /verify results (0 entries disables it)
+VERIFY_CACHE_SIZE = int(os.getenv("VERIFY_CACHE_SIZE", str(DEFAULT_MAX_ENTRIES)))
+VERIFY_CACHE_TTL = float(os.getenv("VERIFY_CACHE_TTL", str(DEFAULT_TTL)))  # seconds, capped at the permit deadline
+# Signature recovery processes per facilitator worker (0: recover on the event loop;
+# default: this worker's share of the cores when that is more than one)
+VERIFY_WORKERS = int(os.getenv("VERIFY_WORKERS", str(default_workers(FACILITATOR_WORKERS))))
+VERIFY_BATCH_MAX = int(os.getenv("VERIFY_BATCH_MAX", "256"))  # payments per /verify/batch call
+# Batched EVM settlement: collect settles for this many ms per network/token (0 disables)
+SETTLE_BATCH_WINDOW_MS = float(os.getenv("SETTLE_BATCH_WINDOW_MS", "0"))
+SETTLE_BATCH_SIZE = int(os.getenv("SETTLE_BATCH_SIZE", str(DEFAULT_BATCH_SIZE)))
+# Fee quote cache (0 seconds disables it); entries also refresh before the quotes expire
+FEE_QUOTE_CACHE_TTL = float(os.getenv("FEE_QUOTE_CACHE_TTL", str(DEFAULT_QUOTE_CACHE_TTL)))
+FEE_QUOTE_CACHE_SIZE = int(os.getenv("FEE_QUOTE_CACHE_SIZE", str(DEFAULT_QUOTE_CACHE_SIZE)))
+# Background settlement (Prefer: respond-async or webhookUrl): shared status files and long-poll cap
+SETTLE_STATUS_DIR = Path(os.getenv("SETTLE_STATUS_DIR", DEFAULT_STATUS_DIR))
+SETTLE_STATUS_TTL = float(os.getenv("SETTLE_STATUS_TTL", str(DEFAULT_STATUS_TTL)))
+SETTLE_LONG_POLL_MAX = float(os.getenv("SETTLE_LONG_POLL_MAX", "30"))
+# Comma-separated webhook hosts the facilitator may call (empty: webhooks disabled)
+SETTLE_WEBHOOK_HOSTS = frozenset(
+    host.strip() for host in os.getenv("SETTLE_WEBHOOK_HOSTS", "").split(",") if host.strip()
+)
+# Append-only record of settled permits, replayed at startup and shared by all workers (empty: disabled)
+REPLAY_INDEX_FILE = os.getenv("REPLAY_INDEX_FILE", str(DEFAULT_INDEX_FILE))
+# SQLite settlement ledger (intent, tx hash, outcome of every settle) shared by all workers (empty: disabled)
+SETTLE_LEDGER_FILE = os.getenv("SETTLE_LEDGER_FILE", str(DEFAULT_LEDGER_FILE))
+# Enables GET /debug/profile and X-Trace request spans, both requiring this token (empty: disabled)
+PROFILING_TOKEN = os.getenv("PROFILING_TOKEN", "")
+# Operator token for /metrics* and /ledger (empty: those endpoints answer 404)
+METRICS_TOKEN = os.getenv("METRICS_TOKEN", "")
 # TRON supported networks
 TRON_NETWORKS = ["mainnet", "shasta", "nile"]
 
@@ -76,157 +150,461 @@ BSC_BASE_FEE = {
 BSC_MAINNET_BASE_FEE = {
     "EPS": 100_000_000_000_000,       # 0.0001 EPS (18 decimals on BSC mainnet)
 }
+# Native balance (smallest unit) below which a pooled key only settles permits that name it
+MIN_GAS_BALANCE = {
+    "tron": 50_000_000,                 # 50 TRX
+    "eip155": 2_000_000_000_000_000,    # 0.002 BNB
+}
 
-if not TRON_PRIVATE_KEY:
-    raise ValueError("TRON_PRIVATE_KEY environment variable is required")
-if not BSC_PRIVATE_KEY:
-    raise ValueError("BSC_PRIVATE_KEY environment variable is required")
-
-# Initialize FastAPI app
-app = FastAPI(
-    title="X402 Facilitator",
-    description="Facilitator service for X402 payment protocol",
-    version="1.0.0",
-)
+ALL_NETWORKS = [f"tron:{n}" for n in TRON_NETWORKS] + [NetworkConfig.BSC_MAINNET, NetworkConfig.BSC_TESTNET]
 
-# Add CORS middleware
-app.add_middleware(
-    CORSMiddleware,
-    allow_origins=["*"],
-    allow_credentials=True,
-    allow_methods=["*"],
-    allow_headers=["*"],
-)
 
-# Get facilitator addresses
-bsc_signer = EvmFacilitatorSigner.from_private_key(BSC_PRIVATE_KEY)
-bsc_facilitator_address = bsc_signer.get_address()
+def build_service() -> FacilitatorService:
+    """
+    Build the facilitator's signers, mechanisms, caches and settle queue.
 
-# Initialize X402Facilitator
-facilitator = X402Facilitator()
+    Called once per process: by create_app() for each facilitator worker,
+    and by resource server workers running the facilitator in-process.
+    """
+    if not TRON_PRIVATE_KEY:
+        raise ValueError("TRON_PRIVATE_KEY environment variable is required")
+    if not BSC_PRIVATE_KEY:
+        raise ValueError("BSC_PRIVATE_KEY environment variable is required")
+
+    unknown = set(RPC_ENDPOINTS) - set(ALL_NETWORKS)
+    if unknown:
+        raise ValueError(f"RPC_ENDPOINTS lists unsupported networks: {', '.join(sorted(unknown))}")
+    # Chain calls of every signer on a listed network go through that network's endpoint pool
+    rpc_pools = {
+        network: RpcPool(network, urls, api_key=os.getenv("TRON_GRID_API_KEY"), hedge=RPC_HEDGE)
+        for network, urls in RPC_ENDPOINTS.items()
+    }
+
+    # Signature recovery runs in a process pool, off the event loop
+    signature_pool = SignaturePool(VERIFY_WORKERS) if VERIFY_WORKERS > 0 else None
+
+    # Write-ahead settlement records; open entries of a previous run are reconciled at startup
+    ledger = SettlementLedger(Path(SETTLE_LEDGER_FILE)) if SETTLE_LEDGER_FILE else None
+
+    def mechanism_signer(signer):
+        """The signer as a mechanism uses it: pooled signature recovery, ledgered transactions"""
+        if signature_pool:
+            signer = PooledVerifySigner(signer, signature_pool)
+        if ledger:
+            signer = LedgerSigner(signer, ledger)
+        return signer
+
+    # Get facilitator addresses (the primary keys; they also collect the fees)
+    bsc_signer = PipelinedEvmSigner.from_private_key(BSC_PRIVATE_KEY)
+    bsc_facilitator_address = bsc_signer.get_address()
+    # Settles from one account on one chain share a nonce sequence, in every worker
+    account_locks: dict[tuple[str, str], AccountLock] = {}
+
+    def account_lock(network, signer):
+        key = (network, signer.get_address())
+        if key not in account_locks:
+            account_locks[key] = AccountLock(*key, NONCE_LOCK_DIR)
+        return account_locks[key]
+
+    # Initialize X402Facilitator
+    facilitator = X402Facilitator()
+    hot_wallet_pools: list[HotWalletPool] = []
+
+    def register(network, signers, *mechanism_factories):
+        """Register one mechanism per scheme, over a hot wallet pool when the network has several keys"""
+        if network in rpc_pools:
+            for signer in signers:
+                rpc_pools[network].install(signer)
+        pool = None
+        if len(signers) > 1:
+            wallets = [HotWallet(signer.get_address(), signer) for signer in signers]
+            pool = HotWalletPool(network, wallets, MIN_GAS_BALANCE[network.split(":")[0]])
+            hot_wallet_pools.append(pool)
+        for make in mechanism_factories:
+            mechanisms = [make(signer) for signer in signers]
+            facilitator.register([network], pool.mechanism(mechanisms) if pool else mechanisms[0])
+        return pool
+
+    # Register TRON mechanisms
+    chain_signers = {}
+    for network in TRON_NETWORKS:
+        tron_signers = [
+            TronFacilitatorSigner.from_private_key(key) for key in [TRON_PRIVATE_KEY, *TRON_HOT_WALLET_KEYS]
+        ]
+        tron_fee_to = tron_signers[0].get_address()
+        chain_signers[f"tron:{network}"] = tron_signers[0]
+        register(
+            f"tron:{network}",
+            tron_signers,
+            lambda signer, fee_to=tron_fee_to: ExactPermitTronFacilitatorMechanism(
+                mechanism_signer(signer),
+                fee_to=fee_to,
+                base_fee=TRON_BASE_FEE,
+            ),
+        )
+
+    # Register BSC testnet mechanisms (exact_permit + exact)
+    evm_signers = {
+        NetworkConfig.BSC_TESTNET: [
+            bsc_signer, *(PipelinedEvmSigner.from_private_key(key) for key in BSC_HOT_WALLET_KEYS)
+        ],
+    }
+    evm_pools = {}
+    evm_pools[NetworkConfig.BSC_TESTNET] = register(
+        NetworkConfig.BSC_TESTNET,
+        evm_signers[NetworkConfig.BSC_TESTNET],
+        lambda signer: AccountLockedMechanism(
+            ExactPermitEvmFacilitatorMechanism(
+                mechanism_signer(signer),
+                fee_to=bsc_facilitator_address,
+                base_fee=BSC_BASE_FEE,
+            ),
+            account_lock(NetworkConfig.BSC_TESTNET, signer),
+        ),
+        lambda signer: AccountLockedMechanism(
+            ExactEvmFacilitatorMechanism(mechanism_signer(signer)),
+            account_lock(NetworkConfig.BSC_TESTNET, signer),
+        ),
+    )
 
-# Register TRON mechanisms
-for network in TRON_NETWORKS:
-    signer = TronFacilitatorSigner.from_private_key(TRON_PRIVATE_KEY)
-    mechanism = ExactPermitTronFacilitatorMechanism(
-        signer,
-        base_fee=TRON_BASE_FEE,
+    # Register BSC mainnet mechanisms (exact_permit + exact)
+    bsc_mainnet_signer = PipelinedEvmSigner.from_private_key(BSC_PRIVATE_KEY)
+    bsc_mainnet_facilitator_address = bsc_mainnet_signer.get_address()
+    evm_signers[NetworkConfig.BSC_MAINNET] = [
+        bsc_mainnet_signer, *(PipelinedEvmSigner.from_private_key(key) for key in BSC_HOT_WALLET_KEYS)
+    ]
+    evm_pools[NetworkConfig.BSC_MAINNET] = register(
+        NetworkConfig.BSC_MAINNET,
+        evm_signers[NetworkConfig.BSC_MAINNET],
+        lambda signer: AccountLockedMechanism(
+            ExactPermitEvmFacilitatorMechanism(
+                mechanism_signer(signer),
+                fee_to=bsc_mainnet_facilitator_address,
+                base_fee=BSC_MAINNET_BASE_FEE,
+            ),
+            account_lock(NetworkConfig.BSC_MAINNET, signer),
+        ),
+        lambda signer: AccountLockedMechanism(
+            ExactEvmFacilitatorMechanism(mechanism_signer(signer)),
+            account_lock(NetworkConfig.BSC_MAINNET, signer),
+        ),
     )
-    facilitator.register([f"tron:{network}"], mechanism)
 
-# Register BSC testnet mechanisms (exact + exact)
-bsc_exact_mechanism = ExactPermitEvmFacilitatorMechanism(
-    bsc_signer,
-    fee_to=bsc_facilitator_address,
-    base_fee=BSC_BASE_FEE,
-)
-facilitator.register([NetworkConfig.BSC_TESTNET], bsc_exact_mechanism)
+    chain_signers[NetworkConfig.BSC_TESTNET] = bsc_signer
+    chain_signers[NetworkConfig.BSC_MAINNET] = bsc_mainnet_signer
+    if ledger:
+        ledger.signers = chain_signers
+
+    # Verify results are cached per worker; /settle always checks the chain
+    verify_cache = VerifyCache(VERIFY_CACHE_SIZE, VERIFY_CACHE_TTL) if VERIFY_CACHE_SIZE > 0 else None
+
+    # Optional settlement queue: one account lock and pipelined nonces per batch and key
+    settle_batcher = (
+        SettleBatcher(
+            ledger.recorded(facilitator.settle) if ledger else facilitator.settle,
+            targets={
+                network: [SettleTarget(account_lock(network, signer), signer) for signer in signers]
+                for network, signers in evm_signers.items()
+            },
+            window=SETTLE_BATCH_WINDOW_MS / 1000,
+            max_size=SETTLE_BATCH_SIZE,
+            pools={network: pool for network, pool in evm_pools.items() if pool},
+        )
+        if SETTLE_BATCH_WINDOW_MS > 0
+        else None
+    )
+    quote_cache = (
+        FeeQuoteCache(FEE_QUOTE_CACHE_SIZE, FEE_QUOTE_CACHE_TTL) if FEE_QUOTE_CACHE_TTL > 0 else None
+    )
+    # Settled permits: duplicate settles are rejected without an RPC call
+    replay_index = ReplayIndex(Path(REPLAY_INDEX_FILE)) if REPLAY_INDEX_FILE else None
 
-bsc_native_mechanism = ExactEvmFacilitatorMechanism(
-    bsc_signer,
-)
-facilitator.register([NetworkConfig.BSC_TESTNET], bsc_native_mechanism)
+    print("=" * 80)
+    print(f"X402 Payment Facilitator - Configuration (pid {os.getpid()})")
+    print("=" * 80)
+    print(f"BSC  Facilitator Address: {bsc_facilitator_address}")
+    print(f"BSC  Nonce Locks: {NONCE_LOCK_DIR} (one per network and account)")
+    for pool in hot_wallet_pools:
+        print(f"Hot Wallets ({pool.network}): {', '.join(wallet.address for wallet in pool.wallets)}")
+    for rpc_pool in rpc_pools.values():
+        print(f"RPC Pool ({rpc_pool.network}): {', '.join(endpoint.label for endpoint in rpc_pool.endpoints)}")
+    print(f"TRON Base Fee: {TRON_BASE_FEE}")
+    print(f"BSC  Base Fee: {BSC_BASE_FEE}")
+    print(f"Supported Networks: {', '.join(ALL_NETWORKS)}")
+    if verify_cache:
+        print(f"Verify Cache: {verify_cache.max_entries} entries, ttl {verify_cache.ttl}s")
+    else:
+        print("Verify Cache: disabled")
+    if signature_pool:
+        print(f"Signature Recovery: {signature_pool.workers} processes (batch limit {VERIFY_BATCH_MAX})")
+    else:
+        print("Signature Recovery: on the event loop")
+    if replay_index:
+        print(f"Replay Index: {replay_index.path} ({replay_index.loaded} settled permits loaded)")
+    else:
+        print("Replay Index: disabled")
+    if ledger:
+        print(f"Settlement Ledger: {ledger.path}")
+    else:
+        print("Settlement Ledger: disabled")
+    if settle_batcher:
+        print(f"Settle Batching: {SETTLE_BATCH_WINDOW_MS} ms window, up to {SETTLE_BATCH_SIZE} per batch (BSC)")
+    else:
+        print("Settle Batching: disabled")
+
+    print("\nNetwork Details:")
+    for network_key in ALL_NETWORKS:
+        print(f"  {network_key}:")
+        print(f"    PaymentPermit: {NetworkConfig.get_payment_permit_address(network_key)}")
+        tokens = TokenRegistry.get_network_tokens(network_key)
+        if tokens:
+            for symbol, info in tokens.items():
+                print(f"    {symbol}: {info.address} (decimals={info.decimals})")
+    print("=" * 80)
 
-# Register BSC mainnet mechanisms (exact + exact)
-bsc_mainnet_signer = EvmFacilitatorSigner.from_private_key(BSC_PRIVATE_KEY)
-bsc_mainnet_facilitator_address = bsc_mainnet_signer.get_address()
+    return FacilitatorService(
+        facilitator,
+        verify_cache,
+        quote_cache,
+        settle_batcher,
+        signature_pool,
+        replay_index,
+        ledger,
+        hot_wallet_pools,
+        HOT_WALLET_MONITOR_INTERVAL,
+        list(rpc_pools.values()),
+        RPC_PROBE_INTERVAL,
+    )
 
-bsc_mainnet_exact_mechanism = ExactPermitEvmFacilitatorMechanism(
-    bsc_mainnet_signer,
-    fee_to=bsc_mainnet_facilitator_address,
-    base_fee=BSC_MAINNET_BASE_FEE,
-)
-facilitator.register([NetworkConfig.BSC_MAINNET], bsc_mainnet_exact_mechanism)
 
-bsc_mainnet_native_mechanism = ExactEvmFacilitatorMechanism(
-    bsc_mainnet_signer,
-)
-facilitator.register([NetworkConfig.BSC_MAINNET], bsc_mainnet_native_mechanism)
-
-print("=" * 80)
-print("X402 Payment Facilitator - Configuration")
-print("=" * 80)
-print(f"BSC  Facilitator Address: {bsc_facilitator_address}")
-print(f"TRON Base Fee: {TRON_BASE_FEE}")
-print(f"BSC  Base Fee: {BSC_BASE_FEE}")
-
-all_networks = [f"tron:{n}" for n in TRON_NETWORKS] + [NetworkConfig.BSC_MAINNET, NetworkConfig.BSC_TESTNET]
-print(f"Supported Networks: {', '.join(all_networks)}")
-
-print(f"\nNetwork Details:")
-for network_key in all_networks:
-    print(f"  {network_key}:")
-    print(f"    PaymentPermit: {NetworkConfig.get_payment_permit_address(network_key)}")
-    tokens = TokenRegistry.get_network_tokens(network_key)
-    if tokens:
-        for symbol, info in tokens.items():
-            print(f"    {symbol}: {info.address} (decimals={info.decimals})")
-print("=" * 80)
-
-@app.get("/supported")
-def supported():
-    """Get supported capabilities"""
-    return facilitator.supported(pricing="flat")
-
-
-@app.post("/fee/quote")
-async def fee_quote(request: FeeQuoteRequest):
+def create_app() -> FastAPI:
     """
-    Get fee quote for payment requirements
-    
-    Args:
-        request: Fee quote request with payment requirements
-        
-    Returns:
-        Fee quote response with fee details
+    Build the facilitator app.
+
+    Called once per worker process: signers, mechanisms and their RPC clients
+    belong to the worker that created them.
     """
-    try:
-        return await facilitator.fee_quote(request.accepts, request.paymentPermitContext)
-    except ValueError as e:
-        raise HTTPException(status_code=400, detail=str(e))
-    except Exception as e:
-        raise HTTPException(status_code=500, detail=str(e))
+    service = build_service()
 
+    # Initialize FastAPI app
+    app = FastAPI(
+        title="X402 Facilitator",
+        description="Facilitator service for X402 payment protocol",
+        version="1.0.0",
+    )
 
-@app.post("/verify")
-async def verify(request: VerifyRequest):
-    """
-    Verify payment payload
+    # Add CORS middleware
+    app.add_middleware(
+        CORSMiddleware,
+        allow_origins=["*"],
+        allow_credentials=True,
+        allow_methods=["*"],
+        allow_headers=["*"],
+    )
+
+    # /metrics* and /ledger need the operator token (404 while it is unset)
+    operator_only = Depends(require_token(METRICS_TOKEN))
+
+    # /supported only depends on the registered mechanisms: serialize it once
+    supported_body = json_body(service.facilitator.supported(pricing="flat"))
+    supported_etag = f'"{hashlib.blake2b(supported_body, digest_size=16).hexdigest()}"'
+
+    # Settles accepted with Prefer: respond-async run here; status via GET /settle/{id}
+    settlement_tracker = SettlementTracker(
+        service.settle_payment,
+        status_dir=SETTLE_STATUS_DIR,
+        ttl=SETTLE_STATUS_TTL,
+        webhook_hosts=SETTLE_WEBHOOK_HOSTS,
+    )
+    print(f"Settlement Status: {SETTLE_STATUS_DIR} (ttl {SETTLE_STATUS_TTL}s)")
+
+    @app.get("/supported")
+    def supported(request: Request):
+        """Get supported capabilities (precomputed, with ETag)"""
+        headers = {"ETag": supported_etag, "Cache-Control": "public, max-age=60"}
+        if request.headers.get("if-none-match") == supported_etag:
+            return Response(status_code=304, headers=headers)
+        return Response(content=supported_body, media_type="application/json", headers=headers)
+
+    @app.post("/fee/quote")
+    async def fee_quote(request: FeeQuoteRequest):
+        """
+        Get fee quote for payment requirements
     
-    Args:
-        request: Verify request with payment payload and requirements
+        Args:
+            request: Fee quote request with payment requirements
         
-    Returns:
-        Verification result
-    """
-    import logging
-    logger = logging.getLogger(__name__)
-    logger.info(f"[VERIFY REQUEST] Payload: {request.paymentPayload.model_dump(by_alias=True)}")
+        Returns:
+            Fee quote response with fee details
+        """
+        try:
+            body = await service.fee_quote_body(request.accepts, request.paymentPermitContext)
+            return Response(content=body, media_type="application/json")
+        except ValueError as e:
+            raise HTTPException(status_code=400, detail=str(e))
+        except Exception as e:
+            raise HTTPException(status_code=500, detail=str(e))
+
+    @app.post("/verify")
+    async def verify(request: VerifyRequest):
+        """
+        Verify payment payload
     
-    try:
-        result = await facilitator.verify(request.paymentPayload, request.paymentRequirements)
-        logger.info(f"[VERIFY RESULT] {result.model_dump(by_alias=True)}")
-        return result
-    except Exception as e:
-        logger.error(f"[VERIFY ERROR] {e}", exc_info=True)
-        raise HTTPException(status_code=500, detail=str(e))
-
-
-@app.post("/settle")
-async def settle(request: SettleRequest):
-    """
-    Settle payment on-chain
+        Args:
+            request: Verify request with payment payload and requirements
+        
+        Returns:
+            Verification result
+        """
+        logger.debug("[VERIFY REQUEST] Payload: %s", lazy_json(request.paymentPayload))
     
-    Args:
-        request: Settle request with payment payload and requirements
+        try:
+            result = await service.verify(request.paymentPayload, request.paymentRequirements)
+            logger.info("[VERIFY RESULT] %s", lazy_json(result))
+            return result
+        except Exception as e:
+            logger.error(f"[VERIFY ERROR] {e}", exc_info=True)
+            raise HTTPException(status_code=500, detail=str(e))
+
+    @app.post("/verify/batch")
+    async def verify_batch(request: VerifyBatchRequest):
+        """
+        Verify many payments in one call
+
+        Args:
+            request: Up to VERIFY_BATCH_MAX payment payload / requirements pairs
+
+        Returns:
+            {"results": [...]}, one verification result per item, in request order
+        """
+        if len(request.items) > VERIFY_BATCH_MAX:
+            raise HTTPException(
+                status_code=400,
+                detail=f"At most {VERIFY_BATCH_MAX} payments per batch, got {len(request.items)}",
+            )
+        results = await service.verify_batch(
+            [(item.paymentPayload, item.paymentRequirements) for item in request.items]
+        )
+        return {"results": results}
+
+    @app.post("/settle")
+    async def settle(request: SettleRequest, prefer: str | None = Header(None)):
+        """
+        Settle payment on-chain
+    
+        Args:
+            request: Settle request with payment payload and requirements
+            prefer: "respond-async" to return 202 with a settlement ID right away
         
-    Returns:
-        Settlement result with transaction hash
-    """
-    try:
-        return await facilitator.settle(request.paymentPayload, request.paymentRequirements)
-    except Exception as e:
-        raise HTTPException(status_code=500, detail=str(e))
+        Returns:
+            Settlement result with transaction hash, or the pending settlement record
+        """
+        service.mark_settled(request.paymentPayload, request.paymentRequirements)
+        if request.webhookUrl or (prefer and "respond-async" in prefer.lower()):
+            try:
+                record = settlement_tracker.start(
+                    request.paymentPayload, request.paymentRequirements, request.webhookUrl
+                )
+            except ValueError as e:
+                raise HTTPException(status_code=400, detail=str(e))
+            return JSONResponse(
+                content=record,
+                status_code=202,
+                headers={"Location": f"/settle/{record['settlementId']}"},
+            )
+        try:
+            return await service.settle_payment(request.paymentPayload, request.paymentRequirements)
+        except Exception as e:
+            raise HTTPException(status_code=500, detail=str(e))
+
+    @app.get("/settle/{settlement_id}")
+    async def settlement_status(settlement_id: str, wait: float = 0):
+        """
+        Status of a background settlement
+    
+        Args:
+            settlement_id: ID returned by POST /settle
+            wait: Seconds to long-poll while the settlement is pending (capped)
+        
+        Returns:
+            Settlement record; "result" holds the settle response once final
+        """
+        record = await settlement_tracker.wait(
+            settlement_id, min(max(wait, 0), SETTLE_LONG_POLL_MAX)
+        )
+        if record is None:
+            raise HTTPException(status_code=404, detail="Unknown settlement")
+        return record
+
+    @app.get("/ledger", dependencies=[operator_only])
+    async def ledger_lookup(transaction: str | None = None, payer: str | None = None, limit: int = 100):
+        """
+        Settlement ledger entries
+    
+        Args:
+            transaction: Transaction hash
+            payer: Payer address (newest entries first)
+            limit: Maximum entries returned
+        
+        Returns:
+            Matching entries with their status (intent, broadcast, confirmed, failed, unknown)
+        """
+        if service.ledger is None:
+            raise HTTPException(status_code=404, detail="Settlement ledger is disabled")
+        if not transaction and not payer:
+            raise HTTPException(status_code=400, detail="Give a transaction or a payer")
+        return {"entries": service.ledger.lookup(tx_hash=transaction, payer=payer, limit=min(max(limit, 1), 1000))}
+
+    @app.get("/metrics/settle", dependencies=[operator_only])
+    async def settle_metrics():
+        """Settlement batch, background settlement and ledger counters"""
+        return {
+            "batching": service.metrics()["batching"],
+            "ledger": service.metrics()["ledger"],
+            "background": settlement_tracker.metrics(),
+        }
+
+    @app.on_event("startup")
+    async def on_startup():
+        """Reconcile settlements a previous run left open; start the balance and RPC endpoint checks"""
+        await service.start()
+
+    @app.on_event("shutdown")
+    async def on_shutdown():
+        """Let background settles finish, then settle anything still queued and close the ledger"""
+        await settlement_tracker.close(GRACEFUL_TIMEOUT)
+        await service.close()
+
+    if PROFILING_TOKEN:
+        install_profiling(app, PROFILING_TOKEN)
+    print(f"Profiling: {'enabled (/debug/profile, X-Trace)' if PROFILING_TOKEN else 'disabled'}")
+
+    @app.get("/metrics", dependencies=[operator_only])
+    async def prometheus_metrics():
+        """Verify / settle / fee quote latency histograms and result counters in the Prometheus text format"""
+        return Response(content=REGISTRY.render(), media_type=METRICS_CONTENT_TYPE)
+
+    @app.get("/metrics/quotes", dependencies=[operator_only])
+    async def quote_metrics():
+        """Fee quote cache hit/miss counters"""
+        return service.metrics()["quote_cache"]
+
+    @app.get("/metrics/verify", dependencies=[operator_only])
+    async def verify_metrics():
+        """Verify cache hit/miss counters"""
+        return service.metrics()["verify_cache"]
+
+    @app.get("/metrics/replay", dependencies=[operator_only])
+    async def replay_metrics():
+        """Replay index size and rejected duplicates"""
+        return service.metrics()["replay_index"]
+
+    @app.get("/metrics/rpc", dependencies=[operator_only])
+    async def rpc_metrics():
+        """RPC endpoint latency, health and hedging counters per network"""
+        return service.metrics()["rpc_pools"]
+
+    return app
 
 
 def main():
@@ -236,20 +614,30 @@ def main():
     print("=" * 80)
     print(f"Host: {FACILITATOR_HOST}")
     print(f"Port: {FACILITATOR_PORT}")
-    print(f"BSC  Facilitator Address: {bsc_facilitator_address}")
-    print(f"Supported Networks: {', '.join(all_networks)}")
+    print(f"Workers: {FACILITATOR_WORKERS}")
+    print(f"Supported Networks: {', '.join(ALL_NETWORKS)}")
     print("=" * 80)
     print("\nEndpoints:")
     print(f"  GET  http://{FACILITATOR_HOST}:{FACILITATOR_PORT}/supported")
     print(f"  POST http://{FACILITATOR_HOST}:{FACILITATOR_PORT}/fee/quote")
     print(f"  POST http://{FACILITATOR_HOST}:{FACILITATOR_PORT}/verify")
+    print(f"  POST http://{FACILITATOR_HOST}:{FACILITATOR_PORT}/verify/batch")
     print(f"  POST http://{FACILITATOR_HOST}:{FACILITATOR_PORT}/settle")
+    print(f"  GET  http://{FACILITATOR_HOST}:{FACILITATOR_PORT}/settle/{{id}}?wait=30")
+    print(f"  GET  http://{FACILITATOR_HOST}:{FACILITATOR_PORT}/metrics")
+    print(f"  GET  http://{FACILITATOR_HOST}:{FACILITATOR_PORT}/metrics/verify")
+    print(f"  GET  http://{FACILITATOR_HOST}:{FACILITATOR_PORT}/metrics/settle")
+    print(f"  GET  http://{FACILITATOR_HOST}:{FACILITATOR_PORT}/metrics/quotes")
+    print(f"  GET  http://{FACILITATOR_HOST}:{FACILITATOR_PORT}/metrics/replay")
+    print(f"  GET  http://{FACILITATOR_HOST}:{FACILITATOR_PORT}/ledger")
     print("=" * 80 + "\n")
-    
-    uvicorn.run(
-        app,
+
+    serve(
+        "main:create_app",
         host=FACILITATOR_HOST,
         port=FACILITATOR_PORT,
+        workers=FACILITATOR_WORKERS,
+        graceful_timeout=GRACEFUL_TIMEOUT,
         log_level="info",
     )
 
@@ -0,0 +1,107 @@
+"""
+Fee Quote Cache
+Pre-serialized /fee/quote responses keyed on the normalized accepts list,
+refreshed before the quotes they contain expire.
+"""
+
+import hashlib
+import json
+import time
+from collections import OrderedDict
+from collections.abc import Callable
+from typing import Any
+
+from bankofai.x402.types import PaymentRequirements
+from fastapi.encoders import jsonable_encoder
+
+DEFAULT_MAX_ENTRIES = 1024
+DEFAULT_TTL = 30.0
+# Never hand out a quote with less than this many seconds left before it expires
+EXPIRY_MARGIN = 5.0
+
+
+def json_body(content: Any) -> bytes:
+    """Serialize a response the way FastAPI would (aliases, compact)"""
+    return json.dumps(
+        jsonable_encoder(content), ensure_ascii=False, separators=(",", ":")
+    ).encode()
+
+
+def _normalized(accept: PaymentRequirements) -> dict[str, Any]:
+    document = accept.model_dump(by_alias=True, mode="json", exclude_none=True)
+    # EVM addresses are case-insensitive (checksum casing); TRON base58 is not
+    if accept.network.startswith("eip155:"):
+        document["asset"] = document["asset"].lower()
+        document["payTo"] = document["payTo"].lower()
+    return document
+
+
+def quote_key(accepts: list[PaymentRequirements], context: dict | None) -> str:
+    """Hash of the accepts list and context; field order and EVM address casing do not matter"""
+    document = {"accepts": [_normalized(accept) for accept in accepts], "context": context}
+    canonical = json.dumps(document, sort_keys=True, separators=(",", ":"))
+    return hashlib.blake2b(canonical.encode(), digest_size=16).hexdigest()
+
+
+class FeeQuoteCache:
+    """
+    LRU cache of serialized fee quotes.
+
+    An entry is served for ``ttl`` seconds, but never later than
+    ``EXPIRY_MARGIN`` seconds before the earliest ``expiresAt`` of the quotes
+    it holds; after that the next request recomputes it, picking up any
+    chain-derived fee inputs. Failed quotes are not cached.
+    """
+
+    def __init__(
+        self,
+        max_entries: int = DEFAULT_MAX_ENTRIES,
+        ttl: float = DEFAULT_TTL,
+        clock: Callable[[], float] = time.time,
+    ) -> None:
+        self.max_entries = max_entries
+        self.ttl = ttl
+        self._clock = clock
+        self._entries: OrderedDict[str, tuple[float, bytes]] = OrderedDict()
+        self.hits = 0
+        self.misses = 0
+
+    async def quote(
+        self, facilitator: Any, accepts: list[PaymentRequirements], context: dict | None
+    ) -> bytes:
+        """Serialized facilitator.fee_quote() result, from the cache when fresh"""
+        # Hash before quoting: the facilitator normalizes requirements in place
+        key = quote_key(accepts, context)
+        now = self._clock()
+        entry = self._entries.get(key)
+        if entry is not None and entry[0] > now:
+            self._entries.move_to_end(key)
+            self.hits += 1
+            return entry[1]
+
+        self.misses += 1
+        quotes = await facilitator.fee_quote(accepts, context)
+        body = json_body(quotes)
+
+        expires_at = now + self.ttl
+        for quote in quotes:
+            if quote.expires_at is not None:
+                expires_at = min(expires_at, quote.expires_at - EXPIRY_MARGIN)
+        if expires_at > now:
+            self._entries[key] = (expires_at, body)
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
+        return body
+
+    def metrics(self) -> dict[str, Any]:
+        """Hit/miss counters and current size"""
+        lookups = self.hits + self.misses
+        return {
+            "entries": len(self._entries),
+            "max_entries": self.max_entries,
+            "ttl": self.ttl,
+            "hits": self.hits,
+            "misses": self.misses,
+            "hit_ratio": round(self.hits / lookups, 4) if lookups else 0.0,
+        }
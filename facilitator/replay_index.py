@@ -0,0 +1,217 @@
+"""
+Replay Index
+Remembers which permits this facilitator has settled, so a duplicate or
+replayed /settle is rejected from memory instead of failing on-chain after
+an RPC round trip.
+"""
+
+import fcntl
+import hashlib
+import os
+import struct
+import tempfile
+import time
+from collections.abc import Callable
+from pathlib import Path
+from typing import Any
+
+from bankofai.x402.types import PaymentPayload, PaymentRequirements
+from verify_cache import payment_deadline
+
+DEFAULT_INDEX_FILE = Path(tempfile.gettempdir()) / "x402-replay-index.bin"
+SWEEP_INTERVAL = 60.0
+# A reservation marker older than this belongs to a worker that stopped mid-settle
+PENDING_TTL = 600.0
+
+# 16-byte key digest + permit deadline (unix seconds, 0: none)
+_RECORD = struct.Struct("<16sQ")
+
+
+def normalize_address(address: str) -> str:
+    """Lowercase hex addresses (case-insensitive); TRON base58 addresses are case-sensitive"""
+    return address.lower() if address.startswith("0x") else address
+
+
+def replay_key(payload: PaymentPayload, requirements: PaymentRequirements) -> bytes | None:
+    """
+    Digest of what the chain treats as one spendable permit: payer and
+    nonce per network (and per token for transfer authorizations, whose
+    nonces live in the token contract). None for payloads without a nonce.
+    """
+    data = payload.payload
+    if data.payment_permit is not None:
+        permit = data.payment_permit
+        key = f"{requirements.network}|permit|{normalize_address(permit.buyer)}|{permit.meta.nonce}"
+    elif data.authorization is not None:
+        authorization = data.authorization
+        key = (
+            f"{requirements.network}|{normalize_address(requirements.asset)}"
+            f"|{normalize_address(authorization.from_address)}|{authorization.nonce}"
+        )
+    else:
+        return None
+    return hashlib.blake2b(key.encode(), digest_size=16).digest()
+
+
+class ReplayIndex:
+    """
+    Settled permits, in memory and in an append-only file.
+
+    Every worker appends the permits it settles to ``path`` (one fixed-size
+    record per write, so concurrent appends do not interleave) and picks up
+    the other workers' records before each lookup. At startup the file is
+    replayed. Entries whose permit deadline has passed are dropped: the
+    chain rejects those permits anyway. The sweep that drops them also
+    rewrites the file with the remaining records, under an exclusive flock
+    on ``<path>.lock`` (appends hold it shared), and workers reopen the file
+    when it has been replaced.
+
+    A settle reserves its permit first, so a duplicate arriving while the
+    first one is still confirming is rejected too, by any worker: the
+    reservation is an ``O_EXCL`` marker file in ``<path>.pending``. A failed
+    settle releases the reservation: the permit was not spent. Markers left
+    by a worker that stopped mid-settle expire after ``PENDING_TTL``.
+    """
+
+    def __init__(self, path: Path = DEFAULT_INDEX_FILE, clock: Callable[[], float] = time.time) -> None:
+        path.parent.mkdir(parents=True, exist_ok=True)
+        self.path = path
+        self._clock = clock
+        self._lock_fd = os.open(path.with_name(f"{path.name}.lock"), os.O_RDWR | os.O_CREAT, 0o644)
+        self._pending_dir = path.with_name(f"{path.name}.pending")
+        self._pending_dir.mkdir(exist_ok=True)
+        self._fd = os.open(path, os.O_RDWR | os.O_APPEND | os.O_CREAT, 0o644)
+        self._offset = 0
+        self._settled: dict[bytes, int] = {}
+        self._pending: set[bytes] = set()
+        self._last_sweep = clock()
+        self.rejected = 0
+        self.recorded = 0
+        self._catch_up()
+        self.loaded = len(self._settled)
+
+    def _reopen_if_replaced(self) -> None:
+        """Follow a compaction by another worker: read the new file from the start"""
+        try:
+            replaced = os.stat(self.path).st_ino != os.fstat(self._fd).st_ino
+        except FileNotFoundError:
+            replaced = True
+        if replaced:
+            os.close(self._fd)
+            self._fd = os.open(self.path, os.O_RDWR | os.O_APPEND | os.O_CREAT, 0o644)
+            self._offset = 0
+
+    def _catch_up(self) -> None:
+        """Read records appended since the last read (by any worker)"""
+        self._reopen_if_replaced()
+        size = os.fstat(self._fd).st_size
+        if size - self._offset < _RECORD.size:
+            return
+        data = os.pread(self._fd, size - self._offset, self._offset)
+        usable = len(data) - len(data) % _RECORD.size  # a torn tail record is read once complete
+        now = self._clock()
+        for digest, deadline in _RECORD.iter_unpack(data[:usable]):
+            if not deadline or deadline > now:
+                self._settled[digest] = deadline
+        self._offset += usable
+
+    def settled(self, key: bytes) -> bool:
+        """Whether the permit was settled by any worker"""
+        self._catch_up()
+        if key in self._settled:
+            self.rejected += 1
+            return True
+        return False
+
+    def _marker(self, key: bytes) -> Path:
+        return self._pending_dir / key.hex()
+
+    def _create_marker(self, key: bytes) -> bool:
+        """Take the cross-worker reservation; False if another worker holds it"""
+        marker = self._marker(key)
+        for _ in range(2):
+            try:
+                os.close(os.open(marker, os.O_WRONLY | os.O_CREAT | os.O_EXCL, 0o644))
+                return True
+            except FileExistsError:
+                try:
+                    if time.time() - marker.stat().st_mtime < PENDING_TTL:
+                        return False
+                    marker.unlink()  # left by a worker that stopped mid-settle
+                except FileNotFoundError:
+                    pass
+        return False
+
+    def reserve(self, key: bytes) -> bool:
+        """Claim the permit for a settle; False if it is settled or already being settled by any worker"""
+        if key in self._pending:
+            self.rejected += 1
+            return False
+        if self.settled(key):
+            return False
+        if not self._create_marker(key):
+            self.rejected += 1
+            return False
+        self._pending.add(key)
+        return True
+
+    def release(self, key: bytes) -> None:
+        """The settle failed: the permit is unspent and may be settled again"""
+        if key in self._pending:
+            self._pending.discard(key)
+            self._marker(key).unlink(missing_ok=True)
+
+    def commit(self, key: bytes, payload: PaymentPayload) -> None:
+        """The settle succeeded: record the permit until its deadline"""
+        deadline = int(payment_deadline(payload) or 0)
+        self._settled[key] = deadline
+        fcntl.flock(self._lock_fd, fcntl.LOCK_SH)
+        try:
+            self._reopen_if_replaced()
+            os.write(self._fd, _RECORD.pack(key, deadline))
+        finally:
+            fcntl.flock(self._lock_fd, fcntl.LOCK_UN)
+        # Recorded before the reservation goes, so other workers never see neither
+        if key in self._pending:
+            self._pending.discard(key)
+            self._marker(key).unlink(missing_ok=True)
+        self.recorded += 1
+        if self._clock() - self._last_sweep > SWEEP_INTERVAL:
+            self._sweep()
+
+    def _sweep(self) -> None:
+        """Drop expired permits from memory and rewrite the file without them"""
+        now = self._last_sweep = self._clock()
+        fcntl.flock(self._lock_fd, fcntl.LOCK_EX)
+        try:
+            self._catch_up()
+            expired = [key for key, deadline in self._settled.items() if deadline and deadline <= now]
+            for key in expired:
+                del self._settled[key]
+            tmp = self.path.with_name(f"{self.path.name}.{os.getpid()}.tmp")
+            with open(tmp, "wb") as f:
+                f.write(b"".join(_RECORD.pack(key, deadline) for key, deadline in self._settled.items()))
+                f.flush()
+                os.fsync(f.fileno())
+            os.replace(tmp, self.path)
+            self._reopen_if_replaced()
+            self._offset = os.fstat(self._fd).st_size
+        finally:
+            fcntl.flock(self._lock_fd, fcntl.LOCK_UN)
+
+    def close(self) -> None:
+        for key in self._pending:
+            self._marker(key).unlink(missing_ok=True)
+        os.close(self._fd)
+        os.close(self._lock_fd)
+
+    def metrics(self) -> dict[str, Any]:
+        """Index size and rejected duplicates"""
+        return {
+            "file": str(self.path),
+            "entries": len(self._settled),
+            "pending": len(self._pending),
+            "loaded": self.loaded,
+            "recorded": self.recorded,
+            "rejected": self.rejected,
+        }
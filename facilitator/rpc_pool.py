@@ -0,0 +1,431 @@
+"""
+RPC Pool
+Several RPC endpoints per network behind the signers' chain clients. Reads
+go to the fastest healthy endpoint and are hedged to the next one when it
+is slow; failing or lagging endpoints leave the rotation until a probe
+finds them healthy again. One slow or rate-limited node no longer sets the
+facilitator's verify and settle latency.
+"""
+
+import asyncio
+import itertools
+import json
+import logging
+import time
+from typing import Any
+from urllib.parse import urljoin, urlsplit
+
+import httpx
+
+from common.metrics import REGISTRY
+
+logger = logging.getLogger(__name__)
+
+DEFAULT_PROBE_INTERVAL = 5.0
+DEFAULT_TIMEOUT = 10.0
+FAILURE_THRESHOLD = 3      # consecutive failures that open an endpoint's circuit
+COOLDOWN = 5.0             # seconds an open circuit stays open, doubled on every reopen ...
+MAX_COOLDOWN = 120.0       # ... up to this
+MAX_LAG = 5                # blocks behind the best endpoint before an endpoint is skipped
+EWMA_ALPHA = 0.1
+HEDGE_FACTOR = 3.0         # a read is hedged after this many times the endpoint's average latency
+MIN_HEDGE_DELAY = 0.05
+FAILURE_PENALTY = 1.0      # seconds a failed call counts as in the average latency
+NONCE_GRACE = 0.5          # seconds to wait for more nonce answers after the first one
+
+# Calls that change chain state: sent to one endpoint only
+EVM_WRITES = frozenset({"eth_sendRawTransaction", "eth_sendTransaction"})
+TRON_WRITES = frozenset({"wallet/broadcasttransaction", "wallet/broadcasthex"})
+
+RPC_LATENCY = REGISTRY.gauge(
+    "x402_facilitator_rpc_latency_seconds", "Average (EWMA) RPC latency per endpoint", ("network", "endpoint")
+)
+RPC_HEALTHY = REGISTRY.gauge(
+    "x402_facilitator_rpc_healthy", "1 while an RPC endpoint is in rotation", ("network", "endpoint")
+)
+RPC_REQUESTS = REGISTRY.counter(
+    "x402_facilitator_rpc_requests", "RPC calls per endpoint and outcome", ("network", "endpoint", "result")
+)
+RPC_HEDGED = REGISTRY.counter(
+    "x402_facilitator_rpc_hedged", "Reads sent to a second endpoint because the first was slow", ("network",)
+)
+
+
+def parse_endpoints(spec: str) -> dict[str, list[str]]:
+    """``network=url,url;network=url`` to {network: [url, ...]}"""
+    endpoints: dict[str, list[str]] = {}
+    for entry in spec.split(";"):
+        if not entry.strip():
+            continue
+        network, sep, urls = entry.partition("=")
+        if not sep:
+            raise ValueError(f"RPC endpoint entry without '=': {entry.strip()!r}")
+        endpoints[network.strip()] = [url.strip() for url in urls.split(",") if url.strip()]
+    return endpoints
+
+
+def _redact(url: str) -> str:
+    """scheme://host[:port] only: providers put API keys in the path"""
+    parts = urlsplit(url)
+    return f"{parts.scheme}://{parts.netloc}"
+
+
+def _rate_limited(data: Any) -> bool:
+    """JSON-RPC "limit exceeded" errors are the endpoint's problem, not the request's"""
+    error = data.get("error") if isinstance(data, dict) else None
+    return isinstance(error, dict) and error.get("code") == -32005
+
+
+def _consume(task: asyncio.Task) -> None:
+    """Done callback: retrieve a losing attempt's error so it is not logged as unhandled"""
+    if not task.cancelled():
+        task.exception()
+
+
+class Endpoint:
+    """One RPC node: keep-alive connections, average latency, circuit breaker and block height"""
+
+    def __init__(self, url: str, headers: dict[str, str], timeout: float) -> None:
+        self.url = url
+        self.label = _redact(url)
+        self.client = httpx.AsyncClient(
+            timeout=timeout,
+            headers={"Content-Type": "application/json", **headers},
+            limits=httpx.Limits(max_connections=64, max_keepalive_connections=32, keepalive_expiry=60),
+        )
+        self.latency: float | None = None  # EWMA seconds; None until the first answer
+        self.failures = 0                  # consecutive
+        self.open_until = 0.0              # monotonic time the circuit closes again
+        self.cooldown = COOLDOWN
+        self.height: int | None = None
+        self.lagging = False
+        self.requests = 0
+        self.errors = 0
+
+    def available(self, now: float) -> bool:
+        return now >= self.open_until and not self.lagging
+
+    def _observe(self, elapsed: float) -> None:
+        self.latency = elapsed if self.latency is None else EWMA_ALPHA * elapsed + (1 - EWMA_ALPHA) * self.latency
+
+    def succeeded(self, elapsed: float) -> None:
+        self._observe(elapsed)
+        self.failures = 0
+        self.cooldown = COOLDOWN
+
+    def failed(self, now: float) -> bool:
+        """Count a failure (as a slow answer, so an endpoint failing now and then loses traffic); True if it opened the circuit"""
+        self._observe(FAILURE_PENALTY)
+        self.failures += 1
+        self.errors += 1
+        if self.failures < FAILURE_THRESHOLD or now < self.open_until:
+            return False
+        # Half-open after a cooldown: one more failure reopens it for longer
+        self.open_until = now + self.cooldown
+        self.cooldown = min(self.cooldown * 2, MAX_COOLDOWN)
+        return True
+
+
+class RpcPool:
+    """
+    The RPC endpoints of one network.
+
+    - Reads go to the available endpoint with the lowest average latency.
+      If it has not answered after ``HEDGE_FACTOR`` times its average, the
+      same read goes to the next endpoint too and the first answer wins. A
+      failed read fails over to the next endpoint.
+    - Transactions go to one endpoint and only move on when the connection
+      could not be made, so a transaction is never broadcast twice.
+    - EVM nonce reads ask every available endpoint and take the highest
+      count, so a node a block behind never hands out a used nonce.
+    - ``FAILURE_THRESHOLD`` failures in a row open an endpoint's circuit for
+      a cooldown. ``monitor()`` probes every endpoint's block height; a
+      probe that succeeds closes the circuit, and an endpoint more than
+      ``MAX_LAG`` blocks behind the best one is skipped.
+
+    When no endpoint is available, all of them are tried anyway.
+    """
+
+    def __init__(
+        self,
+        network: str,
+        urls: list[str],
+        api_key: str | None = None,
+        timeout: float = DEFAULT_TIMEOUT,
+        hedge: bool = True,
+    ) -> None:
+        if not urls:
+            raise ValueError(f"RPC pool for {network} needs at least one endpoint")
+        self.network = network
+        self.tron = network.startswith("tron:")
+        self.hedge = hedge
+        # A TronGrid API key is only sent to TronGrid
+        self.endpoints = [
+            Endpoint(url, {"TRON-PRO-API-KEY": api_key} if api_key and "trongrid" in url else {}, timeout)
+            for url in urls
+        ]
+        self.hedged = 0
+        self.hedge_wins = 0
+        self.failovers = 0
+        self._probe_ids = itertools.count(1)
+        self._client: Any = None
+
+    def ranked(self) -> list[Endpoint]:
+        """Available endpoints by latency (unmeasured first), then the rest by when their circuit closes"""
+        now = time.monotonic()
+        available = [endpoint for endpoint in self.endpoints if endpoint.available(now)]
+        available.sort(key=lambda endpoint: endpoint.latency or 0.0)
+        rest = sorted((e for e in self.endpoints if not e.available(now)), key=lambda e: e.open_until)
+        return available + rest
+
+    async def _post(self, endpoint: Endpoint, path: str, content: bytes) -> Any:
+        endpoint.requests += 1
+        start = time.monotonic()
+        try:
+            response = await endpoint.client.post(urljoin(endpoint.url, path) if path else endpoint.url, content=content)
+            response.raise_for_status()
+            data = response.json()
+            if _rate_limited(data):
+                raise httpx.HTTPError(f"{endpoint.label} rate limited: {data['error'].get('message')}")
+        except Exception as exc:
+            now = time.monotonic()
+            RPC_REQUESTS.labels(self.network, endpoint.label, "error").inc()
+            if endpoint.failed(now):
+                logger.warning(
+                    "RPC endpoint %s (%s) taken out of rotation for %.0fs: %s",
+                    endpoint.label, self.network, endpoint.open_until - now, exc,
+                )
+                RPC_HEALTHY.labels(self.network, endpoint.label).set(0)
+            raise
+        endpoint.succeeded(time.monotonic() - start)
+        RPC_REQUESTS.labels(self.network, endpoint.label, "ok").inc()
+        RPC_LATENCY.labels(self.network, endpoint.label).set(endpoint.latency)
+        return data
+
+    def _hedge_delay(self, endpoint: Endpoint) -> float | None:
+        if not self.hedge or endpoint.latency is None:
+            return None
+        return max(MIN_HEDGE_DELAY, HEDGE_FACTOR * endpoint.latency)
+
+    async def read(self, path: str, content: bytes) -> Any:
+        """A read call: fastest endpoint, hedged when slow, failed over on errors"""
+        candidates = iter(self.ranked())
+        attempts: dict[asyncio.Task, Endpoint] = {}
+
+        def launch() -> bool:
+            endpoint = next(candidates, None)
+            if endpoint is None:
+                return False
+            task = asyncio.create_task(self._post(endpoint, path, content))
+            task.add_done_callback(_consume)
+            attempts[task] = endpoint
+            return True
+
+        launch()
+        primary = next(iter(attempts.values()))
+        hedge_delay = self._hedge_delay(primary)
+        hedged = False
+        error: BaseException | None = None
+        try:
+            while attempts:
+                done, _ = await asyncio.wait(attempts, timeout=hedge_delay, return_when=asyncio.FIRST_COMPLETED)
+                if not done:
+                    hedge_delay = None  # hedge once
+                    if launch():
+                        hedged = True
+                        self.hedged += 1
+                        RPC_HEDGED.labels(self.network).inc()
+                    continue
+                for task in done:
+                    endpoint = attempts.pop(task)
+                    if task.exception() is None:
+                        if hedged and endpoint is not primary:
+                            self.hedge_wins += 1
+                        return task.result()
+                    error = task.exception()
+                if not attempts and launch():
+                    self.failovers += 1
+            raise error
+        finally:
+            for task in attempts:
+                task.cancel()
+
+    async def send(self, path: str, content: bytes) -> Any:
+        """A transaction: one endpoint, the next one only if the first could not be reached"""
+        error: BaseException | None = None
+        for endpoint in self.ranked():
+            try:
+                return await self._post(endpoint, path, content)
+            except (httpx.ConnectError, httpx.ConnectTimeout) as exc:
+                error = exc  # nothing was sent
+                self.failovers += 1
+        raise error
+
+    async def highest_nonce(self, content: bytes) -> Any:
+        """eth_getTransactionCount from the available endpoints; the highest count wins"""
+        now = time.monotonic()
+        endpoints = [endpoint for endpoint in self.endpoints if endpoint.available(now)]
+        if len(endpoints) < 2:
+            return await self.read("", content)
+        tasks = [asyncio.create_task(self._post(endpoint, "", content)) for endpoint in endpoints]
+        for task in tasks:
+            task.add_done_callback(_consume)
+        answers: list[dict] = []  # answers with a count; error answers are kept in case no node has one
+        errors: list[Any] = []
+        pending = set(tasks)
+        deadline = None
+        try:
+            while pending:
+                timeout = None if deadline is None else max(0.0, deadline - time.monotonic())
+                done, pending = await asyncio.wait(pending, timeout=timeout, return_when=asyncio.FIRST_COMPLETED)
+                if not done:
+                    break
+                for task in done:
+                    if task.exception() is not None:
+                        errors.append(task.exception())
+                    elif isinstance(task.result().get("result"), str):
+                        answers.append(task.result())
+                    else:
+                        errors.insert(0, task.result())
+                if answers and deadline is None:
+                    deadline = time.monotonic() + NONCE_GRACE
+        finally:
+            for task in pending:
+                task.cancel()
+        if answers:
+            return max(answers, key=lambda answer: int(answer["result"], 16))
+        if isinstance(errors[0], BaseException):
+            raise errors[0]
+        return errors[0]
+
+    async def json_rpc(self, method: str, content: bytes) -> Any:
+        """One encoded EVM JSON-RPC request"""
+        if method in EVM_WRITES:
+            return await self.send("", content)
+        if method == "eth_getTransactionCount":
+            return await self.highest_nonce(content)
+        return await self.read("", content)
+
+    async def tron_request(self, method: str, params: Any) -> Any:
+        """One TRON HTTP API call (``wallet/...``)"""
+        content = json.dumps(params).encode()
+        if method in TRON_WRITES:
+            return await self.send(method, content)
+        return await self.read(method, content)
+
+    async def _probe(self, endpoint: Endpoint) -> bool:
+        try:
+            if self.tron:
+                block = await self._post(endpoint, "wallet/getblock", b'{"detail": false}')
+                endpoint.height = block["block_header"]["raw_data"]["number"]
+            else:
+                request = {"jsonrpc": "2.0", "id": next(self._probe_ids), "method": "eth_blockNumber", "params": []}
+                endpoint.height = int((await self._post(endpoint, "", json.dumps(request).encode()))["result"], 16)
+        except Exception as exc:
+            logger.debug("RPC probe of %s (%s) failed: %s", endpoint.label, self.network, exc)
+            return False
+        if endpoint.open_until > time.monotonic():
+            logger.info("RPC endpoint %s (%s) answers again: back in rotation", endpoint.label, self.network)
+        # The endpoint answers: close its circuit without waiting for the cooldown
+        endpoint.open_until = 0.0
+        return True
+
+    async def probe(self) -> None:
+        """Check every endpoint's block height; circuits of endpoints that answer close"""
+        answered = await asyncio.gather(*(self._probe(endpoint) for endpoint in self.endpoints))
+        best = max((e.height for e, ok in zip(self.endpoints, answered) if ok), default=None)
+        now = time.monotonic()
+        for endpoint in self.endpoints:
+            lagging = best is not None and endpoint.height is not None and best - endpoint.height > MAX_LAG
+            if lagging and not endpoint.lagging:
+                logger.warning(
+                    "RPC endpoint %s (%s) is %d blocks behind: skipped until it catches up",
+                    endpoint.label, self.network, best - endpoint.height,
+                )
+            endpoint.lagging = lagging
+            RPC_HEALTHY.labels(self.network, endpoint.label).set(int(endpoint.available(now)))
+
+    async def monitor(self, interval: float = DEFAULT_PROBE_INTERVAL) -> None:
+        while True:
+            await self.probe()
+            await asyncio.sleep(interval)
+
+    def client(self) -> Any:
+        """The network's chain client (AsyncWeb3 or tronpy AsyncTron) over the pool, shared by every signer"""
+        if self._client is None:
+            self._client = self._tron_client() if self.tron else self._web3_client()
+        return self._client
+
+    def install(self, signer: Any) -> None:
+        """
+        Route ``signer``'s calls on this network through the pool.
+
+        Seeds the SDK signer's private per-network client cache
+        (bankofai-x402 0.6.1); fails if this SDK version has none.
+        """
+        attribute = "_async_tron_clients" if self.tron else "_async_web3_clients"
+        if not hasattr(signer, attribute):
+            raise RuntimeError(
+                f"{type(signer).__name__} has no {attribute} in this bankofai-x402 version; "
+                "RpcPool.install was written against 0.6.1"
+            )
+        getattr(signer, attribute)[self.network] = self.client()
+
+    def _tron_client(self) -> Any:
+        from tronpy import AsyncTron
+        from tronpy.providers.async_http import AsyncHTTPProvider
+
+        pool = self
+
+        class PooledTronProvider(AsyncHTTPProvider):
+            async def make_request(self, method: str, params: Any = None) -> dict:
+                return await pool.tron_request(method, params or {})
+
+        # The provider's own client is never used for requests
+        provider = PooledTronProvider(self.endpoints[0].url, client=self.endpoints[0].client)
+        return AsyncTron(provider=provider, network=self.network.split(":", 1)[1])
+
+    def _web3_client(self) -> Any:
+        from web3 import AsyncWeb3
+        from web3.middleware import ExtraDataToPOAMiddleware
+        from web3.providers.async_base import AsyncJSONBaseProvider
+
+        pool = self
+
+        class PooledWeb3Provider(AsyncJSONBaseProvider):
+            async def make_request(self, method: Any, params: Any) -> Any:
+                return await pool.json_rpc(method, self.encode_rpc_request(method, params))
+
+            async def is_connected(self, show_traceback: bool = False) -> bool:
+                now = time.monotonic()
+                return any(endpoint.available(now) for endpoint in pool.endpoints)
+
+        # Same client setup as the SDK's EVM signer (BSC blocks carry POA extra data)
+        w3 = AsyncWeb3(PooledWeb3Provider())
+        w3.middleware_onion.inject(ExtraDataToPOAMiddleware, layer=0)
+        return w3
+
+    async def close(self) -> None:
+        for endpoint in self.endpoints:
+            await endpoint.client.aclose()
+
+    def metrics(self) -> dict[str, Any]:
+        now = time.monotonic()
+        return {
+            "hedged": self.hedged,
+            "hedge_wins": self.hedge_wins,
+            "failovers": self.failovers,
+            "endpoints": [
+                {
+                    "endpoint": endpoint.label,
+                    "available": endpoint.available(now),
+                    "latency_ms": None if endpoint.latency is None else round(endpoint.latency * 1000, 2),
+                    "height": endpoint.height,
+                    "lagging": endpoint.lagging,
+                    "circuit_open_for": max(0.0, round(endpoint.open_until - now, 1)),
+                    "requests": endpoint.requests,
+                    "errors": endpoint.errors,
+                }
+                for endpoint in self.endpoints
+            ],
+        }
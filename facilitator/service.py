@@ -0,0 +1,278 @@
+"""
+Facilitator Service
+The facilitator's payment operations (verify cache, fee quote cache, settle
+queue, replay index, settlement ledger) in one object, shared by the HTTP app and by resource servers that
+run the facilitator in-process.
+"""
+
+import asyncio
+import time
+from collections.abc import Awaitable, Callable
+from typing import Any
+
+from bankofai.x402.facilitator import X402Facilitator
+from bankofai.x402.types import (
+    FeeQuoteResponse,
+    PaymentPayload,
+    PaymentRequirements,
+    SettleResponse,
+    VerifyResponse,
+)
+from hot_wallets import DEFAULT_MONITOR_INTERVAL, HotWalletPool
+from ledger import SettlementLedger
+from quote_cache import FeeQuoteCache, json_body
+from replay_index import ReplayIndex, replay_key
+from rpc_pool import DEFAULT_PROBE_INTERVAL, RpcPool
+from settle_batcher import SettleBatcher
+from signature_pool import SignaturePool
+from verify_cache import VerifyCache, payment_key
+
+from common.metrics import REGISTRY
+from common.profiling import record_span
+
+OPERATION_SECONDS = REGISTRY.histogram(
+    "x402_facilitator_operation_seconds",
+    "Verify (including cache hits) and settle (including batching and confirmation) latency",
+    ("operation", "network", "scheme"),
+)
+FEE_QUOTE_SECONDS = REGISTRY.histogram("x402_facilitator_fee_quote_seconds", "Fee quote latency")
+PAYMENTS = REGISTRY.counter(
+    "x402_facilitator_payments",
+    "Verify and settle results",
+    ("operation", "network", "asset", "scheme", "result"),
+)
+ALREADY_SETTLED = "payment_already_settled"
+
+IN_FLIGHT = REGISTRY.gauge(
+    "x402_facilitator_in_flight", "Verifies and settles in progress", ("operation",)
+)
+
+
+class FacilitatorService:
+    """
+    X402Facilitator plus the per-worker caches and settle queue around it.
+
+    Every entry point (HTTP routes, in-process clients) goes through the same
+    methods, so a payment settled in-process is also invalidated in the
+    verify cache, and EVM settles share the same batches and account lock.
+    """
+
+    def __init__(
+        self,
+        facilitator: X402Facilitator,
+        verify_cache: VerifyCache | None = None,
+        quote_cache: FeeQuoteCache | None = None,
+        settle_batcher: SettleBatcher | None = None,
+        signature_pool: SignaturePool | None = None,
+        replay_index: ReplayIndex | None = None,
+        ledger: SettlementLedger | None = None,
+        hot_wallet_pools: list[HotWalletPool] | None = None,
+        monitor_interval: float = DEFAULT_MONITOR_INTERVAL,
+        rpc_pools: list[RpcPool] | None = None,
+        probe_interval: float = DEFAULT_PROBE_INTERVAL,
+    ) -> None:
+        self.facilitator = facilitator
+        self.verify_cache = verify_cache
+        self.quote_cache = quote_cache
+        self.settle_batcher = settle_batcher
+        self.signature_pool = signature_pool
+        self.replay_index = replay_index
+        self.ledger = ledger
+        self.hot_wallet_pools = hot_wallet_pools or []
+        self.monitor_interval = monitor_interval
+        self.rpc_pools = rpc_pools or []
+        self.probe_interval = probe_interval
+        # The settle batcher is built around the same (recorded) settle function
+        self._settle: Callable[[PaymentPayload, PaymentRequirements], Awaitable[SettleResponse]]
+        if settle_batcher:
+            self._settle = settle_batcher.submit
+        elif ledger:
+            self._settle = ledger.recorded(facilitator.settle)
+        else:
+            self._settle = facilitator.settle
+        self._background: list[asyncio.Task] = []
+        self._verifying = IN_FLIGHT.labels("verify")
+        self._settling = IN_FLIGHT.labels("settle")
+
+    @staticmethod
+    def _record(
+        operation: str, requirements: PaymentRequirements, start: float, result: str
+    ) -> None:
+        network, scheme = requirements.network, requirements.scheme
+        elapsed = time.perf_counter() - start
+        OPERATION_SECONDS.labels(operation, network, scheme).observe(elapsed)
+        record_span(f"facilitator_{operation}", start, elapsed)
+        PAYMENTS.labels(operation, network, requirements.asset, scheme, result).inc()
+
+    async def verify(
+        self, payload: PaymentPayload, requirements: PaymentRequirements
+    ) -> VerifyResponse:
+        """Verify a payment, from the cache when it was verified recently"""
+        result = "error"
+        start = time.perf_counter()
+        try:
+            if self.replay_index:
+                key = replay_key(payload, requirements)
+                if key is not None and self.replay_index.settled(key):
+                    result = "replayed"
+                    return VerifyResponse(isValid=False, invalidReason=ALREADY_SETTLED)
+            with self._verifying.track_inprogress():
+                if self.verify_cache:
+                    response = await self.verify_cache.verify(self.facilitator, payload, requirements)
+                else:
+                    response = await self.facilitator.verify(payload, requirements)
+            result = "valid" if response.is_valid else "invalid"
+            return response
+        finally:
+            self._record("verify", requirements, start, result)
+
+    async def verify_batch(
+        self, items: list[tuple[PaymentPayload, PaymentRequirements]]
+    ) -> list[VerifyResponse]:
+        """
+        Verify many payments concurrently, results in input order.
+
+        With a signature pool their signature recoveries run in parallel
+        across its processes. A payment whose verify raises is reported
+        invalid instead of failing the batch.
+        """
+        results = await asyncio.gather(
+            *(self.verify(payload, requirements) for payload, requirements in items),
+            return_exceptions=True,
+        )
+        return [
+            VerifyResponse(isValid=False, invalidReason="verify_error")
+            if isinstance(result, Exception)
+            else result
+            for result in results
+        ]
+
+    async def settle_payment(
+        self, payload: PaymentPayload, requirements: PaymentRequirements
+    ) -> SettleResponse:
+        """
+        Settle a payment on-chain (batched when the settle queue is enabled),
+        without touching the verify cache. A permit this facilitator already
+        settled, or is settling, is rejected without going to the chain.
+        """
+        result = "error"
+        start = time.perf_counter()
+        key = replay_key(payload, requirements) if self.replay_index else None
+        try:
+            if key is not None and not self.replay_index.reserve(key):
+                result = "replayed"
+                return SettleResponse(
+                    success=False, network=requirements.network, errorReason=ALREADY_SETTLED
+                )
+            try:
+                with self._settling.track_inprogress():
+                    response = await self._settle(payload, requirements)
+            except BaseException:
+                if key is not None:
+                    self.replay_index.release(key)
+                raise
+            if key is not None:
+                if response.success:
+                    self.replay_index.commit(key, payload)
+                else:
+                    self.replay_index.release(key)
+            result = "success" if response.success else "failed"
+            return response
+        finally:
+            self._record("settle", requirements, start, result)
+
+    def mark_settled(self, payload: PaymentPayload, requirements: PaymentRequirements) -> None:
+        """Once submitted, the payment may be spent: never serve its cached verify again"""
+        if self.verify_cache:
+            self.verify_cache.mark_settled(payment_key(payload, requirements), payload)
+
+    async def settle(
+        self, payload: PaymentPayload, requirements: PaymentRequirements
+    ) -> SettleResponse:
+        """Settle a payment on-chain (batched when the settle queue is enabled)"""
+        self.mark_settled(payload, requirements)
+        return await self.settle_payment(payload, requirements)
+
+    async def fee_quote(
+        self, accepts: list[PaymentRequirements], context: dict | None = None
+    ) -> list[FeeQuoteResponse]:
+        """Fee quotes as objects (in-process callers)"""
+        with FEE_QUOTE_SECONDS.time():
+            return await self.facilitator.fee_quote(accepts, context)
+
+    async def fee_quote_body(
+        self, accepts: list[PaymentRequirements], context: dict | None = None
+    ) -> bytes:
+        """Fee quotes serialized for an HTTP response, from the cache when fresh"""
+        with FEE_QUOTE_SECONDS.time():
+            if self.quote_cache:
+                return await self.quote_cache.quote(self.facilitator, accepts, context)
+            return json_body(await self.facilitator.fee_quote(accepts, context))
+
+    async def start(self) -> None:
+        """
+        Start the background work: check settlements left open by a previous
+        run against the chain, watch the hot wallets' balances and probe the
+        RPC endpoints
+        """
+        for pool in self.rpc_pools:
+            self._background.append(asyncio.create_task(pool.monitor(self.probe_interval)))
+        if self.ledger:
+            self._background.append(asyncio.create_task(self.ledger.reconcile()))
+        for pool in self.hot_wallet_pools:
+            self._background.append(asyncio.create_task(pool.monitor(self.monitor_interval)))
+
+    async def close(self) -> None:
+        """
+        Settle anything still queued, then stop the signature pool and close
+        the replay index, ledger and RPC connections
+        """
+        if self.settle_batcher:
+            await self.settle_batcher.close()
+        if self.signature_pool:
+            self.signature_pool.close()
+        if self.replay_index:
+            self.replay_index.close()
+        for task in self._background:
+            task.cancel()
+        if self.ledger:
+            self.ledger.close()
+        for pool in self.rpc_pools:
+            await pool.close()
+
+    def metrics(self) -> dict[str, Any]:
+        """Cache and settle queue counters"""
+        return {
+            "verify_cache": (
+                {"enabled": True, **self.verify_cache.metrics()}
+                if self.verify_cache
+                else {"enabled": False}
+            ),
+            "quote_cache": (
+                {"enabled": True, **self.quote_cache.metrics()}
+                if self.quote_cache
+                else {"enabled": False}
+            ),
+            "batching": (
+                {"enabled": True, **self.settle_batcher.metrics()}
+                if self.settle_batcher
+                else {"enabled": False}
+            ),
+            "signature_pool": (
+                {"enabled": True, **self.signature_pool.metrics()}
+                if self.signature_pool
+                else {"enabled": False}
+            ),
+            "replay_index": (
+                {"enabled": True, **self.replay_index.metrics()}
+                if self.replay_index
+                else {"enabled": False}
+            ),
+            "hot_wallets": {pool.network: pool.metrics() for pool in self.hot_wallet_pools},
+            "rpc_pools": {pool.network: pool.metrics() for pool in self.rpc_pools},
+            "ledger": (
+                {"enabled": True, **self.ledger.metrics()}
+                if self.ledger
+                else {"enabled": False}
+            ),
+        }
@@ -0,0 +1,277 @@
+"""
+Settlement Batcher
+Collects EVM /settle calls per network, facilitator key and token for a
+short window and submits each group together: nonces are assigned locally
+so the group's transactions are broadcast back to back and confirm in the
+same blocks, instead of one settle per block under the account lock.
+"""
+
+import asyncio
+import json
+from collections.abc import Awaitable, Callable
+from contextlib import asynccontextmanager
+from contextvars import ContextVar
+from dataclasses import dataclass, field
+from typing import Any
+
+from account_lock import AccountLock
+from bankofai.x402.signers.facilitator import EvmFacilitatorSigner
+from bankofai.x402.types import PaymentPayload, PaymentRequirements, SettleResponse
+from bankofai.x402.utils.address import checksum_evm_address
+from eth_utils import keccak
+from hexbytes import HexBytes
+from hot_wallets import HotWallet, HotWalletPool, pinned
+from ledger import record_signed
+
+DEFAULT_BATCH_SIZE = 32
+# SDK version whose EvmFacilitatorSigner internals PipelinedEvmSigner overrides
+SDK_VERSION = "0.6.1"
+
+
+@dataclass
+class _NonceScope:
+    """Next nonce per (network, address) while a batch holds ``address``'s lock"""
+    address: str
+    next: dict[tuple[str, str], int] = field(default_factory=dict)
+    lock: asyncio.Lock = field(default_factory=asyncio.Lock)
+
+
+_nonce_scope: ContextVar[_NonceScope | None] = ContextVar("nonce_scope", default=None)
+
+
+class PipelinedEvmSigner(EvmFacilitatorSigner):
+    """
+    EVM signer that can assign nonces locally.
+
+    Inside ``nonce_scope()`` the first transaction per network reads the
+    account's pending transaction count and later ones count up from it, so
+    several transactions can be in flight at once. Signing and broadcasting
+    happen in nonce order and a nonce is only consumed once the node accepts
+    the transaction, so a failed send never leaves a gap. Outside a scope
+    each transaction reads its nonce from the node, like
+    EvmFacilitatorSigner. Scopes must run while this signer's account lock
+    is held, and only this signer's transactions use them: other keys (e.g.
+    hot wallets settling under their own, shorter lock holds) keep reading
+    their nonce from the node.
+
+    Either way the transaction hash is written to the settle's ledger entry
+    before the transaction is sent.
+
+    write_contract() replaces the SDK's and uses its private web3 client
+    cache and wallet; construction fails if this SDK version lacks them.
+    """
+
+    def __init__(self, *args: Any, **kwargs: Any) -> None:
+        super().__init__(*args, **kwargs)
+        missing = [name for name in ("_ensure_async_web3_client", "_wallet") if not hasattr(self, name)]
+        if "_wallet" not in missing and not hasattr(self._wallet, "sign_transaction"):
+            missing.append("_wallet.sign_transaction")
+        if missing:
+            raise RuntimeError(
+                f"EvmFacilitatorSigner has no {', '.join(missing)} in this bankofai-x402 version; "
+                f"PipelinedEvmSigner was written against {SDK_VERSION}"
+            )
+
+    @asynccontextmanager
+    async def nonce_scope(self):
+        """Assign nonces locally for this account's transactions sent inside the block"""
+        token = _nonce_scope.set(_NonceScope(checksum_evm_address(self.get_address())))
+        try:
+            yield
+        finally:
+            _nonce_scope.reset(token)
+
+    async def write_contract(
+        self,
+        contract_address: str,
+        abi: Any,
+        method: str,
+        args: list[Any],
+        network: str,
+    ) -> str | None:
+        scope = _nonce_scope.get()
+        from_address = checksum_evm_address(self.get_address())
+        if scope is not None and scope.address != from_address:
+            scope = None
+
+        w3 = self._ensure_async_web3_client(network)
+        if w3 is None:
+            return None
+
+        abi_list = json.loads(abi) if isinstance(abi, str) else abi
+        contract = w3.eth.contract(address=checksum_evm_address(contract_address), abi=abi_list)
+        checked_args = [
+            checksum_evm_address(arg) if isinstance(arg, str) else arg for arg in args
+        ]
+        # Build (gas estimation included) concurrently; the nonce is filled in below
+        tx = await getattr(contract.functions, method)(*checked_args).build_transaction(
+            {"from": from_address, "nonce": 0, "chainId": await w3.eth.chain_id}
+        )
+
+        if scope is None:
+            tx["nonce"] = await w3.eth.get_transaction_count(from_address, "pending")
+            return await self._send(w3, tx)
+
+        key = (network, from_address)
+        async with scope.lock:
+            if key not in scope.next:
+                scope.next[key] = await w3.eth.get_transaction_count(from_address, "pending")
+            tx["nonce"] = scope.next[key]
+            tx_hash = await self._send(w3, tx)
+            scope.next[key] += 1
+        return tx_hash
+
+    async def _send(self, w3: Any, tx: dict[str, Any]) -> str:
+        """Sign, record the hash in the settle's ledger entry, then broadcast"""
+        raw_tx = bytes.fromhex(await self._wallet.sign_transaction(tx))
+        await record_signed(HexBytes(keccak(raw_tx)).hex())
+        tx_hash = await w3.eth.send_raw_transaction(raw_tx)
+        return tx_hash.hex()
+
+
+@dataclass
+class SettleTarget:
+    """Account that pays for settlements on a network"""
+    lock: AccountLock
+    signer: PipelinedEvmSigner
+
+
+@dataclass
+class _Pending:
+    payload: PaymentPayload
+    requirements: PaymentRequirements
+    future: asyncio.Future
+    wallet: HotWallet | None = None  # counted in wallet.queued until the batch holds its lock
+
+
+class SettleBatcher:
+    """
+    Async settlement queue.
+
+    ``submit()`` parks a settle in the batch for its (network, key, asset).
+    The key is the network's only target, or the one its hot wallet pool
+    picks at submit time; the settle is then pinned to that key. A batch is
+    flushed when it reaches ``max_size`` or ``window`` seconds after its
+    first entry; the flush holds that key's account lock once, runs every
+    settle of the batch concurrently with pipelined nonces and resolves each
+    caller with its own result. Networks without targets (TRON, no nonces)
+    are settled directly.
+    """
+
+    def __init__(
+        self,
+        settle: Callable[[PaymentPayload, PaymentRequirements], Awaitable[SettleResponse]],
+        targets: dict[str, list[SettleTarget]],
+        window: float,
+        max_size: int = DEFAULT_BATCH_SIZE,
+        pools: dict[str, HotWalletPool] | None = None,
+    ) -> None:
+        self._settle = settle
+        self._targets = {
+            network: {checksum_evm_address(target.signer.get_address()): target for target in network_targets}
+            for network, network_targets in targets.items()
+        }
+        self._pools = pools or {}
+        self.window = window
+        self.max_size = max_size
+        self._batches: dict[tuple[str, str, str], list[_Pending]] = {}
+        self._timers: dict[tuple[str, str, str], asyncio.TimerHandle] = {}
+        self._tasks: set[asyncio.Task] = set()
+        self.batches = 0
+        self.settles = 0
+        self.largest_batch = 0
+
+    async def submit(
+        self, payload: PaymentPayload, requirements: PaymentRequirements
+    ) -> SettleResponse:
+        """Queue a settle and wait for its own result"""
+        targets = self._targets.get(requirements.network)
+        if targets is None:
+            return await self._settle(payload, requirements)
+
+        wallet = None
+        pool = self._pools.get(requirements.network)
+        if pool is not None:
+            wallet = pool.route(payload)
+            if wallet is None:
+                # Names a key outside the pool: the mechanism rejects it
+                return await self._settle(payload, requirements)
+            address = checksum_evm_address(wallet.address)
+            wallet.queued += 1
+        else:
+            address = next(iter(targets))
+
+        loop = asyncio.get_running_loop()
+        key = (requirements.network, address, requirements.asset.lower())
+        pending = _Pending(payload, requirements, loop.create_future(), wallet)
+        batch = self._batches.setdefault(key, [])
+        batch.append(pending)
+        if len(batch) >= self.max_size:
+            self._flush(key)
+        elif len(batch) == 1:
+            self._timers[key] = loop.call_later(self.window, self._flush, key)
+        # A caller going away must not cancel the batch it is part of
+        return await asyncio.shield(pending.future)
+
+    def _flush(self, key: tuple[str, str, str]) -> None:
+        timer = self._timers.pop(key, None)
+        if timer is not None:
+            timer.cancel()
+        batch = self._batches.pop(key, None)
+        if not batch:
+            return
+        task = asyncio.get_running_loop().create_task(self._run(key[0], key[1], batch))
+        self._tasks.add(task)
+        task.add_done_callback(self._tasks.discard)
+
+    @staticmethod
+    def _dequeue(batch: list[_Pending]) -> None:
+        """Stop counting the batch as queued on its hot wallet (idempotent)"""
+        for pending in batch:
+            if pending.wallet is not None:
+                pending.wallet.queued -= 1
+                pending.wallet = None
+
+    async def _run(self, network: str, address: str, batch: list[_Pending]) -> None:
+        target = self._targets[network][address]
+        self.batches += 1
+        self.settles += len(batch)
+        self.largest_batch = max(self.largest_batch, len(batch))
+        try:
+            async with target.lock.hold(), target.signer.nonce_scope():
+                with pinned(address):
+                    # From here the pool counts these settles as in flight
+                    self._dequeue(batch)
+                    results = await asyncio.gather(
+                        *(self._settle(p.payload, p.requirements) for p in batch),
+                        return_exceptions=True,
+                    )
+        except BaseException as exc:
+            self._dequeue(batch)
+            results = [exc] * len(batch)
+        for pending, result in zip(batch, results):
+            if pending.future.done():
+                continue
+            if isinstance(result, BaseException):
+                pending.future.set_exception(result)
+            else:
+                pending.future.set_result(result)
+
+    async def close(self) -> None:
+        """Flush queued settles and wait for batches in flight"""
+        for key in list(self._batches):
+            self._flush(key)
+        if self._tasks:
+            await asyncio.gather(*self._tasks, return_exceptions=True)
+
+    def metrics(self) -> dict[str, Any]:
+        """Batch counters"""
+        return {
+            "window_ms": round(self.window * 1000, 3),
+            "max_size": self.max_size,
+            "queued": sum(len(batch) for batch in self._batches.values()),
+            "batches": self.batches,
+            "settles": self.settles,
+            "avg_batch_size": round(self.settles / self.batches, 2) if self.batches else 0.0,
+            "largest_batch": self.largest_batch,
+        }
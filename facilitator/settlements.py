@@ -0,0 +1,272 @@
+"""
+Settlement Tracker
+Runs settles in the background and keeps their status so /settle can answer
+immediately and clients follow up by long-polling /settle/{id} or by webhook.
+"""
+
+import asyncio
+import ipaddress
+import json
+import logging
+import os
+import socket
+import tempfile
+import time
+import uuid
+from collections.abc import Awaitable, Callable
+from pathlib import Path
+from typing import Any
+from urllib.parse import urlsplit
+
+import httpx
+from bankofai.x402.types import PaymentPayload, PaymentRequirements, SettleResponse
+
+logger = logging.getLogger(__name__)
+
+DEFAULT_STATUS_DIR = Path(tempfile.gettempdir()) / "x402-settlements"
+DEFAULT_STATUS_TTL = 3600.0
+# Non-owning workers re-read the status file this often while long-polling
+POLL_INTERVAL = 0.25
+SWEEP_INTERVAL = 60.0
+WEBHOOK_ATTEMPTS = 3
+
+FINAL_STATUSES = ("settled", "failed", "unknown")
+
+
+class SettlementTracker:
+    """
+    Background settlements with a status record per settlement.
+
+    Records are kept in memory by the worker that runs the settle and
+    mirrored to ``status_dir`` as JSON, so a status request that lands on
+    another worker (SO_REUSEPORT spreads connections) still finds them.
+    Final records are removed after ``ttl`` seconds.
+
+    Status values: ``pending``, ``settled``, ``failed``, and ``unknown`` when
+    the worker stopped before the transaction was confirmed (check the chain).
+
+    Webhooks are only sent to ``webhook_hosts`` (none when empty), and only
+    when the host resolves to public addresses: the request goes to the
+    address that was checked, so the facilitator cannot be pointed at
+    loopback, link-local or private services.
+    """
+
+    def __init__(
+        self,
+        settle: Callable[[PaymentPayload, PaymentRequirements], Awaitable[SettleResponse]],
+        status_dir: Path = DEFAULT_STATUS_DIR,
+        ttl: float = DEFAULT_STATUS_TTL,
+        webhook_hosts: frozenset[str] = frozenset(),
+    ) -> None:
+        status_dir.mkdir(parents=True, exist_ok=True)
+        self._settle = settle
+        self.status_dir = status_dir
+        self.ttl = ttl
+        self.webhook_hosts = webhook_hosts
+        self._records: dict[str, dict[str, Any]] = {}
+        self._done: dict[str, asyncio.Event] = {}
+        self._tasks: set[asyncio.Task] = set()
+        self._http: httpx.AsyncClient | None = None
+        self._last_sweep = time.time()
+        self.started = 0
+        self.settled = 0
+        self.failed = 0
+        self.unknown = 0
+        self.webhooks_failed = 0
+
+    def check_webhook(self, url: str) -> None:
+        """Reject webhook URLs that are not http(s), name an IP address or are not on the allowed hosts"""
+        if not self.webhook_hosts:
+            raise ValueError("Webhooks are disabled (no SETTLE_WEBHOOK_HOSTS configured)")
+        parts = urlsplit(url)
+        if parts.scheme not in ("http", "https") or not parts.hostname or parts.username is not None:
+            raise ValueError(f"Invalid webhook URL: {url}")
+        try:
+            ipaddress.ip_address(parts.hostname)
+        except ValueError:
+            pass
+        else:
+            raise ValueError(f"Webhook host must be a name, not an IP address: {parts.hostname}")
+        if parts.hostname not in self.webhook_hosts:
+            raise ValueError(f"Webhook host not allowed: {parts.hostname}")
+
+    @staticmethod
+    async def _public_address(host: str, port: int) -> str:
+        """An address of ``host`` to connect to; ValueError if any of its addresses is not public"""
+        infos = await asyncio.get_running_loop().getaddrinfo(host, port, type=socket.SOCK_STREAM)
+        for info in infos:
+            address = ipaddress.ip_address(info[4][0].split("%")[0])
+            if address.version == 6 and address.ipv4_mapped is not None:
+                address = address.ipv4_mapped
+            if not address.is_global:
+                raise ValueError(f"Webhook host {host} resolves to a non-public address: {address}")
+        return infos[0][4][0]
+
+    def start(
+        self,
+        payload: PaymentPayload,
+        requirements: PaymentRequirements,
+        webhook_url: str | None = None,
+    ) -> dict[str, Any]:
+        """Start a settle in the background and return its pending record"""
+        if webhook_url:
+            self.check_webhook(webhook_url)
+        self._sweep()
+
+        settlement_id = uuid.uuid4().hex
+        now = time.time()
+        record = {
+            "settlementId": settlement_id,
+            "status": "pending",
+            "network": requirements.network,
+            "createdAt": now,
+            "updatedAt": now,
+            "result": None,
+        }
+        self._records[settlement_id] = record
+        self._done[settlement_id] = asyncio.Event()
+        self._write(record)
+        self.started += 1
+
+        task = asyncio.get_running_loop().create_task(
+            self._run(settlement_id, payload, requirements, webhook_url)
+        )
+        self._tasks.add(task)
+        task.add_done_callback(self._tasks.discard)
+        return dict(record)
+
+    async def _run(
+        self,
+        settlement_id: str,
+        payload: PaymentPayload,
+        requirements: PaymentRequirements,
+        webhook_url: str | None,
+    ) -> None:
+        try:
+            result = await self._settle(payload, requirements)
+            status = "settled" if result.success else "failed"
+            body = result.model_dump(by_alias=True, mode="json")
+        except asyncio.CancelledError:
+            status, body = "unknown", {"errorReason": "facilitator_shutdown"}
+        except Exception as e:
+            logger.exception(f"[SETTLE {settlement_id}] Background settle failed")
+            status, body = "failed", {"success": False, "errorReason": str(e)}
+
+        record = self._records[settlement_id]
+        record.update(status=status, updatedAt=time.time(), result=body)
+        self._write(record)
+        self._done.pop(settlement_id).set()
+        if status == "settled":
+            self.settled += 1
+        elif status == "failed":
+            self.failed += 1
+        else:
+            self.unknown += 1
+
+        if webhook_url:
+            await self._deliver(webhook_url, record)
+
+    async def _deliver(self, url: str, record: dict[str, Any]) -> None:
+        """POST the final record to the webhook, retrying with backoff"""
+        if self._http is None:
+            self._http = httpx.AsyncClient(
+                timeout=10.0, limits=httpx.Limits(max_connections=20, max_keepalive_connections=20)
+            )
+        parts = urlsplit(url)
+        port = parts.port or (443 if parts.scheme == "https" else 80)
+        host_header = parts.hostname if parts.port is None else f"{parts.hostname}:{parts.port}"
+        for attempt in range(WEBHOOK_ATTEMPTS):
+            try:
+                # Connect to the address that was checked (no second lookup to rebind)
+                address = await self._public_address(parts.hostname, port)
+                netloc = f"[{address}]:{port}" if ":" in address else f"{address}:{port}"
+                response = await self._http.post(
+                    parts._replace(netloc=netloc).geturl(),
+                    json=record,
+                    headers={"Host": host_header},
+                    extensions={"sni_hostname": parts.hostname},
+                )
+                if response.status_code < 500:
+                    return
+            except ValueError as e:
+                logger.error(f"[WEBHOOK] {url}: {e}")
+                break
+            except (httpx.HTTPError, OSError) as e:
+                logger.warning(f"[WEBHOOK] {url}: {e}")
+            if attempt + 1 < WEBHOOK_ATTEMPTS:
+                await asyncio.sleep(2 ** attempt)
+        self.webhooks_failed += 1
+        logger.error(f"[WEBHOOK] giving up on {url} for {record['settlementId']}")
+
+    async def wait(self, settlement_id: str, timeout: float) -> dict[str, Any] | None:
+        """Status record, waiting up to ``timeout`` seconds for a pending one to finish"""
+        done = self._done.get(settlement_id)
+        if done is not None:
+            try:
+                await asyncio.wait_for(done.wait(), timeout)
+            except TimeoutError:
+                pass
+            return dict(self._records[settlement_id])
+
+        record = self._records.get(settlement_id) or self._read(settlement_id)
+        deadline = time.monotonic() + timeout
+        while record is not None and record["status"] == "pending" and time.monotonic() < deadline:
+            await asyncio.sleep(min(POLL_INTERVAL, max(deadline - time.monotonic(), 0)))
+            record = self._read(settlement_id)
+        return dict(record) if record is not None else None
+
+    def _path(self, settlement_id: str) -> Path:
+        return self.status_dir / f"{settlement_id}.json"
+
+    def _write(self, record: dict[str, Any]) -> None:
+        path = self._path(record["settlementId"])
+        tmp = path.with_suffix(f".{os.getpid()}.tmp")
+        tmp.write_text(json.dumps(record))
+        os.replace(tmp, path)
+
+    def _read(self, settlement_id: str) -> dict[str, Any] | None:
+        if not settlement_id.isalnum():
+            return None
+        try:
+            return json.loads(self._path(settlement_id).read_text())
+        except (FileNotFoundError, json.JSONDecodeError):
+            return None
+
+    def _sweep(self) -> None:
+        """Drop final records (and status files from any worker) older than the TTL"""
+        now = time.time()
+        if now - self._last_sweep < SWEEP_INTERVAL:
+            return
+        self._last_sweep = now
+        cutoff = now - self.ttl
+        for settlement_id, record in list(self._records.items()):
+            if record["status"] in FINAL_STATUSES and record["updatedAt"] < cutoff:
+                del self._records[settlement_id]
+        for path in self.status_dir.glob("*.json"):
+            try:
+                if path.stat().st_mtime < cutoff and path.stem not in self._records:
+                    path.unlink()
+            except FileNotFoundError:
+                pass
+
+    async def close(self, timeout: float) -> None:
+        """Give in-flight settles ``timeout`` seconds, then record them as unknown"""
+        if self._tasks:
+            _, still_running = await asyncio.wait(set(self._tasks), timeout=timeout)
+            for task in still_running:
+                task.cancel()
+            if still_running:
+                await asyncio.wait(still_running)
+        if self._http is not None:
+            await self._http.aclose()
+
+    def metrics(self) -> dict[str, Any]:
+        """Background settlement counters"""
+        return {
+            "in_flight": len(self._done),
+            "started": self.started,
+            "settled": self.settled,
+            "failed": self.failed,
+            "unknown": self.unknown,
+            "webhooks_failed": self.webhooks_failed,
+        }
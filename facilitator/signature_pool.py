@@ -0,0 +1,126 @@
+"""
+Signature Recovery Pool
+Runs EIP-712 / TIP-712 signature recovery in a process pool. Recovery is
+pure-Python hashing and elliptic-curve math: on the event loop it stalls
+every other request, and in one process it uses one core no matter how
+many verifies are waiting.
+"""
+
+import asyncio
+import multiprocessing
+import os
+from concurrent.futures import ProcessPoolExecutor
+from typing import Any
+
+from bankofai.x402.signers.facilitator import TronFacilitatorSigner
+from bankofai.x402.utils.address import tron_address_to_evm
+
+
+def recover_typed_data(
+    types: dict[str, Any],
+    primary_type: str,
+    domain: dict[str, Any],
+    message: dict[str, Any],
+    signature: str,
+) -> str | None:
+    """EVM address that signed the typed data, or None if the signature does not parse"""
+    from eth_account import Account
+    from eth_account.messages import encode_typed_data
+
+    try:
+        signable = encode_typed_data(full_message={
+            "types": types,
+            "primaryType": primary_type,
+            "domain": domain,
+            "message": message,
+        })
+        signature_bytes = bytes.fromhex(signature.removeprefix("0x"))
+        return Account.recover_message(signable, signature=signature_bytes)
+    except Exception:
+        return None
+
+
+def _warm_up() -> None:
+    """Pool initializer: pay eth_account's import cost before the first verify"""
+    import eth_account.messages  # noqa: F401
+
+
+class SignaturePool:
+    """Process pool for recover_typed_data, shared by every signer of one facilitator process"""
+
+    def __init__(self, workers: int) -> None:
+        self.workers = workers
+        # Spawned: the facilitator process has running threads (event loop, log writer)
+        self._executor = ProcessPoolExecutor(
+            max_workers=workers,
+            mp_context=multiprocessing.get_context("spawn"),
+            initializer=_warm_up,
+        )
+        self.recovered = 0
+        self.in_flight = 0
+
+    async def recover(
+        self,
+        types: dict[str, Any],
+        primary_type: str,
+        domain: dict[str, Any],
+        message: dict[str, Any],
+        signature: str,
+    ) -> str | None:
+        loop = asyncio.get_running_loop()
+        self.in_flight += 1
+        try:
+            return await loop.run_in_executor(
+                self._executor, recover_typed_data, types, primary_type, domain, message, signature
+            )
+        finally:
+            self.in_flight -= 1
+            self.recovered += 1
+
+    def close(self) -> None:
+        self._executor.shutdown(wait=False, cancel_futures=True)
+
+    def metrics(self) -> dict[str, Any]:
+        return {"workers": self.workers, "recovered": self.recovered, "in_flight": self.in_flight}
+
+
+def default_workers(processes: int = 1) -> int:
+    """
+    Pool size for one of ``processes`` facilitator workers: its share of the
+    host's cores, or 0 (recover on the event loop) when that share is a
+    single core, where a pool only adds pickling and competes with the loop.
+    """
+    cores = (os.cpu_count() or 1) // max(processes, 1)
+    return cores if cores > 1 else 0
+
+
+class PooledVerifySigner:
+    """
+    Facilitator signer wrapper whose ``verify_typed_data`` recovers the
+    signer in a SignaturePool; everything else goes to the wrapped signer.
+    The address check matches the SDK signers: TRON addresses are compared
+    in their EVM form.
+    """
+
+    def __init__(self, signer: Any, pool: SignaturePool) -> None:
+        self._signer = signer
+        self._pool = pool
+        self._tron = isinstance(signer, TronFacilitatorSigner)
+
+    def __getattr__(self, name: str) -> Any:
+        return getattr(self._signer, name)
+
+    async def verify_typed_data(
+        self,
+        address: str,
+        domain: dict[str, Any],
+        types: dict[str, Any],
+        message: dict[str, Any],
+        signature: str,
+        primary_type: str,
+    ) -> bool:
+        recovered = await self._pool.recover(types, primary_type, domain, message, signature)
+        if recovered is None:
+            return False
+        expected = tron_address_to_evm(address) if self._tron else address
+        return recovered.lower() == expected.lower()
@@ -0,0 +1,162 @@
+"""
+Verify Cache
+Bounded LRU/TTL cache of successful /verify results, keyed on a canonical
+hash of the payment payload and requirements.
+"""
+
+import asyncio
+import hashlib
+import json
+import time
+from collections import OrderedDict
+from collections.abc import Callable
+from dataclasses import dataclass
+from typing import Any
+
+from bankofai.x402.types import PaymentPayload, PaymentRequirements, VerifyResponse
+
+DEFAULT_MAX_ENTRIES = 10_000
+DEFAULT_TTL = 30.0
+
+
+def payment_key(payload: PaymentPayload, requirements: PaymentRequirements) -> str:
+    """Canonical hash of a payload and its requirements (field order does not matter)"""
+    document = {
+        "payload": payload.model_dump(by_alias=True, mode="json", exclude_none=True),
+        "requirements": requirements.model_dump(by_alias=True, mode="json", exclude_none=True),
+    }
+    canonical = json.dumps(document, sort_keys=True, separators=(",", ":"))
+    return hashlib.blake2b(canonical.encode(), digest_size=16).hexdigest()
+
+
+def payment_deadline(payload: PaymentPayload) -> float | None:
+    """Unix time after which the signed payment can no longer be settled"""
+    data = payload.payload
+    if data.payment_permit is not None:
+        return float(data.payment_permit.meta.valid_before)
+    if data.authorization is not None:
+        return float(data.authorization.valid_before)
+    return None
+
+
+@dataclass
+class _Entry:
+    expires_at: float
+    result: VerifyResponse | None  # None: settled, must not be served
+
+
+class VerifyCache:
+    """
+    Cache of successful verifications.
+
+    A valid result is served until ``ttl`` seconds pass or the payment's
+    deadline is reached, whichever is first. Invalid results are never
+    cached. Once a payload is submitted to /settle its entry becomes a
+    tombstone until the deadline, so a settled (spent) payment is always
+    re-verified against the chain.
+    """
+
+    def __init__(
+        self,
+        max_entries: int = DEFAULT_MAX_ENTRIES,
+        ttl: float = DEFAULT_TTL,
+        clock: Callable[[], float] = time.time,
+    ) -> None:
+        self.max_entries = max_entries
+        self.ttl = ttl
+        self._clock = clock
+        self._entries: OrderedDict[str, _Entry] = OrderedDict()
+        self._pending: dict[str, asyncio.Task] = {}
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+        self.coalesced = 0
+
+    def get(self, key: str) -> VerifyResponse | None:
+        """Cached result for ``key``, or None on a miss"""
+        entry = self._entries.get(key)
+        if entry is not None and entry.expires_at <= self._clock():
+            del self._entries[key]
+            entry = None
+        if entry is None or entry.result is None:
+            self.misses += 1
+            return None
+        self._entries.move_to_end(key)
+        self.hits += 1
+        return entry.result
+
+    def put(self, key: str, payload: PaymentPayload, result: VerifyResponse) -> None:
+        """Remember a successful verification (invalid results are ignored)"""
+        if not result.is_valid:
+            return
+        current = self._entries.get(key)
+        if current is not None and current.result is None:
+            return  # settled while this verify was in flight
+        expires_at = self._expiry(payload)
+        if expires_at is None:
+            return
+        self._store(key, _Entry(expires_at, result))
+
+    def mark_settled(self, key: str, payload: PaymentPayload) -> None:
+        """Stop serving ``key``; later verifies go to the chain"""
+        expires_at = self._expiry(payload)
+        if expires_at is None:
+            self._entries.pop(key, None)
+            return
+        self._store(key, _Entry(expires_at, None))
+
+    async def verify(
+        self, facilitator: Any, payload: PaymentPayload, requirements: PaymentRequirements
+    ) -> VerifyResponse:
+        """facilitator.verify() with the cache in front; concurrent misses share one call"""
+        # Hash before verify: the facilitator normalizes requirements in place
+        key = payment_key(payload, requirements)
+        cached = self.get(key)
+        if cached is not None:
+            return cached
+        task = self._pending.get(key)
+        if task is None:
+            task = asyncio.get_running_loop().create_task(facilitator.verify(payload, requirements))
+            self._pending[key] = task
+            task.add_done_callback(lambda done: self._verify_done(key, payload, done))
+        else:
+            self.coalesced += 1
+        # One caller going away must not cancel the verification the others wait on
+        return await asyncio.shield(task)
+
+    def _verify_done(self, key: str, payload: PaymentPayload, task: asyncio.Task) -> None:
+        self._pending.pop(key, None)
+        if task.cancelled():
+            return
+        # Retrieved here in case every caller went away
+        if task.exception() is None:
+            self.put(key, payload, task.result())
+
+    def _expiry(self, payload: PaymentPayload) -> float | None:
+        now = self._clock()
+        expires_at = now + self.ttl
+        deadline = payment_deadline(payload)
+        if deadline is not None:
+            expires_at = min(expires_at, deadline)
+        return expires_at if expires_at > now else None
+
+    def _store(self, key: str, entry: _Entry) -> None:
+        self._entries[key] = entry
+        self._entries.move_to_end(key)
+        while len(self._entries) > self.max_entries:
+            self._entries.popitem(last=False)
+            self.evictions += 1
+
+    def metrics(self) -> dict[str, Any]:
+        """Hit/miss counters and current size"""
+        lookups = self.hits + self.misses
+        return {
+            "entries": len(self._entries),
+            "max_entries": self.max_entries,
+            "ttl": self.ttl,
+            "hits": self.hits,
+            "misses": self.misses,
+            "hit_ratio": round(self.hits / lookups, 4) if lookups else 0.0,
+            "coalesced": self.coalesced,
+            "evictions": self.evictions,
+        }
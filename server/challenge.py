@@ -0,0 +1,177 @@
+"""
+Payment Challenge Cache
+Builds each protected route's 402 response once (prices parsed, tokens and
+permit contracts resolved, facilitator fee quotes attached) and keeps it as
+a pre-encoded template. Only the per-challenge fields (resource URL,
+payment ID, nonce, validity window) are filled in per request. Paid
+requests are settled against the same prebuilt requirements.
+"""
+
+import asyncio
+import json
+import logging
+import time
+import uuid
+from typing import Any
+
+from bankofai.x402.encoding import encode_base64
+from bankofai.x402.server import ResourceConfig, X402Server
+from bankofai.x402.types import PaymentRequirements
+from bankofai.x402.utils import generate_payment_id
+from bankofai.x402.utils.address import checksum_evm_address
+from fastapi import Response
+from resources import ProtectedResource
+
+logger = logging.getLogger(__name__)
+
+PAYMENT_REQUIRED_HEADER = "PAYMENT-REQUIRED"
+DEFAULT_REFRESH_INTERVAL = 60.0
+PERMIT_VALIDITY = 3600  # matches X402Server.create_payment_required_response
+
+# Sentinels placed in the template, in the form they take in the JSON text
+_URL = "__x402_resource_url__"
+_PAYMENT_ID = "__x402_payment_id__"
+_NONCE = "__x402_nonce__"
+_VALID_AFTER = 1_000_000_001
+_VALID_BEFORE = 1_000_000_002
+_SLOTS = {
+    "url": f'"{_URL}"',
+    "payment_id": f'"{_PAYMENT_ID}"',
+    "nonce": f'"{_NONCE}"',
+    "valid_after": f'"validAfter":{_VALID_AFTER}',
+    "valid_before": f'"validBefore":{_VALID_BEFORE}',
+}
+
+
+def resource_configs(resource: ProtectedResource) -> list[ResourceConfig]:
+    """The ResourceConfig list x402_protected builds for this resource"""
+    pay_to = resource.pay_to
+    if resource.network.startswith("eip155:"):
+        pay_to = checksum_evm_address(pay_to, strict=True)
+    return [
+        ResourceConfig(scheme=scheme, network=resource.network, price=price, pay_to=pay_to)
+        for price, scheme in zip(resource.prices, resource.schemes)
+    ]
+
+
+def _split_template(text: str) -> list[str]:
+    """Split JSON text on the sentinels: [literal, slot, literal, slot, ..., literal]"""
+    found = []
+    for slot, marker in _SLOTS.items():
+        if text.count(marker) != 1:
+            raise ValueError(f"Cannot template the 402 response: {slot} marker not unique")
+        found.append((text.index(marker), slot, marker))
+
+    parts, position = [], 0
+    for index, slot, marker in sorted(found):
+        parts += [text[position:index], slot]
+        position = index + len(marker)
+    parts.append(text[position:])
+    return parts
+
+
+class PaymentChallenge:
+    """
+    Cached 402 challenge for one route.
+
+    ``refresh()`` rebuilds the accepts list through the X402Server (which
+    asks the facilitator for fee quotes) and swaps the template when it
+    changed. Until the first successful refresh ``ready`` is False and
+    callers should fall back to the SDK path. The requirements it keeps are
+    shared by every request and must not be modified.
+    """
+
+    def __init__(self, server: X402Server, resource: ProtectedResource) -> None:
+        self._server = server
+        self.path = resource.path
+        self._configs = resource_configs(resource)
+        self._accepts_json: str | None = None
+        self._parts: list[str] | None = None
+        self._requirements: dict[tuple[str, str, str], PaymentRequirements] = {}
+        self.refreshed_at = 0.0
+        self.changes = 0
+        self.served = 0
+
+    @property
+    def ready(self) -> bool:
+        return self._parts is not None
+
+    async def refresh(self) -> bool:
+        """Rebuild the challenge; True when the accepts list changed"""
+        requirements = await self._server.build_payment_requirements(self._configs)
+        if not requirements:
+            raise ValueError(f"{self.path}: no supported payment options available")
+        accepts_json = json.dumps(
+            [r.model_dump(by_alias=True, mode="json") for r in requirements], sort_keys=True
+        )
+        self.refreshed_at = time.time()
+        if accepts_json == self._accepts_json:
+            return False
+
+        payment_required = self._server.create_payment_required_response(
+            requirements=requirements,
+            resource_info={"url": _URL},
+            payment_id=_PAYMENT_ID,
+            nonce=_NONCE,
+            valid_after=_VALID_AFTER,
+            valid_before=_VALID_BEFORE,
+        )
+        # Same encoding as JSONResponse, so the body matches the SDK's byte for byte
+        text = json.dumps(
+            payment_required.model_dump(by_alias=True),
+            ensure_ascii=False,
+            allow_nan=False,
+            separators=(",", ":"),
+        )
+        self._parts = _split_template(text)
+        self._requirements = {(r.network, r.asset.lower(), r.scheme): r for r in requirements}
+        self._accepts_json = accepts_json
+        self.changes += 1
+        return True
+
+    def requirements_for(self, accepted: PaymentRequirements) -> PaymentRequirements | None:
+        """The route's requirements for the option a payment says it accepted"""
+        return self._requirements.get((accepted.network, accepted.asset.lower(), accepted.scheme))
+
+    def response(self, url: str) -> Response:
+        """402 response for one request, with fresh payment ID, nonce and window"""
+        now = int(time.time())
+        values = {
+            "url": json.dumps(url, ensure_ascii=False),
+            "payment_id": json.dumps(generate_payment_id()),
+            "nonce": json.dumps(str(uuid.uuid4().int)),
+            "valid_after": f'"validAfter":{now}',
+            "valid_before": f'"validBefore":{now + PERMIT_VALIDITY}',
+        }
+        parts = self._parts
+        text = "".join(part if i % 2 == 0 else values[part] for i, part in enumerate(parts))
+        self.served += 1
+        return Response(
+            content=text.encode(),
+            status_code=402,
+            media_type="application/json",
+            headers={PAYMENT_REQUIRED_HEADER: encode_base64(text)},
+        )
+
+    def metrics(self) -> dict[str, Any]:
+        return {
+            "ready": self.ready,
+            "served": self.served,
+            "changes": self.changes,
+            "refreshed_at": self.refreshed_at,
+        }
+
+
+async def refresh_challenges(
+    challenges: list[PaymentChallenge], interval: float = DEFAULT_REFRESH_INTERVAL
+) -> None:
+    """Background task: refresh every challenge, then again every ``interval`` seconds"""
+    while True:
+        for challenge in challenges:
+            try:
+                if await challenge.refresh():
+                    logger.info(f"[402 CACHE] {challenge.path}: payment requirements updated")
+            except Exception as e:
+                # Keep serving the previous challenge (or the SDK path if there is none)
+                logger.warning(f"[402 CACHE] {challenge.path}: refresh failed: {e}")
+        await asyncio.sleep(interval)
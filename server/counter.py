@@ -0,0 +1,200 @@
+"""
+Request Counters
+Per-endpoint counters sharded per thread (no shared lock on the hot path),
+optionally backed by an mmap'd file so every worker process sees the same totals.
+"""
+
+import fcntl
+import mmap
+import os
+import secrets
+import struct
+import threading
+import weakref
+from array import array
+from collections.abc import Iterable
+from pathlib import Path
+
+# Shared file layout:
+#   header   : magic (8s) | max_names (I) | max_slots (I)
+#   slots    : max_slots x owner token (Q)              -- process that claimed each column
+#   names    : max_names x NAME_SIZE bytes (utf-8, NUL padded)
+#   counters : max_names x max_slots x uint64 (Q)       -- row per name, column per shard
+MAGIC = b"X402CNT1"
+HEADER = struct.Struct("<8sII")
+NAME_SIZE = 128
+DEFAULT_MAX_NAMES = 256
+DEFAULT_MAX_SLOTS = 64
+
+# Shared counters of this process; a forked child must claim its own columns
+_shared_counters: "weakref.WeakSet[RequestCounter]" = weakref.WeakSet()
+_token: tuple[int, int] = (0, 0)  # (pid, token) of the process that drew the token
+
+
+def _process_token() -> int:
+    """Random ID of this process (redrawn after fork): PIDs are reused, tokens are not"""
+    global _token
+    pid = os.getpid()
+    if _token[0] != pid:
+        _token = (pid, secrets.randbits(63) or 1)
+    return _token[1]
+
+
+def _after_fork_in_child() -> None:
+    for counter in list(_shared_counters):
+        counter._local = threading.local()
+
+
+os.register_at_fork(after_in_child=_after_fork_in_child)
+
+
+class RequestCounter:
+    """
+    Per-endpoint request counters.
+
+    Every thread increments its own shard and totals are summed on read, so
+    writers never contend. With ``path`` set, shards are columns of an
+    mmap'd file: each worker thread claims a column (reclaiming columns of
+    dead processes), and reads sum the whole row, giving the same totals in
+    every process. Counts in the file persist across restarts.
+
+    A claimed column holds the owner's process token and a POSIX record lock
+    on its slot, which the kernel drops when the process exits: a column is
+    free once nobody holds that lock, whatever PID its owner had. Closing
+    any descriptor of the file drops a process's record locks, so use one
+    instance per file in each process.
+    """
+
+    def __init__(
+        self,
+        names: Iterable[str],
+        path: Path | None = None,
+        max_names: int = DEFAULT_MAX_NAMES,
+        max_slots: int = DEFAULT_MAX_SLOTS,
+    ) -> None:
+        self._names = list(names)
+        self._local = threading.local()
+        self._claim_lock = threading.Lock()
+        self._path = path
+        self._mmap: mmap.mmap | None = None
+
+        if path is None:
+            self._rows = {name: i for i, name in enumerate(self._names)}
+            self._shards: list[array] = []
+        else:
+            self._open_shared(path, max_names, max_slots)
+            _shared_counters.add(self)
+
+    # -- shared file ---------------------------------------------------------
+
+    def _open_shared(self, path: Path, max_names: int, max_slots: int) -> None:
+        fd = os.open(path, os.O_RDWR | os.O_CREAT, 0o644)
+        try:
+            fcntl.flock(fd, fcntl.LOCK_EX)
+            header = os.pread(fd, HEADER.size, 0)
+            if len(header) == HEADER.size and header.startswith(MAGIC):
+                _, max_names, max_slots = HEADER.unpack(header)
+            else:
+                size = HEADER.size + max_slots * 8 + max_names * (NAME_SIZE + max_slots * 8)
+                os.ftruncate(fd, 0)
+                os.ftruncate(fd, size)
+                os.pwrite(fd, HEADER.pack(MAGIC, max_names, max_slots), 0)
+
+            self._max_slots = max_slots
+            slots_offset = self._slots_offset = HEADER.size
+            names_offset = slots_offset + max_slots * 8
+            counters_offset = names_offset + max_names * NAME_SIZE
+            size = counters_offset + max_names * max_slots * 8
+            self._mmap = mmap.mmap(fd, size)
+            view = self._view = memoryview(self._mmap)
+            self._slot_owners = view[slots_offset:names_offset].cast("Q")
+            self._counts = view[counters_offset:size].cast("Q")
+
+            # Map our names onto rows, appending unknown names into free rows
+            names_view = view[names_offset:counters_offset]
+            stored = [
+                bytes(names_view[i * NAME_SIZE:(i + 1) * NAME_SIZE]).rstrip(b"\0").decode()
+                for i in range(max_names)
+            ]
+            self._rows = {}
+            for name in self._names:
+                encoded = name.encode()
+                if len(encoded) > NAME_SIZE:
+                    raise ValueError(f"Counter name too long: {name}")
+                if name in stored:
+                    self._rows[name] = stored.index(name)
+                    continue
+                if "" not in stored:
+                    raise ValueError(f"Counter file {path} has no free rows (max {max_names})")
+                row = stored.index("")
+                stored[row] = name
+                names_view[row * NAME_SIZE:row * NAME_SIZE + len(encoded)] = encoded
+                self._rows[name] = row
+            names_view.release()
+        finally:
+            fcntl.flock(fd, fcntl.LOCK_UN)
+            self._fd = fd
+
+    def _claim_slot(self) -> int:
+        """Claim a free (or dead process's) column in the shared file"""
+        token = _process_token()
+        with self._claim_lock:
+            fcntl.flock(self._fd, fcntl.LOCK_EX)
+            try:
+                for slot in range(self._max_slots):
+                    if self._slot_owners[slot] == token:
+                        continue  # another thread of this process
+                    try:
+                        # Record locks of one process never conflict, hence the token check above
+                        fcntl.lockf(self._fd, fcntl.LOCK_EX | fcntl.LOCK_NB, 8, self._slots_offset + slot * 8)
+                    except OSError:
+                        continue  # held by a live process
+                    self._slot_owners[slot] = token
+                    return slot
+            finally:
+                fcntl.flock(self._fd, fcntl.LOCK_UN)
+        raise RuntimeError(f"No free counter slots in {self._path} (max {self._max_slots})")
+
+    # -- hot path ------------------------------------------------------------
+
+    def increment(self, name: str) -> int:
+        """Add one to ``name`` and return its total across all shards"""
+        row = self._rows[name]
+        if self._mmap is None:
+            shard = getattr(self._local, "shard", None)
+            if shard is None:
+                shard = self._local.shard = array("Q", bytes(8 * len(self._rows)))
+                with self._claim_lock:
+                    self._shards.append(shard)
+            shard[row] += 1
+            return sum(s[row] for s in self._shards)
+
+        slot = getattr(self._local, "slot", None)
+        if slot is None:
+            slot = self._local.slot = self._claim_slot()
+        base = row * self._max_slots
+        self._counts[base + slot] += 1
+        return sum(self._counts[base:base + self._max_slots])
+
+    def get(self, name: str) -> int:
+        """Total for ``name`` across all shards"""
+        row = self._rows[name]
+        if self._mmap is None:
+            return sum(s[row] for s in self._shards)
+        base = row * self._max_slots
+        return sum(self._counts[base:base + self._max_slots])
+
+    def snapshot(self) -> dict[str, int]:
+        """Totals for every counter"""
+        return {name: self.get(name) for name in self._names}
+
+    def close(self) -> None:
+        """Release the shared mapping"""
+        if self._mmap is not None:
+            _shared_counters.discard(self)
+            self._slot_owners.release()
+            self._counts.release()
+            self._view.release()
+            self._mmap.close()
+            os.close(self._fd)
+            self._mmap = None
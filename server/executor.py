@@ -0,0 +1,193 @@
+"""
+Render Executor
+Runs image rendering on a bounded thread or process pool so PIL drawing and
+PNG encoding never block the event loop.
+"""
+
+import asyncio
+import multiprocessing
+import os
+import threading
+import time
+from concurrent.futures import Executor, ProcessPoolExecutor, ThreadPoolExecutor
+from dataclasses import dataclass
+from functools import partial
+from pathlib import Path
+from typing import Any
+
+from render import DEFAULT_PRESET, Color, ImageRenderer
+
+EXECUTOR_MODES = ("thread", "process")
+
+# Renderer owned by a process-pool worker (set by _init_process_worker)
+_process_renderer: ImageRenderer | None = None
+
+
+def _init_process_worker(base_path: str) -> None:
+    """Decode the template once per worker process"""
+    global _process_renderer
+    _process_renderer = ImageRenderer(Path(base_path))
+
+
+def _render_with(
+    renderer: ImageRenderer, text: str, text_color: Color, media_type: str, preset: str
+) -> tuple[bytes, str, float]:
+    """Render and encode, returning (encoded bytes, worker id, seconds spent)"""
+    start = time.perf_counter()
+    data = renderer.render_encoded(text, text_color, media_type, preset)
+    return data, threading.current_thread().name, time.perf_counter() - start
+
+
+def _render_in_process(
+    text: str, text_color: Color, media_type: str, preset: str
+) -> tuple[bytes, str, float]:
+    """Process-pool entry point using the worker-local renderer"""
+    data, _, elapsed = _render_with(_process_renderer, text, text_color, media_type, preset)
+    # memoryviews cannot cross the process boundary
+    return bytes(data), f"pid-{os.getpid()}", elapsed
+
+
+def _noop() -> None:
+    """Used to start pool workers eagerly"""
+
+
+@dataclass
+class WorkerStats:
+    """Per-worker render counters"""
+    renders: int = 0
+    busy_seconds: float = 0.0
+    last_render_ms: float = 0.0
+
+
+class RenderExecutor:
+    """
+    Bounded render pool.
+
+    Capacity is ``workers + queue_size`` concurrent renders. Paid routes check
+    ``saturated()`` before settlement, so a full pool is refused before any
+    funds move, and hold a slot with ``try_acquire()`` only around the render.
+    """
+
+    def __init__(
+        self,
+        base_path: Path,
+        mode: str = "thread",
+        workers: int | None = None,
+        queue_size: int | None = None,
+    ) -> None:
+        if mode not in EXECUTOR_MODES:
+            raise ValueError(f"Unknown render executor mode: {mode} (expected one of {EXECUTOR_MODES})")
+
+        self.mode = mode
+        self.workers = workers or os.cpu_count() or 1
+        self.queue_size = self.workers * 4 if queue_size is None else queue_size
+        self.capacity = self.workers + self.queue_size
+
+        self._in_flight = 0
+        self._rejected = 0
+        self._completed = 0
+        self._failed = 0
+        self._stats: dict[str, WorkerStats] = {}
+        self._lock = threading.Lock()
+
+        if mode == "process":
+            context = (
+                multiprocessing.get_context("fork")
+                if "fork" in multiprocessing.get_all_start_methods()
+                else None
+            )
+            self._pool: Executor = ProcessPoolExecutor(
+                max_workers=self.workers,
+                mp_context=context,
+                initializer=_init_process_worker,
+                initargs=(str(base_path),),
+            )
+            self._task = _render_in_process
+            # Fork workers now, before the server starts its loop and threads
+            for future in [self._pool.submit(_noop) for _ in range(self.workers)]:
+                future.result()
+        else:
+            self._pool = ThreadPoolExecutor(
+                max_workers=self.workers, thread_name_prefix="render"
+            )
+            self._task = partial(_render_with, ImageRenderer(base_path))
+
+    def saturated(self) -> bool:
+        """True (counted as a rejection) when the pool and its queue are full"""
+        with self._lock:
+            if self._in_flight >= self.capacity:
+                self._rejected += 1
+                return True
+            return False
+
+    def try_acquire(self) -> bool:
+        """Reserve a render slot; False when the pool and its queue are full"""
+        with self._lock:
+            if self._in_flight >= self.capacity:
+                return False
+            self._in_flight += 1
+            return True
+
+    def release(self) -> None:
+        """Return a slot reserved with try_acquire()"""
+        with self._lock:
+            self._in_flight -= 1
+
+    async def render(
+        self,
+        text: str,
+        text_color: Color,
+        media_type: str = "image/png",
+        preset: str = DEFAULT_PRESET,
+    ) -> bytes | memoryview:
+        """Render on the pool and return the encoded image"""
+        loop = asyncio.get_running_loop()
+        try:
+            data, worker, elapsed = await loop.run_in_executor(
+                self._pool, self._task, text, text_color, media_type, preset
+            )
+        except Exception:
+            self._record_failure()
+            raise
+        self._record(worker, elapsed)
+        return data
+
+    def _record(self, worker: str, elapsed: float) -> None:
+        with self._lock:
+            self._completed += 1
+            stats = self._stats.setdefault(worker, WorkerStats())
+            stats.renders += 1
+            stats.busy_seconds += elapsed
+            stats.last_render_ms = elapsed * 1000
+
+    def _record_failure(self) -> None:
+        with self._lock:
+            self._failed += 1
+
+    def metrics(self) -> dict[str, Any]:
+        """Snapshot of pool occupancy and per-worker counters"""
+        with self._lock:
+            return {
+                "mode": self.mode,
+                "workers": self.workers,
+                "queue_size": self.queue_size,
+                "capacity": self.capacity,
+                "in_flight": self._in_flight,
+                "queued": max(self._in_flight - self.workers, 0),
+                "completed": self._completed,
+                "failed": self._failed,
+                "rejected": self._rejected,
+                "per_worker": {
+                    worker: {
+                        "renders": stats.renders,
+                        "busy_seconds": round(stats.busy_seconds, 6),
+                        "avg_render_ms": round(stats.busy_seconds * 1000 / stats.renders, 3),
+                        "last_render_ms": round(stats.last_render_ms, 3),
+                    }
+                    for worker, stats in sorted(self._stats.items())
+                },
+            }
+
+    def shutdown(self) -> None:
+        """Stop the pool, waiting for in-progress renders"""
+        self._pool.shutdown(wait=True, cancel_futures=True)
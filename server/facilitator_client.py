@@ -0,0 +1,212 @@
+"""
+Pooled Facilitator Client
+FacilitatorClient with an explicit connection pool (HTTP/2 when available),
+per-call timeouts, jittered retries, and coalescing of identical in-flight
+verify calls.
+"""
+
+import asyncio
+import hashlib
+import importlib.util
+import json
+import logging
+import random
+from collections import Counter
+from typing import Any
+
+import httpx
+from bankofai.x402.facilitator import FacilitatorClient
+from bankofai.x402.types import (
+    FeeQuoteResponse,
+    PaymentPayload,
+    PaymentRequirements,
+    SettleResponse,
+    SupportedResponse,
+    VerifyResponse,
+)
+
+logger = logging.getLogger(__name__)
+
+HTTP2_AVAILABLE = importlib.util.find_spec("h2") is not None
+
+DEFAULT_MAX_CONNECTIONS = 100
+DEFAULT_KEEPALIVE_EXPIRY = 30.0
+DEFAULT_CONNECT_TIMEOUT = 5.0
+DEFAULT_TIMEOUT = 10.0
+# Settle waits for the transaction receipt on the facilitator side
+DEFAULT_SETTLE_TIMEOUT = 120.0
+DEFAULT_RETRIES = 2
+RETRY_BACKOFF = 0.1
+
+RETRY_STATUSES = (502, 503, 504)
+# The request never reached the facilitator: safe to retry even for settle
+NOT_SENT_ERRORS = (httpx.ConnectError, httpx.ConnectTimeout, httpx.PoolTimeout)
+
+
+class PooledFacilitatorClient(FacilitatorClient):
+    """
+    FacilitatorClient with a tuned transport.
+
+    One ``httpx.AsyncClient`` per client keeps up to ``max_connections``
+    connections alive (multiplexed over HTTP/2 when ``h2`` is installed and
+    the facilitator speaks it over TLS). Verify, fee quote and supported
+    calls are retried on transport errors and 502/503/504 with jittered
+    exponential backoff; settle is only retried when the request was never
+    sent, so a payment cannot be submitted twice. Concurrent verify calls
+    with the same body share one upstream request.
+    """
+
+    def __init__(
+        self,
+        base_url: str,
+        headers: dict[str, str] | None = None,
+        facilitator_id: str | None = None,
+        max_connections: int = DEFAULT_MAX_CONNECTIONS,
+        keepalive_expiry: float = DEFAULT_KEEPALIVE_EXPIRY,
+        http2: bool = True,
+        connect_timeout: float = DEFAULT_CONNECT_TIMEOUT,
+        timeout: float = DEFAULT_TIMEOUT,
+        settle_timeout: float = DEFAULT_SETTLE_TIMEOUT,
+        retries: int = DEFAULT_RETRIES,
+    ) -> None:
+        super().__init__(base_url, headers=headers, facilitator_id=facilitator_id)
+        if http2 and not HTTP2_AVAILABLE:
+            logger.warning("HTTP/2 requested but the h2 package is not installed; using HTTP/1.1")
+        self.http2 = http2 and HTTP2_AVAILABLE
+        self.max_connections = max_connections
+        self.keepalive_expiry = keepalive_expiry
+        self.retries = retries
+        self._timeouts = {
+            "default": httpx.Timeout(timeout, connect=connect_timeout),
+            "settle": httpx.Timeout(settle_timeout, connect=connect_timeout),
+        }
+        self._verifying: dict[str, asyncio.Task] = {}
+        self.requests = 0
+        self.retried = 0
+        self.failed = 0
+        self.coalesced = 0
+        self.http_versions: Counter[str] = Counter()
+
+    async def _get_client(self) -> httpx.AsyncClient:
+        if self._http_client is None:
+            self._http_client = httpx.AsyncClient(
+                base_url=self._base_url,
+                headers=self._headers,
+                http2=self.http2,
+                limits=httpx.Limits(
+                    max_connections=self.max_connections,
+                    max_keepalive_connections=self.max_connections,
+                    keepalive_expiry=self.keepalive_expiry,
+                ),
+                timeout=self._timeouts["default"],
+            )
+        return self._http_client
+
+    async def _request(
+        self, method: str, path: str, body: bytes | None = None, idempotent: bool = True
+    ) -> Any:
+        """Send one call with retries and return the decoded JSON response"""
+        client = await self._get_client()
+        timeout = self._timeouts["settle" if path == "/settle" else "default"]
+        headers = {"Content-Type": "application/json"} if body is not None else None
+        for attempt in range(self.retries + 1):
+            retry = attempt < self.retries
+            self.requests += 1
+            try:
+                response = await client.request(
+                    method, path, content=body, headers=headers, timeout=timeout
+                )
+            except NOT_SENT_ERRORS as e:
+                error: Exception = e
+            except httpx.TransportError as e:
+                if not idempotent:
+                    self.failed += 1
+                    raise
+                error = e
+            else:
+                self.http_versions[response.http_version] += 1
+                if not (idempotent and retry and response.status_code in RETRY_STATUSES):
+                    response.raise_for_status()
+                    return response.json()
+                error = httpx.HTTPStatusError(
+                    f"{response.status_code} from {path}", request=response.request, response=response
+                )
+            if not retry:
+                self.failed += 1
+                raise error
+            self.retried += 1
+            delay = RETRY_BACKOFF * 2 ** attempt * random.uniform(0.5, 1.5)
+            logger.warning(f"[FACILITATOR] {method} {path} failed ({error!r}), retrying in {delay:.2f}s")
+            await asyncio.sleep(delay)
+
+    @staticmethod
+    def _payment_body(payload: PaymentPayload, requirements: PaymentRequirements) -> bytes:
+        body = {
+            "paymentPayload": payload.model_dump(by_alias=True),
+            "paymentRequirements": requirements.model_dump(by_alias=True),
+        }
+        # Canonical, so identical payments produce identical bytes
+        return json.dumps(body, sort_keys=True, separators=(",", ":")).encode()
+
+    async def supported(self) -> SupportedResponse:
+        return SupportedResponse(**await self._request("GET", "/supported"))
+
+    async def fee_quote(
+        self,
+        accepts: list[PaymentRequirements],
+        context: dict[str, Any] | None = None,
+    ) -> list[FeeQuoteResponse]:
+        payload: dict[str, Any] = {"accepts": [a.model_dump(by_alias=True) for a in accepts]}
+        if context:
+            payload["paymentPermitContext"] = context
+        items = await self._request("POST", "/fee/quote", json.dumps(payload).encode())
+        return [FeeQuoteResponse(**item) for item in items]
+
+    async def verify(
+        self,
+        payload: PaymentPayload,
+        requirements: PaymentRequirements,
+    ) -> VerifyResponse:
+        body = self._payment_body(payload, requirements)
+        key = hashlib.blake2b(body, digest_size=16).hexdigest()
+        task = self._verifying.get(key)
+        if task is None:
+            task = asyncio.get_running_loop().create_task(self._request("POST", "/verify", body))
+            self._verifying[key] = task
+            task.add_done_callback(lambda done: self._verify_done(key, done))
+        else:
+            self.coalesced += 1
+        # One caller going away must not cancel the request the others wait on
+        return VerifyResponse(**await asyncio.shield(task))
+
+    def _verify_done(self, key: str, task: asyncio.Task) -> None:
+        self._verifying.pop(key, None)
+        if not task.cancelled():
+            task.exception()  # retrieved here in case every caller went away
+
+    async def settle(
+        self,
+        payload: PaymentPayload,
+        requirements: PaymentRequirements,
+    ) -> SettleResponse:
+        body = self._payment_body(payload, requirements)
+        return SettleResponse(**await self._request("POST", "/settle", body, idempotent=False))
+
+    async def close(self) -> None:
+        for task in list(self._verifying.values()):
+            task.cancel()
+        await super().close()
+
+    def metrics(self) -> dict[str, Any]:
+        """Transport counters"""
+        return {
+            "mode": "http",
+            "http2": self.http2,
+            "max_connections": self.max_connections,
+            "requests": self.requests,
+            "retried": self.retried,
+            "failed": self.failed,
+            "coalesced": self.coalesced,
+            "verifying": len(self._verifying),
+            "http_versions": dict(self.http_versions),
+        }
@@ -0,0 +1,92 @@
+"""
+In-Process Facilitator
+FacilitatorClient-compatible client that calls the facilitator's service
+directly, for deployments where the resource server and facilitator share
+a host: no HTTP round trip, JSON encoding or model re-validation per call.
+"""
+
+import importlib.util
+import sys
+from pathlib import Path
+from typing import Any
+
+from bankofai.x402.types import (
+    FeeQuoteResponse,
+    PaymentPayload,
+    PaymentRequirements,
+    SettleResponse,
+    SupportedResponse,
+    VerifyResponse,
+)
+
+FACILITATOR_DIR = Path(__file__).parent.parent / "facilitator"
+
+
+def load_facilitator_main():
+    """Import facilitator/main.py (under another name: the server has its own main)"""
+    module = sys.modules.get("facilitator_main")
+    if module is None:
+        sys.path.insert(0, str(FACILITATOR_DIR))
+        spec = importlib.util.spec_from_file_location("facilitator_main", FACILITATOR_DIR / "main.py")
+        module = importlib.util.module_from_spec(spec)
+        sys.modules["facilitator_main"] = module
+        spec.loader.exec_module(module)
+    return module
+
+
+class LocalFacilitatorClient:
+    """
+    Same interface as FacilitatorClient, backed by an in-process
+    FacilitatorService: verify and settle reuse the facilitator's verify
+    cache, settle queue and account locks, and the payment objects are
+    passed through as they are.
+    """
+
+    def __init__(self, service: Any, facilitator_id: str = "local") -> None:
+        self._service = service
+        # Shows up in fee quotes: keep the HTTP facilitator's URL so 402s look the same
+        self.facilitator_id = facilitator_id
+        self.calls = {"supported": 0, "fee_quote": 0, "verify": 0, "settle": 0}
+
+    @classmethod
+    def from_facilitator_main(cls, facilitator_id: str = "local") -> "LocalFacilitatorClient":
+        """Build the facilitator's service from its environment configuration"""
+        return cls(load_facilitator_main().build_service(), facilitator_id=facilitator_id)
+
+    async def supported(self) -> SupportedResponse:
+        self.calls["supported"] += 1
+        return self._service.facilitator.supported(pricing="flat")
+
+    async def fee_quote(
+        self,
+        accepts: list[PaymentRequirements],
+        context: dict[str, Any] | None = None,
+    ) -> list[FeeQuoteResponse]:
+        self.calls["fee_quote"] += 1
+        return await self._service.fee_quote(accepts, context)
+
+    async def verify(
+        self,
+        payload: PaymentPayload,
+        requirements: PaymentRequirements,
+    ) -> VerifyResponse:
+        self.calls["verify"] += 1
+        return await self._service.verify(payload, requirements)
+
+    async def settle(
+        self,
+        payload: PaymentPayload,
+        requirements: PaymentRequirements,
+    ) -> SettleResponse:
+        self.calls["settle"] += 1
+        return await self._service.settle(payload, requirements)
+
+    async def start(self) -> None:
+        await self._service.start()
+
+    async def close(self) -> None:
+        await self._service.close()
+
+    def metrics(self) -> dict[str, Any]:
+        """Calls per operation plus the facilitator's cache and queue counters"""
+        return {"mode": "local", "calls": dict(self.calls), **self._service.metrics()}
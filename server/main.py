@@ -1,57 +1,64 @@
-import os
+import asyncio
 import logging
-import io
-import threading
+import os
+import sys
+from collections.abc import Awaitable, Callable
+from functools import wraps
 from pathlib import Path
-from dotenv import load_dotenv
-from fastapi import FastAPI, Request
-from fastapi.middleware.cors import CORSMiddleware
-from fastapi.responses import StreamingResponse
-from bankofai.x402.server import X402Server
-from bankofai.x402.fastapi import x402_protected
-from bankofai.x402.facilitator import FacilitatorClient
+from typing import Any
+
 from bankofai.x402.config import NetworkConfig
-from bankofai.x402.mechanisms.evm.exact_permit import ExactPermitEvmServerMechanism
+from bankofai.x402.encoding import decode_payment_payload, encode_payment_payload
+from bankofai.x402.fastapi import x402_protected
+from bankofai.x402.fastapi.middleware import PAYMENT_RESPONSE_HEADER
 from bankofai.x402.mechanisms.evm.exact import ExactEvmServerMechanism
-from bankofai.x402.tokens import TokenInfo, TokenRegistry
-
-from PIL import Image, ImageDraw, ImageFont
+from bankofai.x402.mechanisms.evm.exact_permit import ExactPermitEvmServerMechanism
+from bankofai.x402.server import X402Server
+from bankofai.x402.tokens import TokenRegistry
+from bankofai.x402.types import PaymentPayload
+from dotenv import load_dotenv
+from fastapi import Depends, FastAPI, Request
+from fastapi.middleware.cors import CORSMiddleware
+from fastapi.responses import JSONResponse, Response
 
-load_dotenv(Path(__file__).parent.parent / ".env")
+sys.path.insert(0, str(Path(__file__).parent.parent))
 
-# Configure detailed logging
-logging.basicConfig(
-    level=logging.INFO,
-    format="%(asctime)s - %(name)s - %(levelname)s - %(message)s",
-    datefmt="%Y-%m-%d %H:%M:%S",
+from challenge import DEFAULT_REFRESH_INTERVAL, PaymentChallenge, refresh_challenges
+from counter import RequestCounter
+from executor import RenderExecutor
+from facilitator_client import (
+    DEFAULT_MAX_CONNECTIONS,
+    DEFAULT_RETRIES,
+    PooledFacilitatorClient,
 )
+from local_facilitator import LocalFacilitatorClient
+from render import (
+    DEFAULT_PRESET,
+    ENCODING_PRESETS,
+    SUPPORTED_MEDIA_TYPES,
+    negotiate_media_type,
+)
+from resources import ProtectedResource, load_resources
+from responses import ImageResponse
+from sdk_compat import transaction_verifier
+from timing import TimedFacilitator, instrumented, server_timing, timed
 
-# Set specific loggers to DEBUG for detailed output
-logging.getLogger("bankofai.x402").setLevel(logging.DEBUG)
-logging.getLogger("bankofai.x402.server").setLevel(logging.DEBUG)
-logging.getLogger("bankofai.x402.fastapi").setLevel(logging.DEBUG)
-logging.getLogger("bankofai.x402.utils").setLevel(logging.DEBUG)
-logging.getLogger("uvicorn.access").setLevel(logging.INFO)
+from common.logs import setup_logging
+from common.metrics import CONTENT_TYPE as METRICS_CONTENT_TYPE
+from common.metrics import REGISTRY
+from common.profiling import install_profiling, require_token
+from common.serve import serve
 
-logger = logging.getLogger(__name__)
+load_dotenv(Path(__file__).parent.parent / ".env")
 
-app = FastAPI(title="X402 Server", description="Protected resource server")
+# Queued, non-blocking logging (LOG_LEVEL, LOG_FORMAT, LOG_LEVELS, LOG_SAMPLE).
+# For the SDK's payment-flow detail: LOG_LEVELS=bankofai.x402=DEBUG
+setup_logging()
 
-# Add CORS middleware to allow cross-origin requests from client/web
-app.add_middleware(
-    CORSMiddleware,
-    allow_origins=["*"],  # In production, specify exact origins
-    allow_credentials=True,
-    allow_methods=["*"],
-    allow_headers=["*"],
-    expose_headers=["*"],
-)
+logger = logging.getLogger(__name__)
 
 # Configuration
 PAY_TO_ADDRESS = os.getenv("PAY_TO_ADDRESS")
-BSC_PAY_TO_ADDRESS = os.getenv("BSC_PAY_TO_ADDRESS", "")
-if not PAY_TO_ADDRESS:
-    raise ValueError("PAY_TO_ADDRESS environment variable is required")
 
 # Network selection - Change this to use different networks
 # Options: NetworkConfig.TRON_MAINNET, NetworkConfig.TRON_NILE,
@@ -61,248 +68,513 @@ CURRENT_NETWORK = NetworkConfig.TRON_NILE
 # Server configuration
 FACILITATOR_URL = os.getenv("FACILITATOR_URL", "http://localhost:8001")
 FACILITATOR_API_KEY = os.getenv("FACILITATOR_API_KEY", "")  # Optional: for facilitator auth
+# "http": call the facilitator at FACILITATOR_URL; "local": run it in-process
+# (needs the facilitator's TRON_PRIVATE_KEY / BSC_PRIVATE_KEY in this environment)
+FACILITATOR_MODE = os.getenv("FACILITATOR_MODE", "http")
+if FACILITATOR_MODE not in ("http", "local"):
+    raise ValueError(f"Unknown FACILITATOR_MODE: {FACILITATOR_MODE} (expected http or local)")
+# Facilitator transport: pool size, HTTP/2 (needs h2), read timeouts and retries
+FACILITATOR_MAX_CONNECTIONS = int(os.getenv("FACILITATOR_MAX_CONNECTIONS", str(DEFAULT_MAX_CONNECTIONS)))
+FACILITATOR_HTTP2 = os.getenv("FACILITATOR_HTTP2", "1").lower() in ("1", "true", "yes")
+FACILITATOR_TIMEOUT = float(os.getenv("FACILITATOR_TIMEOUT", "10"))
+FACILITATOR_SETTLE_TIMEOUT = float(os.getenv("FACILITATOR_SETTLE_TIMEOUT", "120"))
+FACILITATOR_RETRIES = int(os.getenv("FACILITATOR_RETRIES", str(DEFAULT_RETRIES)))
 SERVER_HOST = "0.0.0.0"
 SERVER_PORT = 8000
+SERVER_WORKERS = int(os.getenv("SERVER_WORKERS", "1"))  # >1: one process per worker (SO_REUSEPORT)
+GRACEFUL_TIMEOUT = int(os.getenv("GRACEFUL_TIMEOUT", "30"))  # seconds to drain on shutdown
 
 # Path to protected image
 PROTECTED_IMAGE_PATH = Path(__file__).parent / "protected.png"
 
-_request_count_lock = threading.Lock()
-_request_count = 0
-
-# Initialize server (TRON mechanisms auto-registered by default)
-server = X402Server()
-# Register BSC testnet mechanisms
-server.register(NetworkConfig.BSC_TESTNET, ExactPermitEvmServerMechanism())
-server.register(NetworkConfig.BSC_TESTNET, ExactEvmServerMechanism())
-# Register BSC mainnet mechanisms
-server.register(NetworkConfig.BSC_MAINNET, ExactPermitEvmServerMechanism())
-server.register(NetworkConfig.BSC_MAINNET, ExactEvmServerMechanism())
-# Add facilitator (with X-API-KEY if configured)
-facilitator_headers = {"X-API-KEY": FACILITATOR_API_KEY} if FACILITATOR_API_KEY else None
-facilitator = FacilitatorClient(
-    base_url=FACILITATOR_URL,
-    headers=facilitator_headers,
+# Protected resource registry (one paid route per entry)
+RESOURCES_CONFIG = Path(os.getenv("RESOURCES_CONFIG", Path(__file__).parent / "resources.json"))
+
+# Render pool: "thread" or "process"; capacity is workers + queue size
+RENDER_EXECUTOR = os.getenv("RENDER_EXECUTOR", "thread")
+RENDER_WORKERS = int(os.getenv("RENDER_WORKERS", "0")) or None  # default: CPU count
+RENDER_QUEUE_SIZE = os.getenv("RENDER_QUEUE_SIZE", "")  # default: 4 x workers
+RENDER_RETRY_AFTER = os.getenv("RENDER_RETRY_AFTER", "1")  # seconds, sent with 503
+# Paid requests settling or rendering at once, per worker (0: unlimited)
+PAID_CONCURRENCY = int(os.getenv("PAID_CONCURRENCY", "0"))
+
+# Output encoding: default preset plus per-endpoint overrides,
+# e.g. IMAGE_PRESETS="/protected-nile=fast,/protected-mainnet=small"
+IMAGE_PRESET = os.getenv("IMAGE_PRESET", DEFAULT_PRESET)
+IMAGE_PRESETS = dict(
+    item.strip().split("=", 1)
+    for item in os.getenv("IMAGE_PRESETS", "").split(",")
+    if "=" in item
 )
-server.set_facilitator(facilitator)
-
-print("=" * 80)
-print("X402 Protected Resource Server - Configuration")
-print("=" * 80)
-print(f"Current Network: {CURRENT_NETWORK}")
-print(f"Pay To Address: {PAY_TO_ADDRESS}")
-print(f"Facilitator URL: {FACILITATOR_URL}")
-print(f"Facilitator API Key: {'*configured*' if FACILITATOR_API_KEY else '(not set)'}")
-permit_address = NetworkConfig.get_payment_permit_address(CURRENT_NETWORK)
-print(f"PaymentPermit Contract: {permit_address}")
-
-registered_networks = sorted(server._mechanisms.keys())
-print(f"\nAll Registered Networks ({len(registered_networks)}):")
-for net in registered_networks:
-    tokens = TokenRegistry.get_network_tokens(net)
-    is_current = " (CURRENT)" if net == CURRENT_NETWORK else ""
-    print(f"  {net}{is_current}:")
-    permit_addr = NetworkConfig.get_payment_permit_address(net)
-    print(f"    PaymentPermit: {permit_addr}")
-    if not tokens:
-        print("    (no tokens registered)")
-        continue
-    for symbol, info in tokens.items():
-        print(f"    {symbol}: {info.address} (decimals={info.decimals})")
-print("=" * 80)
-
-
-def generate_protected_image(
-    text: str, text_color: tuple[int, int, int, int] = (255, 255, 0, 255)
-) -> io.BytesIO:
+for _preset in [IMAGE_PRESET, *IMAGE_PRESETS.values()]:
+    if _preset not in ENCODING_PRESETS:
+        raise ValueError(f"Unknown image preset: {_preset} (expected one of {list(ENCODING_PRESETS)})")
+
+PAYMENT_SIGNATURE_HEADER = "PAYMENT-SIGNATURE"
+
+# Optional mmap'd counter file shared by all worker processes
+REQUEST_COUNTER_FILE = os.getenv("REQUEST_COUNTER_FILE", "")
+
+# Pre-encoded 402 challenges, rebuilt (new fee quotes) this often; 0 disables the cache
+CHALLENGE_REFRESH_INTERVAL = float(os.getenv("CHALLENGE_REFRESH_INTERVAL", str(DEFAULT_REFRESH_INTERVAL)))
+
+# Report fee_quote/verify/settle/render durations in a Server-Timing header (load testing)
+SERVER_TIMING = os.getenv("SERVER_TIMING", "0").lower() in ("1", "true", "yes")
+# Enables GET /debug/profile and X-Trace request spans, both requiring this token (empty: disabled)
+PROFILING_TOKEN = os.getenv("PROFILING_TOKEN", "")
+# Operator token for /metrics* (empty: those endpoints answer 404)
+METRICS_TOKEN = os.getenv("METRICS_TOKEN", "")
+
+async def generate_protected_image(
+    render_executor: RenderExecutor,
+    text: str,
+    text_color: tuple[int, int, int, int] = (255, 255, 0, 255),
+    media_type: str = "image/png",
+    preset: str = DEFAULT_PRESET,
+) -> bytes | memoryview:
     """Generate a protected image with custom text and color"""
-    with Image.open(PROTECTED_IMAGE_PATH) as base:
-        image = base.convert("RGBA")
-        draw = ImageDraw.Draw(image)
-
-        try:
-            font = ImageFont.truetype("DejaVuSans.ttf", 50)
-        except Exception:
-            font = ImageFont.load_default()
-
-        x = 16
-        y = 16
-        padding = 6
-
-        bbox = draw.textbbox((x, y), text, font=font)
-        bg = (
-            bbox[0] - padding,
-            bbox[1] - padding,
-            bbox[2] + padding,
-            bbox[3] + padding,
-        )
-        draw.rectangle(bg, fill=(0, 0, 0, 160))
-        draw.text(
-            (x, y),
-            text,
-            fill=text_color,
-            font=font,
-            stroke_width=2,
-            stroke_fill=(0, 0, 0, 255),
+    return await render_executor.render(text, text_color, media_type, preset)
+
+
+async def protected_image_response(
+    render_executor: RenderExecutor,
+    request: Request,
+    text: str,
+    text_color: tuple[int, int, int, int],
+    preset: str,
+) -> Response:
+    """Render the protected image in the format negotiated from the Accept header"""
+    media_type = negotiate_media_type(request.headers.get("accept"))
+    headers = {"Vary": "Accept"}
+    reserved = render_executor.try_acquire()
+    if not reserved:
+        # The payment has already settled: render past the bound rather than refuse it
+        logger.warning("Render pool filled up during settlement, rendering over capacity")
+    try:
+        with timed("render"):
+            body = await generate_protected_image(render_executor, text, text_color, media_type, preset)
+    finally:
+        if reserved:
+            render_executor.release()
+    return ImageResponse(body, media_type, headers=headers)
+
+
+def render_admission(render_executor: RenderExecutor | None, paid_limit: int = 0):
+    """
+    Refuse paid requests before settlement when they could not be served.
+
+    When the render pool is saturated, or ``paid_limit`` paid requests are
+    already settling or rendering, paid requests get 503 + Retry-After
+    before any funds move. Render slots themselves are only held around the
+    render (protected_image_response). Unpaid requests (402 challenge) pass
+    straight through.
+    """
+    paid_in_flight = 0
+
+    def decorator(func):
+        @wraps(func)
+        async def wrapper(request: Request, *args, **kwargs):
+            nonlocal paid_in_flight
+            if render_executor is None or PAYMENT_SIGNATURE_HEADER not in request.headers:
+                return await func(request, *args, **kwargs)
+            if render_executor.saturated() or (paid_limit and paid_in_flight >= paid_limit):
+                return JSONResponse(
+                    content={"error": "Render pool saturated, retry later"},
+                    status_code=503,
+                    headers={"Retry-After": RENDER_RETRY_AFTER},
+                )
+            paid_in_flight += 1
+            try:
+                return await func(request, *args, **kwargs)
+            finally:
+                paid_in_flight -= 1
+
+        return wrapper
+
+    return decorator
+
+
+def cached_challenge(challenge: PaymentChallenge | None):
+    """
+    Answer unpaid requests from the route's pre-encoded 402 challenge.
+
+    Paid requests, and unpaid ones before the first successful refresh,
+    go through to x402_protected.
+    """
+    def decorator(func):
+        @wraps(func)
+        async def wrapper(request: Request, *args, **kwargs):
+            if (
+                challenge is not None
+                and challenge.ready
+                and PAYMENT_SIGNATURE_HEADER not in request.headers
+            ):
+                return challenge.response(str(request.url))
+            return await func(request, *args, **kwargs)
+
+        return wrapper
+
+    return decorator
+
+
+def cached_payment(
+    challenge: PaymentChallenge | None,
+    server: X402Server,
+    verify_transaction: Callable[..., Awaitable[Any]],
+    protected,
+):
+    """
+    Settle paid requests against the route's prebuilt requirements.
+
+    Same flow as x402_protected (decode, settle, on-chain check, then the
+    handler), without re-parsing prices and fetching a fee quote per
+    request. Before the challenge's first refresh, and with the challenge
+    cache disabled, requests go through ``protected`` (x402_protected).
+    ``verify_transaction`` is the SDK's on-chain check (sdk_compat).
+    """
+
+    def decorator(func):
+        sdk_endpoint = protected(func)
+
+        @wraps(func)
+        async def wrapper(request: Request, *args, **kwargs):
+            payment_header = request.headers.get(PAYMENT_SIGNATURE_HEADER)
+            if challenge is None or not challenge.ready or not payment_header:
+                return await sdk_endpoint(request, *args, **kwargs)
+
+            try:
+                payload = decode_payment_payload(payment_header, PaymentPayload)
+            except Exception as e:
+                logger.error(f"Failed to decode payment payload: {e}")
+                return JSONResponse(content={"error": f"Invalid payment payload: {e}"}, status_code=400)
+            requirements = challenge.requirements_for(payload.accepted)
+            if requirements is None:
+                return JSONResponse(content={"error": "Unsupported payment token or network"}, status_code=400)
+
+            settle_result = await server.settle_payment(payload, requirements)
+            if not settle_result.success:
+                logger.error(f"Payment settlement failed: {settle_result.error_reason}")
+                error_content: dict[str, Any] = {"error": f"Settlement failed: {settle_result.error_reason}"}
+                if settle_result.transaction:
+                    error_content["txHash"] = settle_result.transaction
+                if settle_result.network:
+                    error_content["network"] = settle_result.network
+                return JSONResponse(content=error_content, status_code=500)
+            if settle_result.transaction:
+                verified = await verify_transaction(
+                    tx_hash=settle_result.transaction,
+                    payload=payload,
+                    requirements=requirements,
+                    network=requirements.network,
+                )
+                if not verified.success:
+                    return JSONResponse(
+                        content={
+                            "error": f"Transaction verification failed: {verified.error_reason}",
+                            "txHash": settle_result.transaction,
+                        },
+                        status_code=500,
+                    )
+
+            response = await func(request, *args, **kwargs)
+            if not isinstance(response, Response):
+                response = JSONResponse(content=response)
+            response.headers[PAYMENT_RESPONSE_HEADER] = encode_payment_payload(
+                settle_result.model_dump(by_alias=True)
+            )
+            return response
+
+        return wrapper
+
+    return decorator
+
+
+def make_protected_endpoint(
+    resource: ProtectedResource,
+    render_executor: RenderExecutor | None,
+    request_counter: RequestCounter,
+):
+    """Build the handler for one registry entry (label, color and preset resolved once)"""
+    label = resource.renderer.label
+    text_color = resource.renderer.color
+    preset = IMAGE_PRESETS.get(resource.path) or resource.renderer.preset or IMAGE_PRESET
+
+    async def endpoint(request: Request):
+        if render_executor is None:
+            return {"error": "Protected image not found"}
+
+        request_count = request_counter.increment(resource.path)
+
+        return await protected_image_response(
+            render_executor, request, label.format(count=request_count), text_color, preset
         )
 
-        buf = io.BytesIO()
-        image.save(buf, format="PNG")
-        buf.seek(0)
-        return buf
-
-
-@app.get("/")
-async def root():
-    """Service info"""
-    return {
-        "service": "X402 Protected Resource Server",
-        "status": "running",
-        "pay_to": PAY_TO_ADDRESS,
-        "facilitator": FACILITATOR_URL,
-    }
-
-
-@app.get("/protected-nile")
-@x402_protected(
-    server=server,
-    prices=["0.0001 USDT", "0.0001 USDD"],
-    schemes=["exact_permit", "exact_permit"],
-    network=CURRENT_NETWORK,
-    pay_to=PAY_TO_ADDRESS,
-)
-async def protected_endpoint(request: Request):
-    """Serve the protected image (generated dynamically)"""
-    global _request_count
-    if not PROTECTED_IMAGE_PATH.exists():
-        return {"error": "Protected image not found"}
-
-    with _request_count_lock:
-        _request_count += 1
-        request_count = _request_count
-
-    buf = generate_protected_image(
-        f"req: {request_count}", text_color=(255, 255, 0, 255)
-    )
-    return StreamingResponse(buf, media_type="image/png")
+    endpoint.__name__ = f"{resource.name}_endpoint"
+    endpoint.__doc__ = f"Serve the protected image - {resource.description}"
+    return endpoint
 
 
-@app.get("/protected-shasta")
-@x402_protected(
-    server=server,
-    prices=["0.0001 USDT"],
-    schemes=["exact_permit"],
-    network=NetworkConfig.TRON_SHASTA,
-    pay_to=PAY_TO_ADDRESS,
-)
-async def protected_shasta_endpoint(request: Request):
-    """Serve the protected image (shasta payment) - generated dynamically"""
-    global _request_count
-    if not PROTECTED_IMAGE_PATH.exists():
-        return {"error": "Protected image not found"}
-
-    with _request_count_lock:
-        _request_count += 1
-        request_count = _request_count
-
-    buf = generate_protected_image(
-        f"shasta req: {request_count}", text_color=(0, 255, 0, 255)
-    )
-    return StreamingResponse(buf, media_type="image/png")
+def load_mounted_resources() -> list[ProtectedResource]:
+    """Registry entries that have a pay_to address configured"""
+    return [resource for resource in load_resources(RESOURCES_CONFIG) if resource.pay_to]
 
 
-@app.get("/protected-mainnet")
-@x402_protected(
-    server=server,
-    prices=["0.0001 USDT", "0.0001 USDD"],
-    schemes=["exact_permit", "exact_permit"],
-    network=NetworkConfig.TRON_MAINNET,
-    pay_to=PAY_TO_ADDRESS,
-)
-async def protected_mainnet_endpoint(request: Request):
-    """Serve the protected image (mainnet payment) - generated dynamically"""
-    global _request_count
-    if not PROTECTED_IMAGE_PATH.exists():
-        return {"error": "Protected image not found"}
-
-    with _request_count_lock:
-        _request_count += 1
-        request_count = _request_count
-
-    buf = generate_protected_image(
-        f"mainnet req: {request_count}", text_color=(255, 0, 0, 255)
+def create_app(facilitator: Any = None) -> FastAPI:
+    """
+    Build the server app.
+
+    Called once per worker process: the X402Server, facilitator client,
+    render pool and counters all belong to the worker that created them.
+    ``facilitator`` replaces the configured facilitator client (load tests).
+    """
+    if not PAY_TO_ADDRESS:
+        raise ValueError("PAY_TO_ADDRESS environment variable is required")
+
+    app = FastAPI(title="X402 Server", description="Protected resource server")
+
+    # Add CORS middleware to allow cross-origin requests from client/web
+    app.add_middleware(
+        CORSMiddleware,
+        allow_origins=["*"],  # In production, specify exact origins
+        allow_credentials=True,
+        allow_methods=["*"],
+        allow_headers=["*"],
+        expose_headers=["*"],
     )
-    return StreamingResponse(buf, media_type="image/png")
 
+    # Initialize server (TRON mechanisms auto-registered by default)
+    server = X402Server()
+    # Fails here, not on the first paid request, if the SDK dropped the hook
+    verify_transaction = transaction_verifier(server)
+    # Register BSC testnet mechanisms
+    server.register(NetworkConfig.BSC_TESTNET, ExactPermitEvmServerMechanism())
+    server.register(NetworkConfig.BSC_TESTNET, ExactEvmServerMechanism())
+    # Register BSC mainnet mechanisms
+    server.register(NetworkConfig.BSC_MAINNET, ExactPermitEvmServerMechanism())
+    server.register(NetworkConfig.BSC_MAINNET, ExactEvmServerMechanism())
+    # Add facilitator: in-process, or over HTTP (with X-API-KEY if configured)
+    if facilitator is None and FACILITATOR_MODE == "local":
+        facilitator = LocalFacilitatorClient.from_facilitator_main(facilitator_id=FACILITATOR_URL)
+    elif facilitator is None:
+        facilitator_headers = {"X-API-KEY": FACILITATOR_API_KEY} if FACILITATOR_API_KEY else None
+        facilitator = PooledFacilitatorClient(
+            base_url=FACILITATOR_URL,
+            headers=facilitator_headers,
+            max_connections=FACILITATOR_MAX_CONNECTIONS,
+            http2=FACILITATOR_HTTP2,
+            timeout=FACILITATOR_TIMEOUT,
+            settle_timeout=FACILITATOR_SETTLE_TIMEOUT,
+            retries=FACILITATOR_RETRIES,
+        )
+    # Times fee quote / verify / settle round trips (/metrics, Server-Timing)
+    server.set_facilitator(TimedFacilitator(facilitator))
+
+    # Base image and font are decoded once per worker; requests only composite the label
+    render_executor = (
+        RenderExecutor(
+            PROTECTED_IMAGE_PATH,
+            mode=RENDER_EXECUTOR,
+            workers=RENDER_WORKERS,
+            queue_size=int(RENDER_QUEUE_SIZE) if RENDER_QUEUE_SIZE else None,
+        )
+        if PROTECTED_IMAGE_PATH.exists()
+        else None
+    )
 
-@app.get("/protected-bsc-mainnet")
-@x402_protected(
-    server=server,
-    prices=["0.0001 USDC", "0.0001 USDT", "0.0001 EPS"],
-    network=NetworkConfig.BSC_MAINNET,
-    pay_to=BSC_PAY_TO_ADDRESS,
-    schemes=["exact_permit", "exact_permit", "exact_permit"],
-)
-async def protected_bsc_mainnet_endpoint(request: Request):
-    """Serve the protected image (BSC mainnet payment) - generated dynamically"""
-    global _request_count
-    if not PROTECTED_IMAGE_PATH.exists():
-        return {"error": "Protected image not found"}
-
-    with _request_count_lock:
-        _request_count += 1
-        request_count = _request_count
-
-    buf = generate_protected_image(
-        f"bsc-mainnet req: {request_count}", text_color=(255, 165, 0, 255)
+    print("=" * 80)
+    print(f"X402 Protected Resource Server - Configuration (pid {os.getpid()})")
+    print("=" * 80)
+    print(f"Current Network: {CURRENT_NETWORK}")
+    print(f"Pay To Address: {PAY_TO_ADDRESS}")
+    print(f"Facilitator URL: {FACILITATOR_URL}")
+    if not isinstance(facilitator, PooledFacilitatorClient):
+        print(f"Facilitator Mode: in-process ({type(facilitator).__name__})")
+    else:
+        print(f"Facilitator API Key: {'*configured*' if FACILITATOR_API_KEY else '(not set)'}")
+        print(
+            f"Facilitator Transport: {'HTTP/2' if facilitator.http2 else 'HTTP/1.1'}, "
+            f"{FACILITATOR_MAX_CONNECTIONS} connections, {FACILITATOR_RETRIES} retries"
+        )
+    permit_address = NetworkConfig.get_payment_permit_address(CURRENT_NETWORK)
+    print(f"PaymentPermit Contract: {permit_address}")
+    if render_executor:
+        print(
+            f"Render Executor: {render_executor.mode} "
+            f"(workers={render_executor.workers}, queue={render_executor.queue_size})"
+        )
+    print(f"Image Formats: {', '.join(SUPPORTED_MEDIA_TYPES)} (preset={IMAGE_PRESET})")
+
+    # Load the resource registry; entries without a pay_to address are not mounted
+    resources: list[ProtectedResource] = []
+    print(f"\nProtected Resources ({RESOURCES_CONFIG}):")
+    for resource in load_resources(RESOURCES_CONFIG):
+        if not resource.pay_to:
+            print(f"  {resource.path}: skipped (pay_to not configured)")
+            continue
+        resources.append(resource)
+        print(f"  {resource.path}: {resource.network} {', '.join(resource.prices)}")
+
+    # Per-endpoint request counters (sharded per thread, optionally shared across workers)
+    request_counter = RequestCounter(
+        [resource.path for resource in resources],
+        path=Path(REQUEST_COUNTER_FILE) if REQUEST_COUNTER_FILE else None,
+    )
+    print(f"Request Counters: {REQUEST_COUNTER_FILE or 'in-process'}")
+    print(f"Server-Timing: {'enabled' if SERVER_TIMING else 'disabled'}")
+    print(f"Profiling: {'enabled (/debug/profile, X-Trace)' if PROFILING_TOKEN else 'disabled'}")
+    print(
+        f"402 Challenge Cache: refresh every {CHALLENGE_REFRESH_INTERVAL:g}s"
+        if CHALLENGE_REFRESH_INTERVAL > 0
+        else "402 Challenge Cache: disabled"
     )
-    return StreamingResponse(buf, media_type="image/png")
 
+    registered_networks = sorted(server._mechanisms.keys())
+    print(f"\nAll Registered Networks ({len(registered_networks)}):")
+    for net in registered_networks:
+        tokens = TokenRegistry.get_network_tokens(net)
+        is_current = " (CURRENT)" if net == CURRENT_NETWORK else ""
+        print(f"  {net}{is_current}:")
+        permit_addr = NetworkConfig.get_payment_permit_address(net)
+        print(f"    PaymentPermit: {permit_addr}")
+        if not tokens:
+            print("    (no tokens registered)")
+            continue
+        for symbol, info in tokens.items():
+            print(f"    {symbol}: {info.address} (decimals={info.decimals})")
+    print("=" * 80)
 
-@app.get("/protected-bsc-testnet")
-@x402_protected(
-    server=server,
-    prices=["0.0001 USDT", "0.0001 USDC", "0.0001 DHLU"],
-    network=NetworkConfig.BSC_TESTNET,
-    pay_to=BSC_PAY_TO_ADDRESS,
-    schemes=["exact_permit", "exact_permit", "exact"],
-)
-async def protected_bsc_testnet_endpoint(request: Request):
-    """Serve the protected image (BSC testnet payment) - generated dynamically"""
-    global _request_count
-    if not PROTECTED_IMAGE_PATH.exists():
-        return {"error": "Protected image not found"}
-
-    with _request_count_lock:
-        _request_count += 1
-        request_count = _request_count
-
-    buf = generate_protected_image(
-        f"bsc-test req: {request_count}", text_color=(0, 200, 255, 255)
+    # One cached 402 challenge per route, refreshed in the background
+    challenges = (
+        {resource.path: PaymentChallenge(server, resource) for resource in resources}
+        if CHALLENGE_REFRESH_INTERVAL > 0
+        else {}
+    )
+    background_tasks: set[asyncio.Task] = set()
+
+    @app.on_event("startup")
+    async def on_startup():
+        """Start refreshing the cached 402 challenges (and the in-process facilitator)"""
+        if isinstance(facilitator, LocalFacilitatorClient):
+            await facilitator.start()
+        if challenges:
+            background_tasks.add(
+                asyncio.create_task(
+                    refresh_challenges(list(challenges.values()), CHALLENGE_REFRESH_INTERVAL)
+                )
+            )
+
+    @app.on_event("shutdown")
+    async def on_shutdown():
+        """Stop background tasks and render workers, close the facilitator client and release the counters"""
+        for task in background_tasks:
+            task.cancel()
+        if render_executor:
+            render_executor.shutdown()
+        await facilitator.close()
+        request_counter.close()
+
+    if PROFILING_TOKEN:
+        install_profiling(app, PROFILING_TOKEN)
+    # /metrics* need the operator token (404 while it is unset)
+    operator_only = Depends(require_token(METRICS_TOKEN))
+
+    render_in_flight = REGISTRY.gauge(
+        "x402_server_render_in_flight", "Renders holding a pool slot"
+    )
+    render_queued = REGISTRY.gauge(
+        "x402_server_render_queued", "Renders waiting for a pool worker"
     )
-    return StreamingResponse(buf, media_type="image/png")
 
+    @app.get("/metrics", dependencies=[operator_only])
+    async def prometheus_metrics():
+        """All counters, gauges and latency histograms in the Prometheus text format"""
+        if render_executor:
+            pool = render_executor.metrics()
+            render_in_flight.set(pool["in_flight"])
+            render_queued.set(pool["queued"])
+        return Response(content=REGISTRY.render(), media_type=METRICS_CONTENT_TYPE)
+
+    @app.get("/metrics/render", dependencies=[operator_only])
+    async def render_metrics():
+        """Render pool occupancy and per-worker counters"""
+        if render_executor is None:
+            return {"error": "Protected image not found"}
+        return render_executor.metrics()
+
+    @app.get("/metrics/facilitator", dependencies=[operator_only])
+    async def facilitator_metrics():
+        """Facilitator client counters (HTTP transport or in-process service)"""
+        return facilitator.metrics()
+
+    @app.get("/metrics/challenges", dependencies=[operator_only])
+    async def challenge_metrics():
+        """Cached 402 challenges per route"""
+        return {path: challenge.metrics() for path, challenge in challenges.items()}
+
+    @app.get("/metrics/requests", dependencies=[operator_only])
+    async def request_metrics():
+        """Paid requests served per endpoint"""
+        return request_counter.snapshot()
+
+    @app.get("/")
+    async def root():
+        """Service info"""
+        return {
+            "service": "X402 Protected Resource Server",
+            "status": "running",
+            "pay_to": PAY_TO_ADDRESS,
+            "facilitator": FACILITATOR_URL,
+        }
+
+    # Mount one paid route per registry entry
+    for resource in resources:
+        endpoint = instrumented(resource.path)(
+            cached_challenge(challenges.get(resource.path))(
+                render_admission(render_executor, PAID_CONCURRENCY)(
+                    cached_payment(
+                        challenges.get(resource.path),
+                        server,
+                        verify_transaction,
+                        x402_protected(
+                            server=server,
+                            prices=list(resource.prices),
+                            schemes=list(resource.schemes),
+                            network=resource.network,
+                            pay_to=resource.pay_to,
+                        ),
+                    )(make_protected_endpoint(resource, render_executor, request_counter))
+                )
+            )
+        )
+        app.add_api_route(
+            resource.path,
+            server_timing(endpoint) if SERVER_TIMING else endpoint,
+            methods=["GET"],
+            name=resource.name,
+            description=resource.description,
+        )
 
-if __name__ == "__main__":
-    import uvicorn
+    return app
 
+
+if __name__ == "__main__":
     print("\n" + "=" * 80)
     print("Starting X402 Protected Resource Server")
     print("=" * 80)
     print(f"Host: {SERVER_HOST}")
     print(f"Port: {SERVER_PORT}")
+    print(f"Workers: {SERVER_WORKERS}")
     print("Endpoints:")
-    print("  /protected-nile         - Payment (0.0001 USDT) [Nile testnet]")
-    print("  /protected-shasta       - Payment (0.0001 USDT) [Shasta testnet]")
-    print("  /protected-mainnet      - Payment (0.0001 USDT/USDD) [Mainnet]")
-    print("  /protected-bsc-mainnet  - Payment (0.0001 USDC/USDT/EPS) [BSC Mainnet]")
-    print("  /protected-bsc-testnet  - Payment (0.0001 USDT/USDC/DHLU) [BSC Testnet]")
+    for resource in load_mounted_resources():
+        print(f"  {resource.path:<24} - {resource.description}")
     print("=" * 80 + "\n")
 
-    uvicorn.run(
-        app,
+    serve(
+        "main:create_app",
         host=SERVER_HOST,
         port=SERVER_PORT,
+        workers=SERVER_WORKERS,
+        graceful_timeout=GRACEFUL_TIMEOUT,
         log_level="info",
         access_log=True,
     )
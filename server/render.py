@@ -0,0 +1,308 @@
+"""
+Protected Image Render Engine
+Decodes the base image and font once and only composites the label region per request.
+"""
+
+import io
+import threading
+from collections.abc import Sequence
+from pathlib import Path
+from typing import IO, Any, NamedTuple
+
+from PIL import Image, ImageDraw, ImageFont, features
+
+Color = tuple[int, int, int, int]
+
+# Label layout (matches the original per-request drawing code)
+LABEL_ORIGIN = (16, 16)
+LABEL_PADDING = 6
+LABEL_BACKGROUND: Color = (0, 0, 0, 160)
+STROKE_WIDTH = 2
+STROKE_COLOR: Color = (0, 0, 0, 255)
+
+DEFAULT_FONT = "DejaVuSans.ttf"
+DEFAULT_FONT_SIZE = 50
+
+# Media type -> Pillow format, in server preference order (first is the default)
+MEDIA_TYPES = {
+    "image/png": "PNG",
+    "image/webp": "WEBP",
+    "image/jpeg": "JPEG",
+    "image/avif": "AVIF",
+}
+
+# Encoder options per preset; "balanced" keeps the historical PNG output
+ENCODING_PRESETS: dict[str, dict[str, dict[str, Any]]] = {
+    "fast": {
+        "PNG": {"compress_level": 1},
+        "WEBP": {"quality": 80, "method": 0},
+        "JPEG": {"quality": 75},
+        "AVIF": {"quality": 60, "speed": 10},
+    },
+    "balanced": {
+        "PNG": {"compress_level": 6},
+        "WEBP": {"quality": 80, "method": 4},
+        "JPEG": {"quality": 85, "optimize": True},
+        "AVIF": {"quality": 60, "speed": 8},
+    },
+    "small": {
+        "PNG": {"compress_level": 9, "optimize": True},
+        "WEBP": {"quality": 70, "method": 4},
+        "JPEG": {"quality": 70, "optimize": True, "progressive": True},
+        "AVIF": {"quality": 50, "speed": 7},
+    },
+}
+DEFAULT_PRESET = "balanced"
+
+
+def _encoder_available(fmt: str) -> bool:
+    """Whether this Pillow build can write the given format"""
+    if fmt in ("PNG", "JPEG"):
+        return True
+    try:
+        return bool(features.check_module(fmt.lower()))
+    except ValueError:
+        return False
+
+
+SUPPORTED_MEDIA_TYPES = tuple(
+    media_type for media_type, fmt in MEDIA_TYPES.items() if _encoder_available(fmt)
+)
+
+
+def negotiate_media_type(
+    accept: str | None, offered: Sequence[str] = SUPPORTED_MEDIA_TYPES
+) -> str:
+    """
+    Pick the best offered media type for an Accept header.
+
+    Uses q-values and the most specific matching range; ties go to the
+    earlier offered type. Falls back to the first offered type when the
+    header is absent or nothing matches, so a paid request always gets
+    its resource.
+    """
+    if not accept:
+        return offered[0]
+
+    ranges: list[tuple[str, str, float]] = []
+    for part in accept.split(","):
+        fields = part.strip().split(";")
+        main_type, _, sub_type = fields[0].strip().lower().partition("/")
+        q = 1.0
+        for param in fields[1:]:
+            key, _, value = param.strip().partition("=")
+            if key.strip().lower() == "q":
+                try:
+                    q = float(value)
+                except ValueError:
+                    q = 0.0
+        ranges.append((main_type, sub_type or "*", q))
+
+    best, best_q = offered[0], 0.0
+    for media_type in offered:
+        main_type, _, sub_type = media_type.partition("/")
+        q, specificity = 0.0, -1
+        for r_main, r_sub, r_q in ranges:
+            if r_main == main_type and r_sub == sub_type:
+                level = 2
+            elif r_main == main_type and r_sub == "*":
+                level = 1
+            elif r_main == "*" and r_sub == "*":
+                level = 0
+            else:
+                continue
+            if level > specificity:
+                q, specificity = r_q, level
+        if q > best_q:
+            best, best_q = media_type, q
+    return best
+
+
+def save_image(
+    image: Image.Image,
+    fp: IO[bytes],
+    media_type: str = "image/png",
+    preset: str = DEFAULT_PRESET,
+) -> None:
+    """Encode an RGBA image into a writable file object"""
+    fmt = MEDIA_TYPES[media_type]
+    options = ENCODING_PRESETS[preset][fmt]
+    if fmt == "JPEG":
+        image = image.convert("RGB")
+    image.save(fp, format=fmt, **options)
+
+
+def encode_image(
+    image: Image.Image, media_type: str = "image/png", preset: str = DEFAULT_PRESET
+) -> memoryview:
+    """Encode an RGBA image; the result is a view on the encoder buffer (no copy)"""
+    buf = io.BytesIO()
+    save_image(image, buf, media_type, preset)
+    return buf.getbuffer()
+
+
+class Glyph(NamedTuple):
+    """Pre-rendered masks and metrics for a single character"""
+    stroke_mask: Image.Image
+    fill_mask: Image.Image
+    offset: tuple[int, int]
+    bbox: tuple[int, int, int, int] | None
+    advance: int  # 26.6 fixed point, as laid out by FreeType
+
+
+class ImageRenderer:
+    """
+    Renders the protected image with a per-request text label.
+
+    The base image is decoded into an RGBA template once and never mutated;
+    each render copies the template and touches only the label rectangle.
+    Character masks are rasterized on first use and reused afterwards; they
+    are laid out and combined the way FreeType builds a string mask, so the
+    label is pixel-identical to drawing the whole string with ImageDraw.
+    """
+
+    def __init__(
+        self,
+        base_path: Path,
+        font_name: str = DEFAULT_FONT,
+        font_size: int = DEFAULT_FONT_SIZE,
+    ) -> None:
+        with Image.open(base_path) as base:
+            self._template = base.convert("RGBA")
+
+        try:
+            self._font = ImageFont.truetype(font_name, font_size)
+        except Exception:
+            self._font = ImageFont.load_default()
+
+        self._glyphs: dict[str, Glyph] = {}
+        self._kerning: dict[tuple[str, str], int] = {}
+        self._glyphs_lock = threading.Lock()
+
+    @property
+    def size(self) -> tuple[int, int]:
+        """Template size in pixels"""
+        return self._template.size
+
+    def _glyph(self, char: str) -> Glyph:
+        """Get the cached glyph for a character, rasterizing it on first use"""
+        glyph = self._glyphs.get(char)
+        if glyph is not None:
+            return glyph
+
+        font = self._font
+        left, top, right, bottom = font.getbbox(char, stroke_width=STROKE_WIDTH)
+        size = (max(right - left, 0), max(bottom - top, 0))
+        stroke_mask = Image.new("L", size)
+        fill_mask = Image.new("L", size)
+        ImageDraw.Draw(stroke_mask).text(
+            (-left, -top), char, fill=255, font=font,
+            stroke_width=STROKE_WIDTH, stroke_fill=255,
+        )
+        ImageDraw.Draw(fill_mask).text((-left, -top), char, fill=255, font=font)
+
+        ink = font.getbbox(char)
+        glyph = Glyph(
+            stroke_mask=stroke_mask,
+            fill_mask=fill_mask,
+            offset=(left, top),
+            bbox=ink if ink[2] > ink[0] and ink[3] > ink[1] else None,
+            advance=round(font.getlength(char) * 64),
+        )
+        with self._glyphs_lock:
+            return self._glyphs.setdefault(char, glyph)
+
+    def _kern(self, prev: str, char: str) -> int:
+        """Kerning adjustment between two characters in 26.6 fixed point"""
+        pair = (prev, char)
+        kern = self._kerning.get(pair)
+        if kern is None:
+            font = self._font
+            kern = round(
+                (font.getlength(prev + char) - font.getlength(prev) - font.getlength(char)) * 64
+            )
+            with self._glyphs_lock:
+                kern = self._kerning.setdefault(pair, kern)
+        return kern
+
+    def _draw_label_fallback(self, image: Image.Image, text: str, text_color: Color) -> None:
+        """Draw the label with ImageDraw (bitmap fonts without stroke support)"""
+        draw = ImageDraw.Draw(image)
+        bbox = draw.textbbox(LABEL_ORIGIN, text, font=self._font)
+        draw.rectangle(
+            (
+                bbox[0] - LABEL_PADDING,
+                bbox[1] - LABEL_PADDING,
+                bbox[2] + LABEL_PADDING,
+                bbox[3] + LABEL_PADDING,
+            ),
+            fill=LABEL_BACKGROUND,
+        )
+        draw.text(LABEL_ORIGIN, text, fill=text_color, font=self._font)
+
+    def render(self, text: str, text_color: Color = (255, 255, 0, 255)) -> Image.Image:
+        """Render the template with a text label in the top-left corner"""
+        image = self._template.copy()
+        if not isinstance(self._font, ImageFont.FreeTypeFont):
+            self._draw_label_fallback(image, text, text_color)
+            return image
+
+        x, y = LABEL_ORIGIN
+        placed: list[tuple[Glyph, tuple[int, int]]] = []
+        left = top = right = bottom = None
+        pen, prev = 0, None
+        for char in text:
+            glyph = self._glyph(char)
+            if prev is not None:
+                pen += self._kern(prev, char)
+            prev = char
+            if glyph.bbox is not None:
+                # FreeType rounds the 26.6 pen to whole pixels per glyph
+                gx = x + ((pen + 32) >> 6) + glyph.offset[0]
+                gy = y + glyph.offset[1]
+                w, h = glyph.stroke_mask.size
+                placed.append((glyph, (gx, gy)))
+                left = gx if left is None else min(left, gx)
+                top = gy if top is None else min(top, gy)
+                right = gx + w if right is None else max(right, gx + w)
+                bottom = gy + h if bottom is None else max(bottom, gy + h)
+            pen += glyph.advance
+
+        ink_left, ink_top, ink_right, ink_bottom = self._font.getbbox(text)
+        # Rectangle bounds are inclusive in ImageDraw, exclusive in paste
+        image.paste(
+            LABEL_BACKGROUND,
+            (
+                x + ink_left - LABEL_PADDING,
+                y + ink_top - LABEL_PADDING,
+                x + ink_right + LABEL_PADDING + 1,
+                y + ink_bottom + LABEL_PADDING + 1,
+            ),
+        )
+        if left is None:
+            return image
+
+        # Overlapping glyphs combine inside one mask (as in a FreeType string
+        # bitmap) before the mask is blended onto the image once
+        size = (right - left, bottom - top)
+        stroke_mask = Image.new("L", size)
+        fill_mask = Image.new("L", size)
+        for glyph, (gx, gy) in placed:
+            w, h = glyph.stroke_mask.size
+            box = (gx - left, gy - top, gx - left + w, gy - top + h)
+            stroke_mask.paste(255, box, glyph.stroke_mask)
+            fill_mask.paste(255, box, glyph.fill_mask)
+
+        image.paste(STROKE_COLOR, (left, top, right, bottom), stroke_mask)
+        image.paste(text_color, (left, top, right, bottom), fill_mask)
+        return image
+
+    def render_encoded(
+        self,
+        text: str,
+        text_color: Color = (255, 255, 0, 255),
+        media_type: str = "image/png",
+        preset: str = DEFAULT_PRESET,
+    ) -> memoryview:
+        """Render and encode in one step"""
+        return encode_image(self.render(text, text_color), media_type, preset)
@@ -0,0 +1,113 @@
+"""
+Protected Resource Registry
+Loads priced resources from a JSON config file; main.py mounts one route per entry at startup.
+"""
+
+import json
+import os
+from collections import defaultdict
+from collections.abc import Mapping
+from dataclasses import dataclass
+from pathlib import Path
+from string import Template
+
+from bankofai.x402.tokens import TokenRegistry
+from render import ENCODING_PRESETS, Color
+
+
+@dataclass(frozen=True)
+class ImageRendererSpec:
+    """Protected image with a text label; ``label`` may use ``{count}``"""
+    label: str
+    color: Color = (255, 255, 0, 255)
+    preset: str | None = None
+
+
+# Renderer "type" in the config -> spec class
+RENDERER_TYPES = {
+    "image": ImageRendererSpec,
+}
+
+
+@dataclass(frozen=True)
+class ProtectedResource:
+    """A priced resource; prices[i] is paid with schemes[i]"""
+    path: str
+    network: str
+    prices: tuple[str, ...]
+    schemes: tuple[str, ...]
+    pay_to: str
+    renderer: ImageRendererSpec
+    description: str = ""
+
+    @property
+    def name(self) -> str:
+        """Route name derived from the path"""
+        return self.path.strip("/").replace("/", "_").replace("-", "_") or "root"
+
+
+def _build_renderer(spec: dict) -> ImageRendererSpec:
+    spec = dict(spec)
+    kind = spec.pop("type", "image")
+    if kind not in RENDERER_TYPES:
+        raise ValueError(f"Unknown renderer type: {kind} (expected one of {list(RENDERER_TYPES)})")
+    if "color" in spec:
+        spec["color"] = tuple(spec["color"])
+    renderer = RENDERER_TYPES[kind](**spec)
+    if renderer.preset is not None and renderer.preset not in ENCODING_PRESETS:
+        raise ValueError(f"Unknown image preset: {renderer.preset}")
+    return renderer
+
+
+def _validate_prices(path: str, network: str, prices: tuple[str, ...]) -> None:
+    """Resolve every price token once at startup so typos fail fast"""
+    tokens = TokenRegistry.get_network_tokens(network)
+    for price in prices:
+        parts = price.split()
+        if len(parts) != 2:
+            raise ValueError(f"{path}: invalid price {price!r} (expected '<amount> <SYMBOL>')")
+        if parts[1] not in tokens:
+            raise ValueError(f"{path}: token {parts[1]} is not registered on {network}")
+
+
+def load_resources(
+    config_path: Path, environ: Mapping[str, str] = os.environ
+) -> list[ProtectedResource]:
+    """
+    Load protected resources from a JSON file.
+
+    ``pay_to`` may reference environment variables (``"${PAY_TO_ADDRESS}"``);
+    unset variables expand to an empty string.
+    """
+    with open(config_path) as f:
+        entries = json.load(f)["resources"]
+
+    env = defaultdict(str, environ)
+    resources: list[ProtectedResource] = []
+    seen: set[str] = set()
+    for entry in entries:
+        path = entry["path"]
+        if not path.startswith("/"):
+            raise ValueError(f"Resource path must start with '/': {path}")
+        if path in seen:
+            raise ValueError(f"Duplicate resource path: {path}")
+        seen.add(path)
+
+        prices = tuple(entry["prices"])
+        schemes = tuple(entry["schemes"])
+        if not prices or len(prices) != len(schemes):
+            raise ValueError(f"{path}: prices and schemes must be non-empty and the same length")
+        _validate_prices(path, entry["network"], prices)
+
+        resources.append(
+            ProtectedResource(
+                path=path,
+                network=entry["network"],
+                prices=prices,
+                schemes=schemes,
+                pay_to=Template(entry["pay_to"]).substitute(env),
+                renderer=_build_renderer(entry["renderer"]),
+                description=entry.get("description", ""),
+            )
+        )
+    return resources
@@ -0,0 +1,45 @@
+"""
+Image Responses
+Single-send responses for already encoded images, with validators and caching headers.
+"""
+
+import hashlib
+from collections.abc import Mapping
+from typing import Any
+
+from fastapi.responses import Response
+
+# Paid content must never be replayed from a shared cache
+DEFAULT_CACHE_CONTROL = "private, no-store"
+
+
+def make_etag(body: bytes | memoryview) -> str:
+    """Strong ETag derived from the encoded body"""
+    return '"' + hashlib.blake2b(body, digest_size=16).hexdigest() + '"'
+
+
+class ImageResponse(Response):
+    """
+    Encoded image sent as a single ASGI body message.
+
+    The body is kept as the encoder's memoryview (no copy into a new bytes
+    object) and Content-Length, ETag and Cache-Control are always set.
+    """
+
+    def __init__(
+        self,
+        content: bytes | memoryview,
+        media_type: str,
+        headers: Mapping[str, str] | None = None,
+        cache_control: str = DEFAULT_CACHE_CONTROL,
+    ) -> None:
+        all_headers = {"ETag": make_etag(content), "Cache-Control": cache_control}
+        if headers:
+            all_headers.update(headers)
+        super().__init__(content=content, media_type=media_type, headers=all_headers)
+
+    def render(self, content: Any) -> bytes | memoryview:
+        # Older Starlette versions only pass bytes through unchanged
+        if isinstance(content, memoryview):
+            return content
+        return super().render(content)
@@ -0,0 +1,32 @@
+"""
+SDK Compatibility
+Private bankofai-x402 hooks the paid-route fast path (cached_payment) relies on.
+
+cached_payment repeats X402Middleware's settle flow and needs its on-chain
+transaction check, which the SDK only has as a private method. Mirrors
+bankofai-x402 0.6.1 (X402Middleware._verify_transaction_on_chain); it is
+looked up once at startup so an SDK upgrade that drops it fails loudly.
+"""
+
+from collections.abc import Awaitable, Callable
+from typing import Any
+
+from bankofai.x402.fastapi.middleware import X402Middleware
+from bankofai.x402.server import X402Server
+
+SDK_VERSION = "0.6.1"
+
+
+def transaction_verifier(server: X402Server) -> Callable[..., Awaitable[Any]]:
+    """
+    X402Middleware's on-chain transaction check, bound to ``server``.
+
+    Called as ``verify(tx_hash=, payload=, requirements=, network=)`` and
+    returns the SDK's TransactionVerificationResult.
+    """
+    if not hasattr(X402Middleware, "_verify_transaction_on_chain"):
+        raise RuntimeError(
+            "bankofai-x402 no longer provides X402Middleware._verify_transaction_on_chain; "
+            f"cached_payment was written against {SDK_VERSION}, pin that version or update server/sdk_compat.py"
+        )
+    return X402Middleware(server)._verify_transaction_on_chain
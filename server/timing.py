@@ -0,0 +1,128 @@
+"""
+Stage Timing
+Per-request stage durations (facilitator calls, rendering) recorded in
+Prometheus histograms for /metrics and, when enabled, reported in a
+Server-Timing header, so load tests can break paid-request latency down
+without access to the server's logs.
+"""
+
+import time
+from contextlib import contextmanager
+from contextvars import ContextVar
+from functools import wraps
+from typing import Any
+
+from fastapi import Request
+
+from common.metrics import REGISTRY
+from common.profiling import record_span
+
+PAYMENT_SIGNATURE_HEADER = "PAYMENT-SIGNATURE"
+
+STAGE_SECONDS = REGISTRY.histogram(
+    "x402_server_stage_seconds",
+    "Duration of one request stage: facilitator round trips (fee_quote, verify, settle) and render",
+    ("stage",),
+)
+REQUEST_SECONDS = REGISTRY.histogram(
+    "x402_server_request_seconds",
+    "Protected route latency; kind=challenge is 402 generation, kind=paid the full paid request",
+    ("route", "kind", "status"),
+)
+IN_FLIGHT = REGISTRY.gauge(
+    "x402_server_requests_in_flight", "Protected route requests being handled", ("route", "kind")
+)
+SETTLEMENTS = REGISTRY.counter(
+    "x402_server_settlements",
+    "Settle results returned by the facilitator",
+    ("network", "asset", "scheme", "result"),
+)
+
+_stages: ContextVar[dict[str, float] | None] = ContextVar("stage_timings", default=None)
+
+
+@contextmanager
+def timed(stage: str):
+    """Record the block's duration for ``stage`` (and in the current request's Server-Timing)"""
+    start = time.perf_counter()
+    try:
+        yield
+    finally:
+        elapsed = time.perf_counter() - start
+        STAGE_SECONDS.labels(stage).observe(elapsed)
+        record_span(stage, start, elapsed)
+        stages = _stages.get()
+        if stages is not None:
+            stages[stage] = stages.get(stage, 0.0) + elapsed
+
+
+def server_timing(func):
+    """Collect the stages of one request and send them as Server-Timing (ms)"""
+    @wraps(func)
+    async def wrapper(request: Request, *args, **kwargs):
+        stages: dict[str, float] = {}
+        token = _stages.set(stages)
+        try:
+            response = await func(request, *args, **kwargs)
+        finally:
+            _stages.reset(token)
+        if stages:
+            response.headers["Server-Timing"] = ", ".join(
+                f"{stage};dur={seconds * 1000:.2f}" for stage, seconds in stages.items()
+            )
+        return response
+
+    return wrapper
+
+
+def instrumented(route: str):
+    """Count, time and track in-flight requests to a protected route, split into challenges and paid requests"""
+    in_flight = {kind: IN_FLIGHT.labels(route, kind) for kind in ("challenge", "paid")}
+
+    def decorator(func):
+        @wraps(func)
+        async def wrapper(request: Request, *args, **kwargs):
+            kind = "paid" if PAYMENT_SIGNATURE_HEADER in request.headers else "challenge"
+            status = "500"
+            start = time.perf_counter()
+            try:
+                with in_flight[kind].track_inprogress():
+                    response = await func(request, *args, **kwargs)
+                status = str(response.status_code)
+                return response
+            finally:
+                REQUEST_SECONDS.labels(route, kind, status).observe(time.perf_counter() - start)
+
+        return wrapper
+
+    return decorator
+
+
+class TimedFacilitator:
+    """Facilitator client wrapper that times fee quotes, verifies and settles, and counts settle results"""
+
+    def __init__(self, facilitator: Any) -> None:
+        self._facilitator = facilitator
+
+    def __getattr__(self, name: str) -> Any:
+        return getattr(self._facilitator, name)
+
+    async def fee_quote(self, *args, **kwargs):
+        with timed("fee_quote"):
+            return await self._facilitator.fee_quote(*args, **kwargs)
+
+    async def verify(self, *args, **kwargs):
+        with timed("verify"):
+            return await self._facilitator.verify(*args, **kwargs)
+
+    async def settle(self, payload, requirements, *args, **kwargs):
+        result = "error"
+        try:
+            with timed("settle"):
+                response = await self._facilitator.settle(payload, requirements, *args, **kwargs)
+            result = "success" if response.success else "failed"
+            return response
+        finally:
+            SETTLEMENTS.labels(
+                requirements.network, requirements.asset, requirements.scheme, result
+            ).inc()
@@ -50,7 +50,7 @@ case "$COMPONENT" in
         echo "Starting X402 Client (Python)"
         echo "=========================================="
         cd client/python
-        python main.py
+        python main.py "${@:2}"
         ;;
     client-ts)
         echo "=========================================="